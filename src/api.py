@@ -0,0 +1,173 @@
+"""
+api.py
+
+Streaming analysis module.
+Lightweight api for using the motion tracking and rep counting pipeline from other code
+(eg: notebooks or a reporting service) without the graphical user interface. Does not
+import PyQt5, and the pipeline modules (OpenCV, MediaPipe) are only imported when the
+first frame is requested, so importing this module is fast.
+
+    from api import analyze
+
+    for result in analyze("session.mp4"):
+        print(result.timestamp, result.counts)
+
+Frames are processed lazily as results are requested, so stopping early (eg: `break`)
+stops processing and releases the source.
+
+see "doc/api.md" for more details
+
+"""
+
+import util
+from collections import namedtuple
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+"""
+result of a processed frame:
+- index: index of the frame in the source
+- timestamp: timestamp of the frame (seconds, position in the video for video files)
+- landmarks: (33, 4) array of landmarks (id, x, y, visibility), filled with nan if no
+  person was detected
+- counts: count of each tracked movement
+- phases: phase of each tracked movement (see `Movement.get_phase()`)
+- reps: names of the movements that counted a rep on this frame
+
+"""
+FrameResult = namedtuple(
+    "FrameResult", ["index", "timestamp", "landmarks", "counts", "phases", "reps"]
+)
+
+
+def open_source(source):
+    """
+    returns a frame source (see "source.py") for:
+    - a frame source (used as is)
+    - an int: webcam device
+    - a session csv file: replays the recorded landmarks (see "replay.py")
+    - a directory: image sequence
+    - any other path: video file
+
+    """
+    import os
+    from source import WebcamSource, VideoFileSource, ImageDirectorySource
+
+    if not isinstance(source, (int, str, os.PathLike)):
+        return source
+
+    if isinstance(source, int):
+        return WebcamSource(source)
+
+    source = os.fspath(source)
+    if source.lower().endswith(".csv"):
+        from replay import ReplaySource, load_csv
+
+        return ReplaySource(load_csv(source))
+
+    if os.path.isdir(source):
+        return ImageDirectorySource(source)
+
+    if not os.path.exists(source):
+        raise FileNotFoundError(source)
+
+    return VideoFileSource(source)
+
+
+def analyze(source, movements=None, motion=None, cache=None):
+    """
+    runs motion tracking and rep counting on each frame of the source
+    yields a `FrameResult` for each frame, as it is processed
+    source: see `open_source()`
+    movements: dictionary of movements to count (defaults to `create_movements()`)
+    motion: motion tracking object (defaults to `Motion()`)
+    cache: landmark cache to reuse the landmarks of a video processed before
+        (see "cache.py", optional)
+
+    """
+    from motion import Motion
+    from movement import create_movements
+    from cache import to_array, to_landmarks
+    from source import VideoFileSource
+
+    movements = movements if movements is not None else create_movements()
+    own_motion = motion is None
+    motion = motion if motion is not None else Motion()
+    cap = open_source(source)
+
+    cached = None
+    if cache is not None and isinstance(cap, VideoFileSource):
+        key = cache.get_key(cap.get_metadata()["filename"], motion.get_params())
+        entry = cache.get(key)
+        cached = entry[1] if entry is not None else None
+
+    try:
+        while cap.isOpened():
+            ret, img = cap.read()
+            if ret == False or img is None:
+                break
+
+            index = cap.get_index()
+            timestamp = cap.get_timestamp()
+
+            """ landmarks from the source, the landmark cache or pose inference """
+            landmarks = cap.get_landmarks()
+            if landmarks is None and cached is not None and index < len(cached):
+                landmarks = to_landmarks(cached[index])
+            if landmarks is None:
+                height, width, _ = img.shape
+                motion.crop = {"start": util.INIT, "end": (width, height)}
+                landmarks = motion.find_landmarks(img, [])
+
+            reps = []
+            for name, movement in movements.items():
+                if not movement.get_tracking_status():
+                    continue
+
+                count = movement.get_count()
+                movement.count_movement(
+                    landmarks,
+                    [],
+                    None,
+                    cap.get_source_type(),
+                    timestamp=timestamp,
+                    frame_index=index,
+                )
+                if movement.get_count() > count:
+                    reps.append(name)
+
+            tracking = {
+                name: movement
+                for name, movement in movements.items()
+                if movement.get_tracking_status()
+            }
+            yield FrameResult(
+                index,
+                timestamp,
+                to_array(landmarks),
+                {name: movement.get_count() for name, movement in tracking.items()},
+                {name: movement.get_phase() for name, movement in tracking.items()},
+                reps,
+            )
+    finally:
+        cap.release()
+        if own_motion:
+            motion.close()
+
+
+def count(source, **kwargs):
+    """
+    processes the whole source and returns the final count of each movement
+
+    """
+    counts = {}
+    for result in analyze(source, **kwargs):
+        counts = result.counts
+
+    return counts
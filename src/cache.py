@@ -0,0 +1,223 @@
+"""
+cache.py
+
+Landmark cache module.
+Stores the per-frame landmarks of processed videos so that re-opening the same video
+skips motion tracking entirely. Entries are keyed by a hash of the video contents and
+the motion capture parameters, and the least recently used entries are evicted once
+the cache exceeds its size budget.
+
+Only landmark co-ordinates are stored (no video frames).
+
+Usage: `python src/cache.py clear` or `python src/cache.py invalidate <video>`
+
+see "doc/cache.md" for more details
+
+"""
+
+import hashlib, json, os, sys, time, threading, util
+import numpy as np
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+def to_array(landmarks):
+    """
+    converts a list of landmarks (id, x, y, visibility) to a (33, 4) array
+    frames without landmarks are filled with nan
+
+    """
+    if len(landmarks) == 0:
+        return np.full((33, 4), np.nan, dtype=np.float32)
+
+    return np.array(landmarks, dtype=np.float32)
+
+
+def to_landmarks(array):
+    """
+    converts a (33, 4) array back to a list of landmarks (id, x, y, visibility)
+    returns an empty list for frames without landmarks
+
+    """
+    if np.isnan(array[0, 0]):
+        return []
+
+    return [(int(id), float(x), float(y), float(v)) for id, x, y, v in array]
+
+
+class LandmarkCache:
+    """
+    landmark cache: content-addressed store of per-frame landmarks with lru eviction
+
+    """
+
+    index_name = "index.json"
+    hash_chunk_size = 1024 * 1024
+
+    def __init__(self, path=util.DEFAULT_CACHE_PATH, max_size=util.CACHE_MAX_SIZE):
+        """
+        path: directory to store the cache in
+        max_size: size budget of the cache in bytes
+
+        """
+        self._path = path
+        self._max_size = max_size
+        self._index = None
+
+        """
+        the cache is shared by the main worker thread and the background job runner
+        (re-entrant, since methods that change the index call each other)
+
+        """
+        self._lock = threading.RLock()
+
+    def get_key(self, name, params):
+        """
+        creates a cache key from the contents of the video file and the motion parameters
+
+        """
+        key = hashlib.sha256()
+        with open(name, "rb") as video:
+            for chunk in iter(lambda: video.read(self.hash_chunk_size), b""):
+                key.update(chunk)
+
+        key.update(json.dumps(params, sort_keys=True).encode())
+        return key.hexdigest()
+
+    def get(self, key):
+        """
+        returns the (timestamps, landmarks) arrays stored under the key
+        returns None if the key is not in the cache
+
+        """
+        with self._lock:
+            index = self.load_index()
+            if key not in index:
+                return None
+
+            try:
+                with np.load(self.get_entry_path(key)) as entry:
+                    timestamps, landmarks = entry["timestamps"], entry["landmarks"]
+            except (OSError, KeyError, ValueError):
+                self.invalidate(key)
+                return None
+
+            index[key]["accessed"] = time.time()
+            self.save_index()
+            return timestamps, landmarks
+
+    def put(self, key, timestamps, landmarks):
+        """
+        stores the per-frame timestamps and landmarks of a video under the key
+        landmarks: list of landmark lists, one for each frame
+
+        """
+        timestamps = np.array(timestamps, dtype=np.float64)
+        landmarks = np.array([to_array(lm) for lm in landmarks], dtype=np.float32)
+
+        with self._lock:
+            if not os.path.exists(self._path):
+                os.makedirs(self._path)
+
+            entry_path = self.get_entry_path(key)
+            np.savez_compressed(entry_path, timestamps=timestamps, landmarks=landmarks)
+
+            index = self.load_index()
+            index[key] = {"size": os.path.getsize(entry_path), "accessed": time.time()}
+            self.evict()
+            self.save_index()
+
+    def invalidate(self, key=None):
+        """
+        removes the entry stored under the key
+        removes all entries if no key is given
+
+        """
+        with self._lock:
+            index = self.load_index()
+            keys = list(index.keys()) if key is None else [key]
+
+            for key in keys:
+                if os.path.exists(self.get_entry_path(key)):
+                    os.remove(self.get_entry_path(key))
+                index.pop(key, None)
+
+            self.save_index()
+
+    def evict(self):
+        """
+        removes the least recently used entries until the cache fits its size budget
+
+        """
+        with self._lock:
+            index = self.load_index()
+            size = sum(entry["size"] for entry in index.values())
+
+            for key in sorted(index, key=lambda key: index[key]["accessed"]):
+                if size <= self._max_size:
+                    break
+
+                size -= index[key]["size"]
+                if os.path.exists(self.get_entry_path(key)):
+                    os.remove(self.get_entry_path(key))
+                del index[key]
+
+    def get_size(self):
+        """
+        returns the total size of the cache in bytes
+
+        """
+        with self._lock:
+            return sum(entry["size"] for entry in self.load_index().values())
+
+    def get_entry_path(self, key):
+        return os.path.join(self._path, f"{key}.npz")
+
+    def load_index(self):
+        """
+        loads the index of cache entries (key: size and last access time)
+
+        """
+        with self._lock:
+            if self._index is None:
+                try:
+                    with open(os.path.join(self._path, self.index_name)) as index:
+                        self._index = json.load(index)
+                except (OSError, ValueError):
+                    self._index = {}
+
+            return self._index
+
+    def save_index(self):
+        with self._lock:
+            if not os.path.exists(self._path):
+                os.makedirs(self._path)
+
+            with open(os.path.join(self._path, self.index_name), "w") as index:
+                json.dump(self._index, index)
+
+
+def main():
+    cache = LandmarkCache()
+
+    if len(sys.argv) == 2 and sys.argv[1] == "clear":
+        cache.invalidate()
+        print("cache cleared")
+
+    elif len(sys.argv) == 3 and sys.argv[1] == "invalidate":
+        from motion import Motion
+
+        cache.invalidate(cache.get_key(sys.argv[2], Motion().get_params()))
+        print(f'invalidated: "{sys.argv[2]}"')
+
+    else:
+        print("usage: python src/cache.py clear | invalidate <video>")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+capture.py
+
+Capture policy module.
+Chooses the webcam mode (resolution, frame rate and mjpg vs raw frames) and the decode
+resolution of video files based on the size of the video display and the pose model input,
+rather than always requesting full-hd frames.
+
+Also contains the supervised webcam capture, which detects a disconnected webcam and
+reconnects with exponential backoff (including webcams plugged in while running).
+
+see "doc/capture.md" for more details
+
+"""
+
+import cv2, threading, time, util
+from source import FrameSource, WebcamSource
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+""" capture status """
+CONNECTED = "connected"
+RECONNECTING = "reconnecting"
+
+
+class CapturePolicy:
+    """
+    capture policy: negotiates the capture resolution with the webcam or video file
+
+    """
+
+    def __init__(
+        self,
+        display_size=(util.DISPLAY_WIDTH, util.DISPLAY_HEIGHT),
+        inference_size=util.INFERENCE_SIZE,
+        modes=util.CAMERA_MODES,
+        fps=util.CAMERA_FPS,
+    ):
+        """
+        display_size: (width, height) of the video display
+        inference_size: max side length of the frame used for pose inference
+        modes: list of (width, height) webcam modes to choose from
+        fps: requested webcam frame rate
+
+        """
+        self._display_size = display_size
+        self._inference_size = inference_size
+        self._modes = sorted(modes, key=lambda mode: mode[util.X] * mode[util.Y])
+        self._fps = fps
+
+        self._resize = None
+
+    def get_target_size(self):
+        """
+        returns the smallest (width, height) that fills both the display and the model input
+
+        """
+        width = max(self._display_size[util.X], self._inference_size)
+        height = max(self._display_size[util.Y], self._inference_size)
+        return width, height
+
+    def choose_mode(self):
+        """
+        chooses the smallest webcam mode that covers the target size
+        returns the largest mode if none are big enough
+
+        """
+        target_width, target_height = self.get_target_size()
+        for width, height in self._modes:
+            if width >= target_width and height >= target_height:
+                return width, height
+
+        return self._modes[-1]
+
+    def apply_webcam(self, cap):
+        """
+        requests the chosen mode from the webcam
+        mjpg is requested for modes too large to stream as raw frames at the full frame rate
+        returns the negotiated (width, height, fps, fourcc)
+
+        """
+        width, height = self.choose_mode()
+
+        if width * height > util.RAW_MAX_PIXELS:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        cap.set(cv2.CAP_PROP_FPS, self._fps)
+
+        return self.negotiate(cap)
+
+    def apply_video(self, cap):
+        """
+        requests a reduced decode resolution for video files larger than the target size
+        if the backend cannot decode at a reduced resolution, frames are resized after decoding
+        returns the negotiated (width, height, fps, fourcc)
+
+        """
+        width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        target = self.get_scaled_size(width, height)
+
+        if target is not None:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, target[util.X])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, target[util.Y])
+
+        return self.negotiate(cap)
+
+    def negotiate(self, cap):
+        """
+        reads back the resolution given by the backend
+        sets up resizing for frames that are still larger than the target size
+        returns the size of the frames after resizing
+
+        """
+        width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC)) & 0xFFFFFFFF
+
+        self._resize = self.get_scaled_size(width, height)
+        if self._resize is not None:
+            width, height = self._resize
+
+        fourcc = fourcc.to_bytes(4, "little").decode(errors="replace").strip("\x00")
+        return int(width), int(height), fps, fourcc
+
+    def get_scaled_size(self, width, height):
+        """
+        returns the frame size scaled down to fit the target size (keeping the aspect ratio)
+        returns None if the frame already fits
+
+        """
+        target_width, target_height = self.get_target_size()
+        if width <= target_width and height <= target_height or width * height == 0:
+            return None
+
+        scale = min(target_width / width, target_height / height)
+        return int(width * scale), int(height * scale)
+
+    def resize(self, img):
+        """
+        resizes frames that the backend could not capture or decode at the target size
+
+        """
+        if self._resize is None:
+            return img
+
+        height, width, _ = img.shape
+        if (width, height) == self._resize:
+            return img
+
+        return cv2.resize(img, self._resize, interpolation=cv2.INTER_AREA)
+
+
+class SupervisedCapture(FrameSource):
+    """
+    supervised webcam capture: detects a disconnected webcam and reconnects with
+    exponential backoff, without using any cpu while waiting
+    stays open (returning no frames) until released, even if the webcam never opens
+
+    """
+
+    source_type = util.WEBCAM
+    name = "webcam"
+
+    def __init__(
+        self,
+        open_source=WebcamSource,
+        device=0,
+        devices=util.CAMERA_DEVICES,
+        max_failures=util.CAPTURE_MAX_FAILURES,
+        min_delay=util.RECONNECT_MIN_DELAY,
+        max_delay=util.RECONNECT_MAX_DELAY,
+        poll=util.CAPTURE_POLL,
+        on_status=None,
+    ):
+        """
+        open_source: creates the frame source for a webcam device, eg: `WebcamSource`
+        device: webcam device to open first
+        devices: number of webcam devices to look for when reconnecting
+            (a webcam plugged back in can come back as a different device)
+        max_failures: number of failed reads in a row before the webcam is
+            treated as disconnected
+        min_delay, max_delay: seconds between reconnect attempts (doubles every attempt)
+        poll: max seconds `read()` waits for, so the caller can still stop while waiting
+        on_status: called with a status message whenever the status changes (optional)
+
+        """
+        super().__init__()
+        self._open_source = open_source
+        self._device = device
+        self._devices = devices
+        self._max_failures = max_failures
+        self._min_delay = min_delay
+        self._max_delay = max_delay
+        self._poll = poll
+        self._on_status = on_status
+
+        self._source = None
+        self._policy = None
+        self._released = threading.Event()
+        self._status = None
+        self._failures = 0
+        self._attempts = 0
+        self._reconnects = 0
+        self._next_attempt = 0
+
+        self.connect()
+
+    def isOpened(self):
+        return not self._released.is_set()
+
+    def connect(self):
+        """
+        tries to open the webcam, starting with the last device that worked
+        returns True if the webcam was opened
+
+        """
+        devices = [self._device] + [
+            device for device in range(self._devices) if device != self._device
+        ]
+
+        for device in devices:
+            source = self._open_source(device)
+            if source.isOpened():
+                self._source = source
+                self._device = device
+                if self._policy is not None:
+                    source.apply_policy(self._policy)
+
+                if self._status is not None:
+                    self._reconnects += 1
+                self._failures = 0
+                self._attempts = 0
+                self.set_status(CONNECTED, f"webcam connected (device {device})")
+                return True
+
+            source.release()
+
+        """ back off exponentially between attempts """
+        self._attempts += 1
+        delay = min(self._min_delay * 2 ** (self._attempts - 1), self._max_delay)
+        self._next_attempt = time.perf_counter() + delay
+        self.set_status(
+            RECONNECTING,
+            f"webcam not found: retrying in {round(delay, 1)}s "
+            + f"(attempt {self._attempts})",
+        )
+        return False
+
+    def disconnect(self):
+        """
+        releases the disconnected webcam and reconnects straight away
+        (the webcam may only have been reset)
+
+        """
+        if self._source is not None:
+            self._source.release()
+            self._source = None
+
+        self._failures = 0
+        self._attempts = 0
+        self._next_attempt = 0
+
+    def read(self, img=None):
+        """
+        reads the next frame from the webcam
+        while disconnected, waits (up to `poll` seconds) for the next reconnect attempt
+        returns (False, None) if no frame was read
+
+        """
+        if self._source is None:
+            wait = self._next_attempt - time.perf_counter()
+            if wait > 0:
+                self._released.wait(min(wait, self._poll))
+                return False, None
+
+            if self._released.is_set() or not self.connect():
+                return False, None
+
+        ret, img = self._source.read(img)
+        if ret and img is not None:
+            self._failures = 0
+            self._index += 1
+            self._timestamp = self._source.get_timestamp()
+            return ret, img
+
+        self._failures += 1
+        if self._failures >= self._max_failures or not self._source.isOpened():
+            self.disconnect()
+            self.set_status(RECONNECTING, "webcam disconnected: reconnecting")
+
+        return False, None
+
+    def set_status(self, status, message):
+        self._status = status
+        print(message)
+        if self._on_status is not None:
+            self._on_status(message)
+
+    def get_status(self):
+        """
+        returns the health of the capture: status, device, failed reads in a row,
+        reconnect attempts, seconds until the next attempt and number of reconnects
+
+        """
+        return {
+            "status": self._status,
+            "device": self._device,
+            "failures": self._failures,
+            "attempts": self._attempts,
+            "retry in": max(0, self._next_attempt - time.perf_counter())
+            if self._source is None
+            else 0,
+            "reconnects": self._reconnects,
+        }
+
+    def get(self, prop):
+        if self._source is None:
+            return super().get(prop)
+
+        return self._source.get(prop)
+
+    def set(self, prop, value):
+        if self._source is None:
+            return False
+
+        return self._source.set(prop, value)
+
+    def get_landmarks(self):
+        if self._source is None:
+            return None
+
+        return self._source.get_landmarks()
+
+    def apply_policy(self, policy):
+        """
+        negotiates the frame size with the capture policy (again after reconnecting)
+
+        """
+        self._policy = policy
+        if self._source is None:
+            return 0, 0, 0, ""
+
+        return self._source.apply_policy(policy)
+
+    def release(self):
+        self._released.set()
+        if self._source is not None:
+            self._source.release()
+            self._source = None
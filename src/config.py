@@ -8,6 +8,9 @@ Contains thresholds for the following movements:
 - Left arm extensions
 - Sit to stand
 
+Contains the joint angles of movements only counted by dtw template matching:
+- Shoulder circles
+
 see "doc/config.md" for more details
 
 """
@@ -71,3 +74,19 @@ SIT_TO_STAND_POSITIONAL_THRESH = [
     (Motion.left_knee, Motion.left_hip, ">", 0.2),
     (Motion.right_knee, Motion.right_hip, ">", 0.2),
 ]
+
+
+"""
+template movement joint angles (see "dtw.py"), no thresholds: reps are counted by
+matching recorded template reps
+- shoulder circles: elbow-shoulder-hip and elbow-shoulder-shoulder angles of both arms
+
+"""
+TEMPLATE_ANGLES = {
+    "shoulder circles": [
+        (Motion.right_elbow, Motion.right_shoulder, Motion.right_hip),
+        (Motion.left_elbow, Motion.left_shoulder, Motion.left_hip),
+        (Motion.right_elbow, Motion.right_shoulder, Motion.left_shoulder),
+        (Motion.left_elbow, Motion.left_shoulder, Motion.right_shoulder),
+    ],
+}
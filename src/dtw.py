@@ -0,0 +1,528 @@
+"""
+dtw.py
+
+DTW template movement module.
+Counts reps of movements that do not fit the "all angles below threshold, then all above"
+pattern of `Movement` (eg: shoulder circles), by matching the streaming joint angle
+sequence against recorded template reps with dynamic time warping (dtw).
+
+Each frame, the most recent frames are compared to every template (recorded at a few
+speeds). Most comparisons are ruled out cheaply so many templates can be matched in
+real time alongside the threshold counters:
+- LB_Kim: lower bound from the first and last frames
+- LB_Keogh: lower bound from the envelope of the template
+- early abandoning: dtw stops as soon as the distance can no longer be below the limit
+
+Usage: `python src/dtw.py [movement] [--reps N] [--templates N]` (synthetic benchmark)
+
+see "doc/dtw.md" for more details
+
+"""
+
+import math, time, argparse, util, config
+import numpy as np
+from collections import deque
+from numpy.lib.stride_tricks import sliding_window_view
+from movement import Movement, create_movements
+from motion import Motion
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class Template:
+    """
+    template rep: a recorded joint angle sequence and its LB_Keogh envelope
+
+    """
+
+    def __init__(self, series, band=util.DTW_BAND):
+        """
+        series: (frames, angles) array of the joint angles (degrees) of a single rep
+        band: max warping (as a fraction of the template length)
+
+        """
+        self.series = np.asarray(series, dtype=np.float64)
+        self.band = max(1, int(round(band * len(self.series))))
+
+        """ frames within the warping band of each frame: (frames, band, angles) """
+        padded = np.pad(self.series, ((self.band, self.band), (0, 0)), mode="edge")
+        self.windows = sliding_window_view(padded, 2 * self.band + 1, axis=0)
+        self.windows = self.windows.transpose(0, 2, 1)
+
+        """ min and max of each angle within the warping band of each frame """
+        self.upper = self.windows.max(axis=1)
+        self.lower = self.windows.min(axis=1)
+
+    def __len__(self):
+        return len(self.series)
+
+
+class TemplateMovement(Movement):
+    """
+    template movement: counts reps that match recorded template reps
+
+    """
+
+    """ longest gap (fraction of the shortest template) bridged by the matcher """
+    max_gap = 0.5
+
+    """ max overlap of frames matched to the previous rep (fraction of a template) """
+    overlap = 0.3
+
+    def __init__(
+        self,
+        points,
+        templates,
+        is_tracking,
+        threshold=util.DTW_THRESHOLD,
+        ignore_vis=False,
+        debug=False,
+        name="",
+        events=None,
+    ):
+        """
+        points: a list containing tuples of three points (the angles to be matched)
+        templates: a list of templates (see `create_templates()`)
+        is_tracking: a boolean to specify whether tracking is enabled
+        threshold: max rms angle difference (degrees) of a matching rep
+
+        """
+        super().__init__(
+            [(*p[:3], None) for p in points],
+            [],
+            is_tracking,
+            ignore_vis=ignore_vis,
+            debug=debug,
+            name=name,
+            events=events,
+        )
+
+        self._templates = sorted(templates, key=len)
+        self._threshold = threshold
+        self._frames = deque(maxlen=max(len(t) for t in self._templates))
+        self._min_frames = len(self._templates[0])
+        self._reset_matcher()
+        self.reset_stats()
+
+    def _reset_matcher(self):
+        self._frames.clear()
+        self._gap = 0
+        self._best = None
+        self._since = math.inf
+        self._reset = False
+
+    def copy(self):
+        """
+        returns a new counter matching the same templates (without rep events), eg: to
+        count reps over the stored landmarks of the review timeline
+
+        """
+        return TemplateMovement(
+            [p[:3] for p in self.get_points()],
+            self._templates,
+            self.get_tracking_status(),
+            threshold=self._threshold,
+            ignore_vis=self.get_ignore_vis(),
+            name=self.get_name(),
+        )
+
+    def reset_stats(self):
+        """
+        clears the number of comparisons ruled out at each stage
+
+        """
+        self._stats = {"compared": 0, "lb_kim": 0, "lb_keogh": 0, "abandoned": 0}
+
+    def get_stats(self):
+        """
+        returns the number of comparisons made and ruled out at each stage
+        (comparisons not ruled out by any stage were fully computed)
+
+        """
+        return self._stats.copy()
+
+    def count_movement(
+        self, landmarks, pixels, img, source, timestamp=None, frame_index=None
+    ):
+        """
+        count the number of reps for the movement
+        a rep is counted once the distance to the closest template is below the
+        threshold and stops decreasing
+
+        """
+        for angle in self._angles:
+            angle["prev"] = angle["curr"]
+
+        for i, angle in enumerate(self._angles):
+            if len(landmarks) != 0:
+                angle["curr"] = self.find_angle(
+                    landmarks[self._points[i][0]],
+                    landmarks[self._points[i][1]],
+                    landmarks[self._points[i][2]],
+                )
+
+                if self._debug:
+                    img = self.annotate(img, source, pixels, angle, i)
+            else:
+                angle["curr"] = -1
+
+        """ short gaps (no angles) are skipped, long gaps start matching again """
+        angles = [angle["curr"] for angle in self._angles]
+        if min(angles) < 0:
+            self._gap += 1
+            if self._gap > self.max_gap * self._min_frames:
+                self._reset_matcher()
+            return img, self._count
+
+        self._gap = 0
+        self._since += 1
+        self._frames.append(angles)
+
+        distance = self.match()
+        self._reset = distance < math.inf or self._best is not None
+
+        if distance < self._threshold and (
+            self._best is None or distance <= self._best
+        ):
+            """ wait for the best alignment of the rep """
+            self._best = distance
+        elif self._best is not None:
+            """ the previous frame was the best alignment: count the rep """
+            self.add_rep(timestamp, frame_index)
+            self._best = None
+            self._since = 1
+
+        return img, self._count
+
+    def get_state(self):
+        """
+        returns the counter state of the movement, including the frames being matched
+
+        """
+        state = super().get_state()
+        state.update(
+            {
+                "frames": list(self._frames),
+                "gap": self._gap,
+                "best": self._best,
+                "since": self._since if self._since != math.inf else None,
+            }
+        )
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self._frames.clear()
+        self._frames.extend(state["frames"])
+        self._gap = state["gap"]
+        self._best = state["best"]
+        self._since = state["since"] if state["since"] is not None else math.inf
+
+    def match(self):
+        """
+        returns the rms angle difference (degrees) between the most recent frames and
+        the closest template (inf if no template is below the threshold)
+
+        """
+        best = math.inf
+        if len(self._frames) < self._min_frames:
+            return best
+
+        frames = np.array(self._frames)
+        num_angles = frames.shape[1]
+
+        for template in self._templates:
+            length = len(template)
+            if length > len(frames):
+                break
+
+            """ frames matched to the previous rep are not matched again """
+            if self._since < length * (1 - self.overlap):
+                continue
+
+            """ largest total squared difference that can still be a match """
+            limit = min(self._threshold, best) ** 2 * length * num_angles
+            candidate = frames[-length:]
+            self._stats["compared"] += 1
+
+            if lb_kim(candidate, template) >= limit:
+                self._stats["lb_kim"] += 1
+                continue
+
+            bound, remaining = lb_keogh(candidate, template)
+            if bound >= limit:
+                self._stats["lb_keogh"] += 1
+                continue
+
+            cost = dtw(candidate, template, limit, remaining)
+            if cost >= limit:
+                self._stats["abandoned"] += 1
+                continue
+
+            best = math.sqrt(cost / (length * num_angles))
+
+        return best
+
+
+def lb_kim(candidate, template):
+    """
+    returns a lower bound of the dtw distance from the first and last frames
+    (the first and last frames are always aligned)
+
+    """
+    first = ((candidate[0] - template.series[0]) ** 2).sum()
+    last = ((candidate[-1] - template.series[-1]) ** 2).sum()
+    return first + last
+
+
+def lb_keogh(candidate, template):
+    """
+    returns the LB_Keogh lower bound of the dtw distance (the squared distance of
+    the candidate outside of the template envelope), and the lower bound of the
+    remaining rows after each row (used for early abandoning)
+
+    """
+    above = np.maximum(candidate - template.upper, 0)
+    below = np.maximum(template.lower - candidate, 0)
+    rows = (above**2 + below**2).sum(axis=1)
+
+    remaining = np.zeros(len(rows))
+    remaining[:-1] = np.cumsum(rows[::-1])[::-1][1:]
+    return rows.sum(), remaining
+
+
+def dtw(candidate, template, limit=math.inf, remaining=None):
+    """
+    returns the dtw distance (total squared difference) between the candidate and
+    the template, within the warping band of the template
+    stops early and returns inf once the distance can no longer be below `limit`
+    remaining: lower bound of the remaining rows after each row (see `lb_keogh()`)
+
+    """
+    length = len(template)
+    band = template.band
+
+    """ squared differences within the warping band only """
+    costs = ((candidate[:, None, :] - template.windows) ** 2).sum(-1).tolist()
+    remaining = [0] * length if remaining is None else remaining.tolist()
+
+    """ previous[j + 1] is the distance to (i - 1, j), previous[0] is the boundary """
+    inf = math.inf
+    previous = [0] + [inf] * length
+    for i in range(length):
+        current = [inf] * (length + 1)
+        row = costs[i]
+        offset = band - i
+        left = inf
+        row_min = inf
+
+        for j in range(max(0, i - band), min(length, i + band + 1)):
+            diagonal = previous[j]
+            up = previous[j + 1]
+            best = up if up < diagonal else diagonal
+            if left < best:
+                best = left
+
+            left = row[j + offset] + best
+            current[j + 1] = left
+            if left < row_min:
+                row_min = left
+
+        """ early abandoning """
+        if row_min + remaining[i] >= limit:
+            return inf
+
+        previous = current
+
+    return previous[-1]
+
+
+def resample(series, length):
+    """
+    returns the series linearly resampled to `length` frames
+
+    """
+    series = np.asarray(series, dtype=np.float64)
+    old = np.linspace(0, 1, len(series))
+    new = np.linspace(0, 1, length)
+    return np.stack(
+        [np.interp(new, old, series[:, i]) for i in range(series.shape[1])], axis=1
+    )
+
+
+def create_templates(series, scales=util.DTW_SCALES, band=util.DTW_BAND):
+    """
+    returns templates of a recorded rep at each speed (reps done faster or slower
+    than recorded need less warping)
+    scales: lengths of the templates (as a fraction of the recorded length)
+
+    """
+    return [
+        Template(resample(series, max(2, int(round(len(series) * scale)))), band)
+        for scale in scales
+    ]
+
+
+def record_template(frames, points, start, stop, ignore_vis=False):
+    """
+    returns the joint angles of a recorded rep (eg: from a session csv file)
+    frames: list of (timestamp, landmarks) (see "replay.py")
+    points: a list containing tuples of three points (the angles to be matched)
+    start, stop: times (seconds) of the start and end of the rep
+
+    """
+    movement = Movement(
+        [(*p[:3], None) for p in points], [], True, ignore_vis=ignore_vis
+    )
+    series = []
+    for timestamp, landmarks in frames:
+        if start <= timestamp < stop and len(landmarks) > 0:
+            angles = [
+                movement.find_angle(landmarks[p1], landmarks[p2], landmarks[p3])
+                for p1, p2, p3, _ in movement.get_points()
+            ]
+            if min(angles) >= 0:
+                series.append(angles)
+
+    return np.array(series)
+
+
+def get_landmark(name):
+    """
+    returns the tracking id of a landmark, eg: "right_wrist" or "16" (see `Motion`)
+    raises ValueError if the landmark is not tracked
+
+    """
+    if name.isdigit():
+        landmark = int(name)
+    else:
+        landmark = getattr(Motion, name.lower().replace(" ", "_"), None)
+
+    """ the 33 pose landmarks (same as the "MediaPipe Pose Estimation" library) """
+    if type(landmark) is not int or landmark < 0 or landmark >= 33:
+        raise ValueError(f"unknown landmark: {name}")
+
+    return landmark
+
+
+def get_template_points(name, points=None):
+    """
+    returns the joint angles (tuples of three points) matched by a template movement
+    and whether to ignore visibility thresholds
+    name: name of the movement, eg: "right arm ext" or "shoulder circles"
+    points: joint angles of a new movement, None to use the angles in the config file
+    (`config.TEMPLATE_ANGLES`) or the angles of a movement tracked by the program
+    (see `create_movements()`)
+    raises ValueError if there are no joint angles for the movement
+
+    """
+    if points is not None:
+        return [tuple(p[:3]) for p in points], False
+
+    if name in config.TEMPLATE_ANGLES:
+        return [tuple(p[:3]) for p in config.TEMPLATE_ANGLES[name]], False
+
+    movements = create_movements()
+    if name not in movements:
+        raise ValueError(f"no joint angles for movement: {name}")
+
+    movement = movements[name]
+    return [p[:3] for p in movement.get_points()], movement.get_ignore_vis()
+
+
+def create_template_movement(name, recordings, points=None, events=None):
+    """
+    creates a template movement that matches joint angles against recorded template
+    reps (see `get_template_points()`)
+    name: name of the movement, eg: "right arm ext" or "shoulder circles"
+    recordings: list of (session csv file, start, stop) of each template rep
+    points: joint angles (tuples of three points) of a new movement, None to use the
+    angles in the config file or of the movement tracked by the program
+    events: event stream that rep events are put on (see "events.py")
+    returns None if no template reps could be recorded
+
+    """
+    from replay import load_csv
+
+    points, ignore_vis = get_template_points(name, points)
+
+    """ named apart from the threshold movement with the same joint angles """
+    label = f"{name} (template)" if name in create_movements() else name
+
+    templates = []
+    sessions = {}
+    for session, start, stop in recordings:
+        if session not in sessions:
+            sessions[session] = load_csv(session)
+
+        series = record_template(sessions[session], points, start, stop, ignore_vis)
+        if len(series) >= 2:
+            templates += create_templates(series)
+
+    if len(templates) == 0:
+        return None
+
+    return TemplateMovement(
+        points,
+        templates,
+        True,
+        ignore_vis=ignore_vis,
+        name=label,
+        events=events,
+    )
+
+
+def main():
+    import config
+    from synthetic import MOVEMENTS, SyntheticTrace
+
+    parser = argparse.ArgumentParser(description="benchmark dtw template matching")
+    parser.add_argument("movement", nargs="?", default=MOVEMENTS[0], choices=MOVEMENTS)
+    parser.add_argument("--reps", type=int, default=util.SYNTHETIC_REPS)
+    parser.add_argument("--templates", type=int, default=1, help="recorded reps")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    thresholds = {
+        MOVEMENTS[0]: config.RIGHT_ARM_EXT_ANGULAR_THRESH,
+        MOVEMENTS[1]: config.LEFT_ARM_EXT_ANGULAR_THRESH,
+        MOVEMENTS[2]: config.SIT_TO_STAND_ANGULAR_THRESH,
+    }
+    points = [p[:3] for p in thresholds[args.movement]]
+    ignore_vis = args.movement == MOVEMENTS[2]
+
+    """ record template reps from a different trace than the one counted """
+    recorded = SyntheticTrace(args.movement, args.templates, seed=args.seed + 1)
+    frames = list(recorded.frames())
+    templates = []
+    for start, stop in recorded.get_rep_times():
+        series = record_template(frames, points, start, stop, ignore_vis)
+        templates += create_templates(series)
+
+    trace = SyntheticTrace(args.movement, args.reps, seed=args.seed)
+    movement = TemplateMovement(points, templates, True, ignore_vis=ignore_vis)
+
+    start_time = time.perf_counter()
+    for index, (timestamp, landmarks) in enumerate(trace.frames()):
+        movement.count_movement(landmarks, [], None, util.REPLAY, timestamp, index)
+    elapsed = time.perf_counter() - start_time
+
+    expected = trace.get_expected_counts()[args.movement]
+    print(f"{len(templates)} templates, {trace.get_num_frames()} frames")
+    print(f"{args.movement}: {movement.get_count()} (expected {expected})")
+    print(f"{elapsed / trace.get_num_frames() * 1000:.3f} ms per frame")
+
+    stats = movement.get_stats()
+    print(
+        f"{stats['compared']} comparisons: {stats['lb_kim']} ruled out by LB_Kim, "
+        + f"{stats['lb_keogh']} by LB_Keogh, {stats['abandoned']} abandoned early"
+    )
+
+
+if __name__ == "__main__":
+    main()
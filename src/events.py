@@ -0,0 +1,212 @@
+"""
+events.py
+
+Rep event module.
+Movements raise a structured event for every rep they count. Events are put on a
+non-blocking queue and delivered to pluggable sinks from a background thread, so no sink
+can add latency to the main worker thread.
+
+Sinks:
+- `JsonlSink`: appends each event as a line of json to a file
+- `UnixSocketSink`: sends each event as a line of json to a unix socket
+- `CallbackSink`: calls a function with each event (in the dispatcher thread)
+
+see "doc/events.md" for more details
+
+"""
+
+import json, queue, socket, threading, util
+from collections import namedtuple
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+"""
+rep event:
+- movement: name of the movement
+- count: movement count after the rep
+- timestamp: session time of the frame the rep was counted on (seconds)
+- frame_index: index of the frame the rep was counted on
+- angles: angles (degrees) of the movement when the rep was counted
+
+"""
+RepEvent = namedtuple(
+    "RepEvent", ["movement", "count", "timestamp", "frame_index", "angles"]
+)
+
+
+def to_json(event):
+    return json.dumps(event._asdict())
+
+
+class EventStream:
+    """
+    event stream: non-blocking queue of rep events delivered to sinks from a
+    background dispatcher thread
+
+    """
+
+    def __init__(self, max_size=util.EVENT_QUEUE_SIZE):
+        """
+        max_size: max number of events waiting to be delivered
+        (events are dropped rather than blocking if the queue is full)
+
+        """
+        self._queue = queue.Queue(max_size)
+        self._sinks = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._dropped = 0
+
+    def add_sink(self, sink):
+        with self._lock:
+            self._sinks.append(sink)
+
+    def remove_sink(self, sink):
+        with self._lock:
+            self._sinks.remove(sink)
+
+    def start(self):
+        """
+        starts the dispatcher thread
+
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.dispatch, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        delivers the remaining events, then stops the dispatcher thread and closes the sinks
+
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+        with self._lock:
+            for sink in self._sinks:
+                sink.close()
+
+    def put(self, event):
+        """
+        adds an event to the queue without blocking
+        returns False if the event was dropped because the queue is full
+
+        """
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self._dropped += 1
+            return False
+
+    def dispatch(self):
+        """
+        dispatcher thread: delivers each event to every sink
+        a sink that raises an error does not stop the other sinks
+
+        """
+        while True:
+            event = self._queue.get()
+            if event is None:
+                break
+
+            with self._lock:
+                sinks = list(self._sinks)
+
+            for sink in sinks:
+                try:
+                    sink.send(event)
+                except Exception as error:
+                    print(f"event sink error ({type(sink).__name__}): {error}")
+
+    def get_dropped(self):
+        """
+        returns the number of events dropped because the queue was full
+
+        """
+        return self._dropped
+
+
+class EventSink:
+    """
+    generic event sink
+
+    """
+
+    def send(self, event):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonlSink(EventSink):
+    """
+    appends each event as a line of json to a file
+
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "a")
+
+    def send(self, event):
+        self._file.write(to_json(event) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class UnixSocketSink(EventSink):
+    """
+    sends each event as a line of json to a unix socket
+    reconnects on the next event if the socket is closed (events sent while the
+    socket is unavailable are dropped)
+
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._socket = None
+
+    def send(self, event):
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(1)
+            try:
+                self._socket.connect(self._path)
+            except OSError:
+                self.close()
+                raise
+
+        try:
+            self._socket.sendall((to_json(event) + "\n").encode())
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class CallbackSink(EventSink):
+    """
+    calls a function with each event (in the dispatcher thread)
+
+    """
+
+    def __init__(self, callback):
+        self._callback = callback
+
+    def send(self, event):
+        self._callback(event)
@@ -12,7 +12,8 @@ see "doc/file.md" for more details
 
 """
 
-import csv, time, os, util
+import csv, json, math, time, os, util
+from store import pack_landmarks
 
 
 __author__ = "Mike Smith"
@@ -30,17 +31,31 @@ class File:
 
     """ default file path (in sub-dir "files" located in current dir) """
     file_path = util.DEFAULT_FILE_PATH
-    supported_files = {util.CSV: ".csv", util.MP4: ".mp4", util.AVI: ".avi"}
-
-    def __init__(self, save=True):
+    supported_files = {
+        util.CSV: ".csv",
+        util.MP4: ".mp4",
+        util.AVI: ".avi",
+        util.PNG: ".png",
+        util.JPG: ".jpg",
+    }
+
+    def __init__(self, save=True, sample_period=util.SAMPLE_PERIOD, store=None):
         """
         save: a boolean to specify whether or not to generate a file
+        sample_period: time between samples in seconds (0 to sample every frame)
+        store: session store to also save the session to (optional)
 
         """
         self._save_file = save
+        self._sample_period = sample_period
+        self._store = store
+        self._created_time = time.time()
 
         self._data = []
-        self._prev_time = 0
+        self._times = []
+        self._keys = None
+        self._movements = None
+        self._last_sample = -1
 
     def set_save_status(self, save):
         """
@@ -49,6 +64,13 @@ class File:
         """
         self._save_file = save
 
+    def set_sample_period(self, sample_period):
+        """
+        set the time between samples in seconds (0 to sample every frame)
+
+        """
+        self._sample_period = sample_period
+
     def get_file_type(self, filename):
         """
         checks that the file is supported by the program
@@ -64,12 +86,36 @@ class File:
 
         return util.FILE_NOT_SUPPORTED
 
-    def read(self):
+    def read(self, name):
         """
-        not implemented yet
+        reads the landmarks back from a csv file written by `write`
+        returns a list of (time, landmarks) for each saved sample
+        (visibility is not saved, so all saved landmarks are treated as visible)
 
         """
-        pass
+        frames = []
+        with open(name, newline="") as file:
+            for row in csv.DictReader(file):
+                landmarks = []
+                for i in range(33):
+                    point = row.get(str(i), "")
+                    if point == "" or point is None:
+                        continue
+
+                    x, y = point.strip("()").split(",")
+                    landmarks.append((i, float(x), float(y), 1.0))
+
+                frames.append((self.parse_time(row["time"]), landmarks))
+
+        return frames
+
+    def parse_time(self, curr_time):
+        """
+        parses a time formatted as "h:mm:ss.cc" back to seconds
+
+        """
+        hours, minutes, seconds = curr_time.split(":")
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
 
     def write(self, name):
         """
@@ -83,14 +129,15 @@ class File:
         if not os.path.exists(self.file_path):
             os.mkdir(self.file_path)
 
-        """ make sure there are no existing files with duplicate names """
-        dir = os.scandir(self.file_path)
-        files = [a.name for a in dir]
-
         """ create an appropriate filename (display to terminal for debugging) """
-        name = f"{name}-" if name != "" else ""
-        fname = f"{self.file_path}/{name}{self.create_filename()}"
-        print(f"saved file: {fname}") if fname not in files else print("file exists")
+        prefix = f"{name}-" if name != "" else ""
+        fname = f"{self.file_path}/{prefix}{self.create_filename()}"
+
+        """ make sure there are no existing files with duplicate names """
+        if not os.path.exists(fname):
+            print(f"saved file: {fname}")
+        else:
+            print("file exists")
 
         """ create a csv file and write to it """
         with open(fname, "w", newline="") as new_file:
@@ -100,6 +147,30 @@ class File:
             for d in self._data:
                 writer.writerow(d)
 
+        """ add the session to the session store """
+        if self._store is not None:
+            self.write_store(name)
+
+    def write_store(self, name_id):
+        """
+        adds the parsed data to the session store
+
+        """
+        counts = {key: self._data[-1][key] for key in self._movements}
+
+        samples = (
+            (
+                t,
+                json.dumps({key: d[key] for key in self._movements}),
+                pack_landmarks([d[i] for i in range(33) if i in d]),
+            )
+            for t, d in zip(self._times, self._data)
+        )
+
+        self._store.add_session(
+            name_id, self._created_time, self._times[-1], counts, samples
+        )
+
     def create_filename(self):
         """
         creates a unique filename using the current system time and date
@@ -107,20 +178,79 @@ class File:
         """
         return f'{time.strftime("%y%m%d-%H%M%S")}.csv'
 
+    def get_data(self):
+        """
+        returns the parsed data
+
+        """
+        return self._data
+
+    def get_state(self, start=0):
+        """
+        returns the parsed data and sampling state (eg: to checkpoint a job)
+        only contains lists, dictionaries and numbers, so it can be saved as json
+        (each sample is a list of (key, value) pairs, since landmark keys are numbers)
+        start: index of the first sample returned (eg: the samples since the last
+            checkpoint)
+
+        """
+        return {
+            "created_time": self._created_time,
+            "data": [
+                [[key, value] for key, value in d.items()] for d in self._data[start:]
+            ],
+            "times": self._times[start:],
+            "keys": None if self._keys is None else self._keys.copy(),
+            "movements": self._movements,
+            "last_sample": self._last_sample,
+        }
+
+    def set_state(self, state):
+        """
+        restores the state returned by `get_state()`, so parsing continues where it
+        left off
+
+        """
+        self._created_time = state["created_time"]
+        self._data = [
+            {
+                key: tuple(value) if isinstance(value, list) else value
+                for key, value in d
+            }
+            for d in state["data"]
+        ]
+        self._times = list(state["times"])
+        self._keys = None if state["keys"] is None else state["keys"].copy()
+        self._movements = state["movements"]
+        self._last_sample = state["last_sample"]
+
+    def format_time(self, curr_time):
+        """
+        formats a time in seconds as "h:mm:ss.cc"
+
+        """
+        return "%d:%02d:%02d.%02d" % (
+            curr_time // 3600,
+            curr_time // 60 % 60,
+            curr_time % 60,
+            (curr_time % 1) * 100,
+        )
+
     def parse_movements(self, movements, landmarks, curr_time):
         """
         parses the movement data periodically and stores it to be written later
+        curr_time: frame timestamp in seconds since the start of the session
 
         """
         if not self._save_file:
             return
 
         """ init field names for csv file """
-        if self._prev_time == 0:
-            self._prev_time = time.time()
-            self._keys = [
+        if self._keys is None:
+            self._movements = [
                 key for key in movements.keys() if movements[key].get_tracking_status()
             ]
+            self._keys = self._movements.copy()
             self._keys.insert(0, "time")
             self._keys.insert(1, "")
             self._keys.append("")
@@ -128,24 +258,26 @@ class File:
             for i in range(33):
                 self._keys.append(i)
 
-        """ update data every ~100ms """
-        if time.time() > self._prev_time + 0.1:
-            data = {
-                "time": f"%d:%02d:%02d.%02d"
-                % (
-                    curr_time // 3600,
-                    curr_time // 60,
-                    curr_time % 60,
-                    (curr_time % 1) * 100,
-                )
-            }
-            for key, value in movements.items():
-                if movements[key].get_tracking_status():
-                    data[key] = value.get_count()
+        """ 
+        update data every sample period, driven by the frame timestamps so that 
+        the output does not depend on how fast the frames are processed
+        
+        """
+        if self._sample_period > 0:
+            sample = math.floor(curr_time / self._sample_period + 1e-6)
+            if sample <= self._last_sample:
+                return
+
+            self._last_sample = sample
+
+        data = {"time": self.format_time(curr_time)}
+        for key, value in movements.items():
+            if movements[key].get_tracking_status():
+                data[key] = value.get_count()
 
-            if len(landmarks) > 0:
-                for i, lm in enumerate(landmarks):
-                    data[i] = (round(lm[1], 5), round(lm[2], 5))
+        if len(landmarks) > 0:
+            for i, lm in enumerate(landmarks):
+                data[i] = (round(lm[1], 5), round(lm[2], 5))
 
-            self._data.append(data)
-            self._prev_time = time.time()
+        self._data.append(data)
+        self._times.append(curr_time)
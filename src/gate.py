@@ -0,0 +1,171 @@
+"""
+gate.py
+
+Motion gate module.
+Skips pose inference while the scene is static (eg: rest periods between reps).
+Each frame is compared to the last tracked frame on a small downscaled grayscale copy of
+the region around the detected person. If the difference is below a threshold, the
+previous landmarks are reused instead of running pose inference.
+
+Landmarks are only reused a limited number of frames in a row and only while a person
+is detected, so movements are never missed by more than a few frames.
+
+see "doc/gate.md" for more details
+
+"""
+
+import cv2, time, util
+import numpy as np
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class MotionGate:
+    """
+    motion gate: decides whether pose inference is needed for the current frame
+
+    """
+
+    """ padding around the detected person (as a fraction of the frame size) """
+    padding = 0.05
+
+    def __init__(
+        self,
+        threshold=util.GATE_THRESHOLD,
+        size=util.GATE_SIZE,
+        max_reuse=util.GATE_MAX_REUSE,
+    ):
+        """
+        threshold: mean absolute difference (grayscale levels) below which the scene is static
+        size: side length of the downscaled copy of the region that is compared
+        max_reuse: max number of frames in a row that landmarks are reused for
+
+        """
+        self._threshold = threshold
+        self._size = size
+        self._max_reuse = max_reuse
+
+        self._region = None
+        self.reset()
+
+    def get_params(self):
+        """
+        returns the gate parameters (reused landmarks are part of the tracking results)
+
+        """
+        return {
+            "threshold": self._threshold,
+            "size": self._size,
+            "max_reuse": self._max_reuse,
+        }
+
+    def reset(self):
+        """
+        clears the reference frame and the recorded stats
+
+        """
+        self._reference = None
+        self._reused = 0
+        self._stats = {"tracked": 0, "skipped": 0, "inference time": 0, "gate time": 0}
+
+    def should_track(self, img, landmarks):
+        """
+        returns True if pose inference should be run on the frame
+        landmarks: landmarks from the last tracked frame (reused if the frame is skipped)
+
+        """
+        start_time = time.process_time()
+        track = True
+
+        if (
+            len(landmarks) > 0
+            and self._reference is not None
+            and self._reused < self._max_reuse
+        ):
+            small = self.get_small(img, self._region)
+            if self._reference.shape == small.shape:
+                difference = cv2.absdiff(small, self._reference).mean()
+                track = bool(difference >= self._threshold)
+
+        if track:
+            self._reused = 0
+            self._reference = None
+        else:
+            self._reused += 1
+            self._stats["skipped"] += 1
+
+        self._stats["gate time"] += time.process_time() - start_time
+        return track
+
+    def set_reference(self, img, landmarks, inference_time):
+        """
+        stores the tracked frame that the following frames are compared to
+        inference_time: cpu time (seconds) taken by pose inference on the frame
+
+        """
+        self._stats["tracked"] += 1
+        self._stats["inference time"] += inference_time
+
+        if len(landmarks) == 0:
+            self._reference = None
+            return
+
+        start_time = time.process_time()
+        self._region = self.get_region(img, landmarks)
+        self._reference = self.get_small(img, self._region)
+        self._stats["gate time"] += time.process_time() - start_time
+
+    def get_region(self, img, landmarks):
+        """
+        returns the (x min, y min, x max, y max) pixel region around the detected person
+
+        """
+        height, width, _ = img.shape
+        xs = [x for _, x, _, _ in landmarks]
+        ys = [y for _, _, y, _ in landmarks]
+
+        x_min = int(np.clip(min(xs) - self.padding, 0, 1) * width)
+        x_max = int(np.clip(max(xs) + self.padding, 0, 1) * width)
+        y_min = int(np.clip(min(ys) - self.padding, 0, 1) * height)
+        y_max = int(np.clip(max(ys) + self.padding, 0, 1) * height)
+
+        """ use the whole frame if the person is not inside the frame """
+        if x_max - x_min < 2 or y_max - y_min < 2:
+            return 0, 0, width, height
+
+        return x_min, y_min, x_max, y_max
+
+    def get_small(self, img, region):
+        """
+        returns a small downscaled grayscale copy of the region
+
+        """
+        x_min, y_min, x_max, y_max = region
+        small = cv2.resize(
+            img[y_min:y_max, x_min:x_max],
+            (self._size, self._size),
+            interpolation=cv2.INTER_AREA,
+        )
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def get_stats(self):
+        """
+        returns the number of frames tracked and skipped, the skip rate and
+        an estimate of the cpu time saved (seconds) since the last reset
+
+        """
+        tracked, skipped = self._stats["tracked"], self._stats["skipped"]
+        frames = tracked + skipped
+        inference_time = self._stats["inference time"] / tracked if tracked > 0 else 0
+
+        return {
+            "tracked": tracked,
+            "skipped": skipped,
+            "skip rate": skipped / frames if frames > 0 else 0,
+            "time saved": skipped * inference_time - self._stats["gate time"],
+        }
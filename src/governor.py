@@ -0,0 +1,233 @@
+"""
+governor.py
+
+CPU resource governor module.
+OpenCV, MediaPipe (TFLite) and numpy each start their own thread pool sized to the whole
+machine, so running several pipelines side by side (eg: the worker processes in
+"parallel.py") starts many more threads than there are cores and the machine thrashes.
+The governor gives each worker process a cpu budget:
+- caps the OpenCV and OpenMP/BLAS/TFLite thread pools to the worker's threads
+- optionally pins each worker to its own set of cores
+- picks the number of workers from the cores available to the process, and keeps the
+  total number of threads within them
+
+Usage: `python src/governor.py <video> [--max-workers N] [--threads N] [--pin]`
+(benchmarks total throughput against the number of workers)
+
+see "doc/governor.md" for more details
+
+"""
+
+import cv2, os, time, argparse, util
+from contextlib import contextmanager
+from multiprocessing import get_context
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+""" environment variables read by thread pools when they start """
+THREAD_VARIABLES = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+    "TF_NUM_INTEROP_THREADS",
+]
+
+
+def get_cores():
+    """
+    returns the list of cores available to this process
+    (respects cpu affinity set by the os / container, if supported)
+
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+
+    return list(range(os.cpu_count() or 1))
+
+
+@contextmanager
+def thread_variables(threads):
+    """
+    sets the thread pool environment variables while creating processes, so their
+    thread pools start capped (the variables of this process are restored afterwards)
+
+    """
+    previous = {variable: os.environ.get(variable) for variable in THREAD_VARIABLES}
+    for variable in THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+
+    try:
+        yield
+    finally:
+        for variable, value in previous.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+
+def limit_threads(threads):
+    """
+    caps the thread pools of the current process to the given number of threads
+    environment variables only apply to thread pools that have not started yet (eg:
+    TFLite, which starts when motion tracking is set up), the OpenBLAS / OpenMP pools
+    of numpy and opencv start on import (see `Governor.create_pool()`)
+
+    """
+    for variable in THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+
+    cv2.setNumThreads(threads)
+
+
+def set_affinity(cores):
+    """
+    pins the current process to the given cores
+    returns False if cpu affinity is not supported (eg: windows and macos)
+
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return False
+
+    os.sched_setaffinity(0, cores)
+    return True
+
+
+def init_worker(threads, affinity=None):
+    """
+    pool initializer: applies the cpu budget to a worker process
+    affinity: queue of core sets, each worker takes its own set (optional)
+
+    """
+    limit_threads(threads)
+
+    if affinity is not None:
+        set_affinity(affinity.get())
+
+
+class Governor:
+    """
+    cpu resource governor: works out the cpu budget of each worker process and
+    creates worker pools that apply it
+
+    """
+
+    def __init__(self, workers=None, threads=util.WORKER_THREADS, pin=False):
+        """
+        workers: number of worker processes (defaults to the available cores
+            divided by the threads of each worker)
+        threads: number of threads each worker may use
+        pin: True to pin each worker to its own set of cores
+
+        the budget is kept within the available cores: there are at most as many
+        workers as cores, and the threads of each worker are reduced so the total
+        number of threads is not more than the cores
+
+        """
+        self._cores = get_cores()
+        self._threads = max(1, threads)
+        self._workers = (
+            workers
+            if workers is not None
+            else max(1, len(self._cores) // self._threads)
+        )
+        self._workers = max(1, min(self._workers, len(self._cores)))
+        self._threads = max(1, min(self._threads, len(self._cores) // self._workers))
+        self._pin = pin
+
+    def get_workers(self):
+        return self._workers
+
+    def get_threads(self):
+        return self._threads
+
+    def get_core_sets(self):
+        """
+        returns the set of cores each worker is pinned to (no two workers share a core)
+
+        """
+        return [
+            {self._cores[worker * self._threads + i] for i in range(self._threads)}
+            for worker in range(self._workers)
+        ]
+
+    def create_pool(self, workers=None):
+        """
+        returns a process pool whose workers apply the cpu budget when they start
+        workers: number of worker processes (at most the governor's workers)
+
+        the OpenBLAS / OpenMP thread pools of numpy and opencv start when they are
+        imported, and forked workers inherit the pools of this process, so workers are
+        spawned with the thread pool environment variables already set
+
+        """
+        workers = min(workers, self._workers) if workers is not None else self._workers
+        context = get_context("spawn")
+
+        affinity = None
+        if self._pin and hasattr(os, "sched_setaffinity"):
+            affinity = context.Queue()
+            for cores in self.get_core_sets()[:workers]:
+                affinity.put(cores)
+
+        with thread_variables(self._threads):
+            return context.Pool(
+                workers, initializer=init_worker, initargs=(self._threads, affinity)
+            )
+
+
+def benchmark(name, max_workers=None, threads=util.WORKER_THREADS, pin=False):
+    """
+    processes a video with 1 to `max_workers` workers (see "parallel.py")
+    returns a list of (workers, frames per second) of the total throughput
+
+    """
+    from parallel import process_video
+
+    cap = cv2.VideoCapture(name)
+    num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    max_workers = (
+        max_workers if max_workers is not None else Governor(threads=threads).get_workers()
+    )
+
+    results = []
+    for workers in range(1, max_workers + 1):
+        start_time = time.perf_counter()
+        process_video(name, workers=workers, save=False, threads=threads, pin=pin)
+        elapsed = time.perf_counter() - start_time
+
+        results.append((workers, num_frames / elapsed))
+        print(f"{workers} workers: {round(results[-1][1], 1)} fps")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="benchmark total throughput against the number of workers"
+    )
+    parser.add_argument("video", help="video file to process")
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=util.WORKER_THREADS)
+    parser.add_argument("--pin", action="store_true", help="pin workers to cores")
+    args = parser.parse_args()
+
+    print(f"{len(get_cores())} cores available, {args.threads} threads per worker")
+    results = benchmark(args.video, args.max_workers, args.threads, args.pin)
+
+    best = max(results, key=lambda result: result[1])
+    print(f"best: {best[0]} workers ({round(best[1], 1)} fps)")
+
+
+if __name__ == "__main__":
+    main()
@@ -71,6 +71,11 @@ class Ui_MainWindow(object):
         font.setPointSize(16)
         self.name_id_lineEdit.setFont(font)
         self.name_id_lineEdit.setObjectName("name_id_lineEdit")
+        self.timeline_slider = QtWidgets.QSlider(self.centralwidget)
+        self.timeline_slider.setEnabled(False)
+        self.timeline_slider.setGeometry(QtCore.QRect(470, 725, 810, 50))
+        self.timeline_slider.setOrientation(QtCore.Qt.Horizontal)
+        self.timeline_slider.setObjectName("timeline_slider")
         MainWindow.setCentralWidget(self.centralwidget)
         self.menubar = QtWidgets.QMenuBar(MainWindow)
         self.menubar.setGeometry(QtCore.QRect(0, 0, 1916, 18))
@@ -85,12 +90,15 @@ class Ui_MainWindow(object):
         self.actionOpen.setObjectName("actionOpen")
         self.actionWebcam = QtWidgets.QAction(MainWindow)
         self.actionWebcam.setObjectName("actionWebcam")
+        self.actionQueue_Videos = QtWidgets.QAction(MainWindow)
+        self.actionQueue_Videos.setObjectName("actionQueue_Videos")
         self.actionGenerate_CSV_File = QtWidgets.QAction(MainWindow)
         self.actionGenerate_CSV_File.setCheckable(True)
         self.actionGenerate_CSV_File.setChecked(True)
         self.actionGenerate_CSV_File.setObjectName("actionGenerate_CSV_File")
         self.menuFile.addAction(self.actionOpen)
         self.menuFile.addAction(self.actionWebcam)
+        self.menuFile.addAction(self.actionQueue_Videos)
         self.menuFile.addAction(self.actionGenerate_CSV_File)
         self.menubar.addAction(self.menuFile.menuAction())
 
@@ -115,6 +123,7 @@ class Ui_MainWindow(object):
         self.menuFile.setTitle(_translate("MainWindow", "File"))
         self.actionOpen.setText(_translate("MainWindow", "Open"))
         self.actionWebcam.setText(_translate("MainWindow", "Webcam"))
+        self.actionQueue_Videos.setText(_translate("MainWindow", "Queue Videos"))
         self.actionGenerate_CSV_File.setText(
             _translate("MainWindow", "Generate CSV File")
         )
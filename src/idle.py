@@ -0,0 +1,133 @@
+"""
+idle.py
+
+Idle mode module.
+Reduces the cost of motion tracking while nobody is in view of the webcam. After a number
+of frames without a detected person, motion tracking switches to idle mode and only probes
+for a person a few times a second on a downscaled frame. Full-rate motion tracking resumes
+as soon as a person is detected. The time spent in each mode is recorded.
+
+see "doc/idle.md" for more details
+
+"""
+
+import cv2, time, util
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class IdleMonitor:
+    """
+    idle monitor: decides which frames motion tracking is run on
+
+    """
+
+    modes = ("active", "idle")
+
+    """ gaps between frames longer than this (seconds) are not counted (eg: pauses) """
+    max_frame_gap = 1
+
+    def __init__(
+        self,
+        idle_frames=util.IDLE_FRAMES,
+        probe_period=util.IDLE_PROBE_PERIOD,
+        probe_size=util.IDLE_PROBE_SIZE,
+    ):
+        """
+        idle_frames: number of frames without a detected person before switching to idle
+        probe_period: seconds between probes for a person while idle
+        probe_size: max side length of the frames probed while idle
+
+        """
+        self._idle_frames = idle_frames
+        self._probe_period = probe_period
+        self._probe_size = probe_size
+        self.reset()
+
+    def reset(self):
+        """
+        resets to active mode and clears the recorded mode times
+
+        """
+        self._idle = False
+        self._missed_frames = 0
+        self._last_probe = None
+        self._last_frame = None
+        self._mode_times = {mode: 0 for mode in self.modes}
+        self._frame_counts = {"tracked": 0, "skipped": 0}
+
+    def is_idle(self):
+        return self._idle
+
+    def get_mode(self):
+        return self.modes[self._idle]
+
+    def should_track(self):
+        """
+        called once per frame: returns True if motion tracking should be run on the frame
+        (every frame while active, one frame every probe period while idle)
+
+        """
+        now = time.perf_counter()
+        if self._last_frame is not None:
+            gap = min(now - self._last_frame, self.max_frame_gap)
+            self._mode_times[self.get_mode()] += gap
+        self._last_frame = now
+
+        track = not self._idle or now - self._last_probe >= self._probe_period
+        if track:
+            self._last_probe = now
+            self._frame_counts["tracked"] += 1
+        else:
+            self._frame_counts["skipped"] += 1
+
+        return track
+
+    def update(self, detected):
+        """
+        updates the mode from the result of motion tracking
+        switches to idle after `idle_frames` frames without a detected person,
+        and back to active as soon as a person is detected
+
+        """
+        if detected:
+            self._missed_frames = 0
+            self._idle = False
+            return
+
+        self._missed_frames += 1
+        if self._missed_frames >= self._idle_frames:
+            self._idle = True
+
+    def downscale(self, img):
+        """
+        downscales frames probed while idle (landmarks are normalised, so they do not
+        need to be adjusted)
+
+        """
+        height, width, _ = img.shape
+        scale = self._probe_size / max(width, height)
+        if not self._idle or scale >= 1:
+            return img
+
+        size = (int(width * scale), int(height * scale))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+    def get_mode_times(self):
+        """
+        returns the time (seconds) spent in each mode since the last reset
+
+        """
+        return self._mode_times.copy()
+
+    def get_frame_counts(self):
+        """
+        returns the number of frames tracked and skipped since the last reset
+
+        """
+        return self._frame_counts.copy()
@@ -0,0 +1,245 @@
+"""
+inference.py
+
+Inference process module.
+Runs webcam capture and pose inference in a separate process, so that capture, the
+"MediaPipe Pose Estimation" library and the gui do not contend for the same interpreter
+lock. Frames and landmarks are passed back through a shared memory ring buffer
+(see "shm.py") rather than being pickled, and the gui process only reads the latest frame.
+
+Usage: `python src/inference.py [--device N] [--seconds S]` (headless benchmark)
+
+see "doc/inference.md" for more details
+
+"""
+
+import cv2, sys, time, weakref, argparse, threading, util
+from functools import partial
+import multiprocessing as mp
+from motion import Motion
+from capture import CapturePolicy
+from cache import to_array
+from shm import FrameRing
+from source import SharedMemorySource, WebcamSource
+from idle import IdleMonitor
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+""" held while the main module is swapped out to start a capture process """
+_main_lock = threading.Lock()
+
+
+class InferenceSource(SharedMemorySource):
+    """
+    inference process source: reads frames and landmarks from a capture and
+    inference process through shared memory
+
+    """
+
+    name = "inference process"
+
+    """ seconds to wait for the capture process to open the webcam """
+    start_timeout = 10
+
+    def __init__(
+        self, open_source=WebcamSource, slots=util.SHM_SLOTS, timeout=5, gate=True
+    ):
+        """
+        open_source: creates the frame source in the capture process
+        (must be picklable, eg: a frame source class)
+        slots: number of frames held in the ring buffer
+        timeout: seconds to wait for a new frame before giving up
+        gate: True to reuse landmarks while the scene is static (see "gate.py")
+
+        """
+        """ spawn (rather than fork) so the capture process does not inherit qt """
+        context = mp.get_context("spawn")
+        connection, process_connection = context.Pipe()
+        self._stop = context.Event()
+        self._process = context.Process(
+            target=track_frames,
+            args=(open_source, process_connection, self._stop, gate),
+            daemon=True,
+        )
+        start_process(self._process)
+
+        """ the capture process negotiates the frame size before the ring is created """
+        negotiated = None
+        if connection.poll(self.start_timeout):
+            negotiated = connection.recv()
+
+        if negotiated is None:
+            self._ring = None
+            self._opened = False
+            self._timestamp, self._index = 0, -1
+            self._landmarks = None
+            self._finalizer = weakref.finalize(
+                self, stop_process, self._stop, self._process, None
+            )
+            return
+
+        width, height, self._fps, self._fourcc = negotiated
+        ring = FrameRing(size=(width, height), slots=slots)
+        connection.send(ring.get_name())
+
+        """ stop the capture process and free the ring when the source is released """
+        self._finalizer = weakref.finalize(
+            self, stop_process, self._stop, self._process, ring
+        )
+        super().__init__(ring.get_name(), timeout=timeout)
+
+    def read(self, img=None):
+        """
+        waits for a new frame and returns a copy of it (copied into `img` if given)
+        returns (False, None) once the capture process has stopped
+
+        """
+        if self._ring is None:
+            return False, None
+        if not self._process.is_alive():
+            self._ring.close_ring()
+
+        return super().read(img)
+
+    def get(self, prop):
+        if self._ring is None:
+            return 0
+        if prop == cv2.CAP_PROP_FPS:
+            return self._fps
+        if prop == cv2.CAP_PROP_FOURCC:
+            return self._fourcc
+
+        return super().get(prop)
+
+    def release(self):
+        if self._ring is not None:
+            super().release()
+
+        self._finalizer()
+
+
+def open_webcam(device=0, gate=True):
+    """
+    returns an inference process source for a webcam device
+    (used by the supervised capture to reconnect, see "capture.py")
+
+    """
+    return InferenceSource(partial(WebcamSource, device), gate=gate)
+
+
+def start_process(process):
+    """
+    starts a spawned process without running the parent's main module in it
+    spawned processes import the parent's main module again before running their
+    target (eg: "main.py", which imports qt and the gui), so this module stands in as
+    the main module while the process starts
+
+    """
+    with _main_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = sys.modules[__name__]
+        try:
+            process.start()
+        finally:
+            sys.modules["__main__"] = main
+
+
+def stop_process(stop, process, ring):
+    """
+    stops the capture process and frees the ring buffer
+
+    """
+    stop.set()
+    process.join(timeout=2)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+
+    if ring is not None:
+        ring.close()
+        ring.unlink()
+
+
+def track_frames(open_source, connection, stop, gate=True):
+    """
+    capture process: reads frames, runs pose inference and writes the frames and
+    landmarks to the ring buffer until stopped
+
+    """
+    source = open_source()
+    if not source.isOpened():
+        connection.send(None)
+        return
+
+    """ negotiate the frame size, then wait for the ring buffer to be created """
+    policy = CapturePolicy()
+    width, height, _, _ = source.apply_policy(policy)
+    fps, fourcc = source.get(cv2.CAP_PROP_FPS), source.get(cv2.CAP_PROP_FOURCC)
+    connection.send((width, height, fps, fourcc))
+
+    ring = FrameRing(name=connection.recv(), create=False)
+    motion = Motion(gate=gate)
+    motion.crop = {"start": util.INIT, "end": (width, height)}
+    motion.idle = IdleMonitor()
+
+    img = None
+    try:
+        while source.isOpened() and not stop.is_set():
+            ret, img = source.read(img)
+            if ret == False or img is None:
+                break
+
+            img = policy.resize(img)
+            if img.shape[1] != width or img.shape[0] != height:
+                img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+
+            """ frames without a detected person are written with empty landmarks """
+            landmarks = motion.find_landmarks(img, [])
+            ring.write(
+                img, source.get_timestamp(), source.get_index(), to_array(landmarks)
+            )
+    finally:
+        ring.close_ring()
+        ring.close()
+        source.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the inference process")
+    parser.add_argument("--device", type=int, default=0)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    source = open_webcam(args.device)
+    if not source.isOpened():
+        print("error opening video stream")
+        return
+
+    metadata = source.get_metadata()
+    frames, detected = 0, 0
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < args.seconds:
+        ret, _ = source.read()
+        if ret == False:
+            break
+
+        frames += 1
+        detected += len(source.get_landmarks()) > 0
+
+    elapsed = time.perf_counter() - start_time
+    captured = source.get_index() + 1
+    source.release()
+
+    print(f"{metadata['width']} x {metadata['height']}")
+    print(f"captured {captured} frames, read {frames} frames")
+    print(f"{round(frames / elapsed, 1)} fps, person detected in {detected} frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,579 @@
+"""
+jobs.py
+
+Job queue module.
+Persisted priority queue of videos to be analysed in the background (eg: while the gui
+is not recording). Each job periodically checkpoints its movement counter state, parsed
+session data and landmarks to the job database, so an interrupted job (laptop sleep,
+crash or exit) picks up from its last checkpoint rather than from the first frame.
+
+When a job finishes, its session data is saved (csv file and session store) and its
+landmarks are added to the landmark cache, so opening the video afterwards skips motion
+tracking.
+
+Usage: `python src/jobs.py add <video> [<video> ...] [--priority N] [--name-id ID]`,
+`python src/jobs.py list`, `python src/jobs.py run` or `python src/jobs.py remove <id>`
+
+see "doc/jobs.md" for more details
+
+"""
+
+import cv2, os, json, time, signal, sqlite3, argparse, threading, util
+import numpy as np
+from contextlib import closing
+from movement import create_movements
+from motion import Motion
+from file import File
+from cache import LandmarkCache, to_array, to_landmarks
+from store import SessionStore
+from parallel import seek, replay
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+""" job status """
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    job queue: sqlite database of queued videos and their checkpoints
+
+    """
+
+    schema = [
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            name_id TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            frame INTEGER NOT NULL DEFAULT 0,
+            state BLOB,
+            result TEXT
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS jobs_status_priority
+        ON jobs (status, priority DESC, created_at)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS chunks (
+            job_id INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+            start INTEGER NOT NULL,
+            timestamps BLOB NOT NULL,
+            landmarks BLOB NOT NULL,
+            PRIMARY KEY (job_id, start)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS samples (
+            job_id INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+            start INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (job_id, start)
+        ) WITHOUT ROWID
+        """,
+    ]
+
+    def __init__(self, path=util.DEFAULT_JOBS_PATH):
+        """
+        path: path to the job database file
+        jobs left running by an interrupted program are queued again
+
+        """
+        self._path = path
+
+        directory = os.path.dirname(self._path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with closing(self.connect()) as db:
+            db.execute("PRAGMA journal_mode = WAL")
+            with db:
+                for statement in self.schema:
+                    db.execute(statement)
+
+                db.execute(
+                    "UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING)
+                )
+
+    def connect(self):
+        """
+        opens a new connection to the database
+        (a connection is opened per call so the queue can be used from any thread)
+
+        """
+        db = sqlite3.connect(self._path, timeout=10)
+        db.execute("PRAGMA foreign_keys = ON")
+        return db
+
+    def add(self, name, name_id="", priority=0):
+        """
+        adds a video to the queue (jobs with a higher priority are processed first)
+        returns the id of the new job
+
+        """
+        with closing(self.connect()) as db:
+            with db:
+                cursor = db.execute(
+                    "INSERT INTO jobs (name, name_id, priority, status, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (os.path.abspath(name), name_id, priority, QUEUED, time.time()),
+                )
+                return cursor.lastrowid
+
+    def get_jobs(self):
+        """
+        returns the (id, name, priority, status, frame, result) of every job
+        in the order they are processed
+
+        """
+        with closing(self.connect()) as db:
+            return db.execute(
+                "SELECT id, name, priority, status, frame, result FROM jobs "
+                "ORDER BY status = 'done', priority DESC, created_at"
+            ).fetchall()
+
+    def next_job(self):
+        """
+        takes the queued job with the highest priority and marks it as running
+        returns (id, name, name_id, frame, state) or None if no jobs are queued
+
+        """
+        with closing(self.connect()) as db:
+            with db:
+                job = db.execute(
+                    "SELECT id, name, name_id, frame, state FROM jobs "
+                    "WHERE status = ? ORDER BY priority DESC, created_at LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+
+                if job is None:
+                    return None
+
+                db.execute("UPDATE jobs SET status = ? WHERE id = ?", (RUNNING, job[0]))
+
+        job_id, name, name_id, frame, state = job
+        if not state:
+            return job_id, name, name_id, frame, None
+
+        try:
+            return job_id, name, name_id, frame, json.loads(state)
+        except ValueError:
+            """ checkpoints that can not be read are discarded (the job starts over) """
+            self.clear_checkpoints(job_id)
+            return job_id, name, name_id, 0, None
+
+    def checkpoint(
+        self, job_id, frame, state, start, timestamps, landmarks, samples=None
+    ):
+        """
+        saves the landmarks and session data samples parsed since the last checkpoint
+        and the job state in a single transaction (a job always resumes from a complete
+        checkpoint), so each checkpoint only writes what is new
+        frame: index of the next frame to be processed
+        state: movement counter states and session data sampling state (json)
+        start: index of the first frame of the landmarks
+        samples: (index of the first sample, samples, sample times) parsed since the
+            last checkpoint (see `File.get_state()`)
+
+        """
+        with closing(self.connect()) as db:
+            with db:
+                if len(timestamps) > 0:
+                    db.execute(
+                        "INSERT OR REPLACE INTO chunks "
+                        "(job_id, start, timestamps, landmarks) VALUES (?, ?, ?, ?)",
+                        (
+                            job_id,
+                            start,
+                            np.array(timestamps, dtype=np.float64).tobytes(),
+                            np.array([to_array(lm) for lm in landmarks]).tobytes(),
+                        ),
+                    )
+
+                if samples is not None and len(samples[1]) > 0:
+                    sample_start, data, times = samples
+                    db.execute(
+                        "INSERT OR REPLACE INTO samples (job_id, start, data) "
+                        "VALUES (?, ?, ?)",
+                        (job_id, sample_start, json.dumps([data, times])),
+                    )
+
+                db.execute(
+                    "UPDATE jobs SET frame = ?, state = ? WHERE id = ?",
+                    (frame, json.dumps(state), job_id),
+                )
+
+    def get_landmarks(self, job_id):
+        """
+        returns the timestamps and landmarks of every processed frame of a job
+        (timestamps, list of landmark lists)
+
+        """
+        with closing(self.connect()) as db:
+            rows = db.execute(
+                "SELECT timestamps, landmarks FROM chunks WHERE job_id = ? "
+                "ORDER BY start",
+                (job_id,),
+            ).fetchall()
+
+        timestamps, landmarks = [], []
+        for t, lm in rows:
+            timestamps += np.frombuffer(t, dtype=np.float64).tolist()
+            arrays = np.frombuffer(lm, dtype=np.float32).reshape(-1, 33, 4)
+            landmarks += [to_landmarks(array) for array in arrays]
+
+        return timestamps, landmarks
+
+    def get_samples(self, job_id):
+        """
+        returns the session data samples and sample times parsed by a job so far
+        (see `File.get_state()`)
+
+        """
+        with closing(self.connect()) as db:
+            rows = db.execute(
+                "SELECT data FROM samples WHERE job_id = ? ORDER BY start", (job_id,)
+            ).fetchall()
+
+        data, times = [], []
+        for (row,) in rows:
+            chunk_data, chunk_times = json.loads(row)
+            data += chunk_data
+            times += chunk_times
+
+        return data, times
+
+    def clear_checkpoints(self, job_id):
+        """
+        deletes the checkpoints of a job (the job starts from the first frame)
+
+        """
+        with closing(self.connect()) as db:
+            with db:
+                db.execute("DELETE FROM chunks WHERE job_id = ?", (job_id,))
+                db.execute("DELETE FROM samples WHERE job_id = ?", (job_id,))
+                db.execute(
+                    "UPDATE jobs SET frame = 0, state = NULL WHERE id = ?", (job_id,)
+                )
+
+    def set_status(self, job_id, status, result=None):
+        """
+        sets the status of a job
+        the checkpoints of finished jobs are deleted (the landmarks are cached)
+
+        """
+        with closing(self.connect()) as db:
+            with db:
+                db.execute(
+                    "UPDATE jobs SET status = ?, result = ? WHERE id = ?",
+                    (status, result, job_id),
+                )
+
+                if status == DONE:
+                    db.execute("DELETE FROM chunks WHERE job_id = ?", (job_id,))
+                    db.execute("DELETE FROM samples WHERE job_id = ?", (job_id,))
+                    db.execute("UPDATE jobs SET state = NULL WHERE id = ?", (job_id,))
+
+    def set_priority(self, job_id, priority):
+        with closing(self.connect()) as db:
+            with db:
+                db.execute(
+                    "UPDATE jobs SET priority = ? WHERE id = ?", (priority, job_id)
+                )
+
+    def remove(self, job_id):
+        """
+        removes a job along with its checkpoints
+
+        """
+        with closing(self.connect()) as db:
+            with db:
+                db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+class JobRunner:
+    """
+    job runner: processes queued jobs one at a time on a background thread
+    jobs are only processed while the runner is resumed (eg: while the gui is idle)
+
+    """
+
+    def __init__(
+        self,
+        queue,
+        cache=None,
+        store=None,
+        checkpoint_frames=util.JOB_CHECKPOINT_FRAMES,
+        overlap=util.SEGMENT_OVERLAP,
+    ):
+        """
+        queue: job queue to process
+        cache: landmark cache the landmarks of finished jobs are added to (optional)
+        store: session store the sessions of finished jobs are added to (optional)
+        checkpoint_frames: number of frames processed between checkpoints
+        overlap: number of frames tracked before a checkpoint when a job is resumed
+            (so motion tracking has warmed up, see "parallel.py")
+
+        """
+        self._queue = queue
+        self._cache = cache
+        self._store = store
+        self._checkpoint_frames = checkpoint_frames
+        self._overlap = overlap
+
+        self._running = threading.Event()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._job = None
+
+    def start(self):
+        """
+        starts the runner thread (jobs are processed once resumed)
+
+        """
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        checkpoints the current job and stops the runner thread
+
+        """
+        self._stopped = True
+        self._running.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def pause(self):
+        """
+        checkpoints the current job and stops processing until resumed
+        (the job is resumed from the checkpoint)
+
+        """
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+        self._wake.set()
+
+    def notify(self):
+        """
+        wakes the runner up to check for new jobs
+
+        """
+        self._wake.set()
+
+    def get_job(self):
+        """
+        returns the id of the job being processed (None if idle)
+
+        """
+        return self._job
+
+    def should_stop(self):
+        return self._stopped or not self._running.is_set()
+
+    def run(self):
+        """
+        runner thread: processes the queued jobs in priority order
+
+        """
+        while not self._stopped:
+            self._running.wait()
+            if self._stopped:
+                break
+
+            job = self._queue.next_job()
+            if job is None:
+                self._wake.wait(timeout=1)
+                self._wake.clear()
+                continue
+
+            self._job = job[0]
+            run_job(
+                self._queue,
+                job,
+                self.should_stop,
+                self._cache,
+                self._store,
+                self._checkpoint_frames,
+                self._overlap,
+            )
+            self._job = None
+
+
+def run_job(queue, job, *args):
+    """
+    processes a job (see `process_job()`), marking the job as failed if it raises an
+    error (eg: the video was deleted)
+
+    """
+    try:
+        return process_job(queue, job, *args)
+    except Exception as error:
+        print(f'job {job[0]} failed: "{job[1]}" ({error})')
+        queue.set_status(job[0], FAILED, str(error))
+        return False
+
+
+def process_job(
+    queue,
+    job,
+    should_stop=lambda: False,
+    cache=None,
+    store=None,
+    checkpoint_frames=util.JOB_CHECKPOINT_FRAMES,
+    overlap=util.SEGMENT_OVERLAP,
+):
+    """
+    processes a job from its last checkpoint, checkpointing every `checkpoint_frames`
+    frames, until the video ends or `should_stop()` returns True
+    returns True if the job finished
+
+    """
+    job_id, name, name_id, frame, state = job
+    if not os.path.exists(name):
+        raise FileNotFoundError(name)
+
+    motion = Motion()
+    movements = create_movements()
+    file = File(save=True, store=store)
+
+    """ restore the counters and the parsed data from the last checkpoint """
+    if state is not None:
+        for key, movement_state in state["movements"].items():
+            movements[key].set_state(movement_state)
+
+        data, times = queue.get_samples(job_id)
+        file.set_state(dict(state["file"], data=data, times=times))
+
+    """ samples already saved (each checkpoint only saves the samples since the last) """
+    saved = len(file.get_data())
+
+    def save_checkpoint(index, start, timestamps, landmarks):
+        nonlocal saved
+        file_state = file.get_state(start=saved)
+        samples = (saved, file_state.pop("data"), file_state.pop("times"))
+        state = {
+            "movements": {key: m.get_state() for key, m in movements.items()},
+            "file": file_state,
+        }
+        queue.checkpoint(job_id, index, state, start, timestamps, landmarks, samples)
+        saved += len(samples[1])
+
+    """ tracking starts early so it has warmed up by the checkpoint """
+    index = max(0, frame - overlap)
+    cap = seek(cv2.VideoCapture(name), name, index)
+    start, timestamps, landmarks = frame, [], []
+    finished = False
+
+    try:
+        while True:
+            if should_stop():
+                break
+
+            ret, img = cap.read()
+            if ret == False or img is None:
+                finished = True
+                break
+
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+
+            height, width, _ = img.shape
+            motion.crop = {"start": util.INIT, "end": (width, height)}
+
+            frame_landmarks = []
+            motion.track_motion(img, frame_landmarks)
+
+            if index >= frame:
+                replay([(index, timestamp, frame_landmarks)], movements, file)
+                timestamps.append(timestamp)
+                landmarks.append(frame_landmarks)
+            index += 1
+
+            if len(timestamps) >= checkpoint_frames:
+                save_checkpoint(index, start, timestamps, landmarks)
+                start, timestamps, landmarks = index, [], []
+    finally:
+        cap.release()
+        motion.close()
+
+    save_checkpoint(max(index, frame), start, timestamps, landmarks)
+    if not finished:
+        queue.set_status(job_id, QUEUED)
+        print(f'job {job_id} paused at frame {max(index, frame)}: "{name}"')
+        return False
+
+    """ save the session data and cache the landmarks of the whole video """
+    file.write(name_id)
+    if cache is not None:
+        all_timestamps, all_landmarks = queue.get_landmarks(job_id)
+        key = cache.get_key(name, motion.get_params())
+        cache.put(key, all_timestamps, all_landmarks)
+
+    counts = {key: movement.get_count() for key, movement in movements.items()}
+    queue.set_status(job_id, DONE, json.dumps(counts))
+    print(f'job {job_id} done: "{name}" {counts}')
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="background video analysis jobs")
+    parser.add_argument("command", choices=["add", "list", "run", "remove"])
+    parser.add_argument("args", nargs="*", help="videos to add / job ids to remove")
+    parser.add_argument("--priority", type=int, default=0)
+    parser.add_argument("--name-id", default="")
+    parser.add_argument("--path", default=util.DEFAULT_JOBS_PATH)
+    args = parser.parse_args()
+
+    queue = JobQueue(args.path)
+
+    if args.command == "add":
+        for name in args.args:
+            print(f"added job {queue.add(name, args.name_id, args.priority)}: {name}")
+
+    elif args.command == "remove":
+        for job_id in args.args:
+            queue.remove(int(job_id))
+
+    elif args.command == "list":
+        for job_id, name, priority, status, frame, result in queue.get_jobs():
+            print(f"{job_id}: [{status}] priority {priority}, frame {frame}, {name}")
+            if result is not None:
+                print(f"    {result}")
+
+    else:
+        """ process all queued jobs (ctrl+c checkpoints the current job) """
+        stop = threading.Event()
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+        cache = LandmarkCache()
+        store = SessionStore()
+        while not stop.is_set():
+            job = queue.next_job()
+            if job is None:
+                break
+
+            run_job(queue, job, stop.is_set, cache, store)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,13 +14,30 @@ see "doc/main.md" for more details
 
 """
 
-import cv2, sys, time, util, config
+import cv2, os, sys, time, argparse, threading, util
 from PyQt5 import QtCore, QtWidgets, QtGui
 from gui import Ui_MainWindow
 from statistics import mean
-from movement import Movement
+from functools import partial
+from movement import create_movements
 from motion import Motion
 from file import File
+from capture import CapturePolicy, SupervisedCapture
+from cache import LandmarkCache, to_landmarks
+from store import SessionStore
+from replay import ReplaySource, load_csv
+from source import WebcamSource, VideoFileSource, ImageDirectorySource
+from inference import open_webcam
+from idle import IdleMonitor
+from server import StreamServer
+from events import EventStream, JsonlSink, UnixSocketSink
+from stats import SessionStats, format_summary
+from jobs import JobQueue, JobRunner
+from recorder import SessionRecorder
+from profiler import MemoryProfiler
+from people import PeopleTracker
+from dtw import create_template_movement, get_template_points, get_landmark
+from timeline import Timeline, load_index
 
 
 __author__ = "Mike Smith"
@@ -40,16 +57,36 @@ class MainThread(QtCore.QThread):
     image = QtCore.pyqtSignal(QtGui.QImage)
     frame_rate = QtCore.pyqtSignal(float)
     session_time = QtCore.pyqtSignal(int)
+    capture_status = QtCore.pyqtSignal(str)
+
+    """ review timeline signals: number of frames (0 if not available), frame shown """
+    timeline_ready = QtCore.pyqtSignal(int)
+    frame_index = QtCore.pyqtSignal(int)
 
     """ back-end signals to handle counting reps """
     right_arm_ext = QtCore.pyqtSignal(str)
     left_arm_ext = QtCore.pyqtSignal(str)
     sit_to_stand = QtCore.pyqtSignal(str)
 
-    def __init__(self, parent=None):
+    def __init__(
+        self,
+        parent=None,
+        inference_process=False,
+        server=None,
+        event_sinks=None,
+        recorder=None,
+        max_people=None,
+        motion_gate=True,
+        templates=None,
+        template_angles=None,
+    ):
         super().__init__(parent)
 
         self._cap = None
+        self._server = server
+        self._recorder = recorder
+        self._frame_buffer = None
+        self._inference_process = inference_process
         self._is_recording = False
         self._is_paused = False
         self._pause_time = 0
@@ -57,12 +94,72 @@ class MainThread(QtCore.QThread):
         self._start_time = None
         self._stop_time = None
         self._session_time = None
+        self._frame_time = None
+        self._sample_period = util.SAMPLE_PERIOD
+        self._replay_rate = None
         self._source = None
         self._delay = 0
         self._read_file = None
         self._write_file = None
         self._save_file = True
         self._name_id = ""
+        self._capture_policy = CapturePolicy()
+        self._landmark_cache = LandmarkCache()
+        self._session_store = SessionStore()
+        self._idle = IdleMonitor()
+
+        """ init motion capture (see "gate.py" for the motion gate) """
+        self._motion = Motion(gate=motion_gate)
+
+        """
+        template reps of movements also counted by dtw template matching (if enabled)
+        see `create_template_movement()` in "dtw.py"
+
+        """
+        self._templates = templates or {}
+        self._template_angles = template_angles or {}
+        self._template_movements = {}
+
+        """ tracks each person separately in group sessions (if enabled) """
+        self._people = PeopleTracker(max_people) if max_people is not None else None
+
+        """ rep events are delivered to the event sinks from a background thread """
+        self._events = EventStream()
+        for sink in event_sinks or []:
+            self._events.add_sink(sink)
+        self._events.start()
+
+        """ running statistics of the current session """
+        self._stats = SessionStats()
+
+        """ queued videos are analysed in the background while not recording """
+        self._job_queue = JobQueue()
+        self._jobs = JobRunner(
+            self._job_queue, self._landmark_cache, self._session_store
+        )
+        self._jobs.start()
+        self._jobs.resume()
+
+        self._cache_key = None
+        self._cached_landmarks = None
+        self._cache_frames = None
+
+        """ hashing a video takes seconds, so cache lookups run on a background thread """
+        self._cache_lookup = None
+        self._cache_lock = threading.Lock()
+
+        """ review timeline of the opened video (see "timeline.py") """
+        self._video_name = None
+        self._timeline = None
+        self._seek_index = None
+
+        """
+        set whenever playback may carry on (recording starts, the webcam is opened or
+        the program exits), so a stopped video waits without using any cpu (the review
+        timeline is scrubbed while the video is stopped)
+
+        """
+        self._resume = threading.Event()
 
     def run(self):
         """
@@ -75,16 +172,18 @@ class MainThread(QtCore.QThread):
         """ frame rate (for debugging) """
         frame_times = {"curr time": 0, "prev time": 0}
 
-        """ init motion capture """
-        self._motion = Motion()
-
         """ add and init movements """
         self.add_movements()
         self.reset_all_count()
 
         """ while camera / video file is opened """
         while self._cap.isOpened() and self._active:
-            ret, self._img = self._cap.read()
+            """ apply a seek from the review timeline once playback carries on """
+            if self._seek_index is not None and self._is_recording:
+                self.seek_capture()
+
+            """ read into the previous frame buffer (the frame is drawn on but not kept) """
+            ret, self._img = self._cap.read(self._frame_buffer)
 
             """ if camera not accessed or end of video """
             if ret == False or self._img is None:
@@ -92,8 +191,15 @@ class MainThread(QtCore.QThread):
                 if error accessing camera or end of video and program is not recording:
                 - keep iterating through the main while loop until an image signal is received
 
+                a disconnected webcam waits for its next reconnect attempt in `read()`
+                (without using any cpu), so the session carries on once it reconnects
+
                 """
-                if not self._is_recording:
+                if (
+                    not self._is_recording
+                    or self._source == util.WEBCAM
+                    or self._seek_index is not None
+                ):
                     continue
 
                 """ 
@@ -103,15 +209,28 @@ class MainThread(QtCore.QThread):
                 - wait until user switches back to the webcam
                 
                 """
+                if self._source == util.VIDEO:
+                    self.save_cached_landmarks()
+
                 self.start_stop_recording()
-                while not self._is_recording and self._source != util.WEBCAM:
-                    pass
+                self.wait_for_playback()
                 continue
 
+            self._frame_buffer = self._img
+
+            """ get the frame timestamp """
+            self._frame_time = self.get_frame_time()
+
+            """ resize frames that could not be captured at the negotiated size """
+            self._img = self._capture_policy.resize(self._img)
+
             """ get frame dimensions """
             height, width, _ = self._img.shape
             self._motion.crop = {"start": util.INIT, "end": (width, height)}
 
+            """ only probe for a person while nobody is in view of the webcam """
+            self._motion.idle = self._idle if self._source == util.WEBCAM else None
+
             """ display frame rate """
             frame_rate = self.get_frame_rate(frame_times)
             self.frame_rate.emit(frame_rate)
@@ -122,20 +241,20 @@ class MainThread(QtCore.QThread):
                 and self._is_recording
                 and not self._is_paused
             ):
-                self._session_time = time.time() - self._start_time - self._pause_time
+                self._session_time = self.get_session_time(self._frame_time)
                 self.session_time.emit(int(self._session_time))
 
             """ track motion and count movements (only when recording) """
             if self._is_recording and not self._is_paused:
-                self._pose_landmarks = []
-                self._img, self._pixels = self._motion.track_motion(
-                    self._img,
-                    self._pose_landmarks,
-                )
+                self.track_motion()
 
                 """ count the number of reps for each movement """
                 self.count_movements()
 
+                """ update the running session statistics """
+                if self._session_time is not None:
+                    self._stats.update(self._tracking_movements, self._session_time)
+
                 """ parse movement data to file object """
                 if self._session_time is not None:
                     self._write_file.parse_movements(
@@ -148,24 +267,48 @@ class MainThread(QtCore.QThread):
             if self._source == util.WEBCAM:
                 self._img = cv2.flip(self._img, 1)
 
+            """ record the annotated frame (if enabled, never waits for the encoder) """
+            if (
+                self._recorder is not None
+                and self._is_recording
+                and not self._is_paused
+                and self._session_time is not None
+            ):
+                self._recorder.write(self._img, self._session_time)
+
             """ emit image signal to the main-window thread to be displayed """
             self._img = cv2.cvtColor(self._img, cv2.COLOR_BGR2RGB)
-            QtImg = QtGui.QImage(
-                self._img.data, width, height, QtGui.QImage.Format_RGB888
-            ).scaled(int(1280 - 128 / 8), int(720 - 72 / 8), QtCore.Qt.KeepAspectRatio)
-            self.image.emit(QtImg)
+            self.image.emit(self.to_qimage(self._img))
+
+            """ move the review timeline along with the video """
+            if self._timeline is not None and self._source == util.VIDEO:
+                self.frame_index.emit(self._cap.get_index())
+
+            """ broadcast the preview and counts to other displays (if enabled) """
+            if self._server is not None:
+                self._server.publish_frame(self._img)
+                self._server.publish_state(self.get_state())
 
-            """ maintain max frame rate of ~30fps (mainly for smooth video playback) """
-            self._delay = self._delay + 0.001 if frame_rate - 30 > 0 else 0
-            time.sleep(self._delay)
+            """ 
+            maintain max frame rate of ~30fps (mainly for smooth video playback)
+            replayed sessions are played back at the rate set by the replay source
+            
+            """
+            if self._source != util.REPLAY:
+                self._delay = self._delay + 0.001 if frame_rate - 30 > 0 else 0
+                time.sleep(self._delay)
 
             """ pause video if stop button is pressed """
-            while not self._is_recording and self._source != util.WEBCAM:
-                pass
+            self.wait_for_playback()
 
         """ handles program exit """
         cv2.destroyAllWindows()
         self._cap.release()
+        self._motion.close()
+        if self._people is not None:
+            self._people.close()
+        if self._timeline is not None:
+            self._timeline.close()
 
     def stop(self):
         """
@@ -173,8 +316,19 @@ class MainThread(QtCore.QThread):
 
         """
         self._active = False
+        self._resume.set()
         self.wait()
 
+    def wait_for_playback(self):
+        """
+        waits while a video is stopped, until recording starts again, the webcam is
+        opened or the program exits (see `self._resume`)
+
+        """
+        while not self._is_recording and self._source != util.WEBCAM and self._active:
+            self._resume.wait()
+            self._resume.clear()
+
     def start_video_capture(self):
         """
         starts video capture from webcam by default
@@ -191,47 +345,105 @@ class MainThread(QtCore.QThread):
 
         """
         if name is not None:
-            cap = cv2.VideoCapture(name)
-            self._source = util.VIDEO
-            self.set_frame_dimensions(cap, "video")
-
-            if not self._is_recording:
-                self.start_stop_recording()
-            else:
-                self.start_stop_recording()
-                self.start_stop_recording()
-
-            self._start_time = time.time()
-            self.reset_all_count()
+            cap = self.open_source(VideoFileSource(name))
 
             if cap.isOpened():
                 return cap
 
-        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-        self._source = util.WEBCAM
-        self.set_frame_dimensions(cap, "webcam")
+        return self.get_webcam_capture()
 
-        if self._is_recording:
-            self.start_stop_recording()
+    def get_webcam_capture(self):
+        """
+        get video capture from the webcam
+        capture and pose inference run in a separate process if enabled
+        the webcam is reconnected if it is disconnected or not found (see "capture.py")
+
+        """
+        open_source = WebcamSource
+        if self._inference_process:
+            open_source = partial(open_webcam, gate=self._motion.gate is not None)
+
+        return self.open_source(
+            SupervisedCapture(open_source, on_status=self.capture_status.emit)
+        )
+
+    def open_source(self, cap):
+        """
+        starts reading frames from a frame source (see "source.py")
+        recording starts automatically for recorded sources
+        (eg: video files, image sequences and replayed sessions)
+
+        """
+        self._source = cap.get_source_type()
+        self._resume.set()
+        self.set_frame_dimensions(cap, cap.name)
+
+        if self._source != util.VIDEO:
+            with self._cache_lock:
+                self._cache_lookup = None
+                self._cached_landmarks = None
+                self._cache_frames = None
+
+        if self._source == util.WEBCAM:
+            if self._is_recording:
+                self.start_stop_recording()
 
-        if cap.isOpened():
             return cap
 
-        print("error opening video stream or file")
-        return None
+        if not self._is_recording:
+            self.start_stop_recording()
+        else:
+            self.start_stop_recording()
+            self.start_stop_recording()
+
+        self._start_time = time.time()
+        self.reset_all_count()
+        return cap
+
+    def get_frame_time(self):
+        """
+        gets the timestamp of the current frame in seconds from the frame source
+        (the position in the video for files, the capture time for the webcam)
+
+        """
+        return self._cap.get_timestamp()
+
+    def get_session_time(self, frame_time):
+        """
+        gets the time since the start of the session from the frame timestamp
+        so that video files give the same session times regardless of processing speed
+
+        """
+        if self._source != util.WEBCAM:
+            return frame_time
+
+        return frame_time - self._start_time - self._pause_time
+
+    def get_replay_capture(self, name):
+        """
+        get a replay source that plays back the landmarks recorded in a session csv file
+        in place of a video capture and motion tracking
+
+        """
+        return self.open_source(ReplaySource(load_csv(name), rate=self._replay_rate))
+
+    def set_replay_rate(self, rate):
+        """
+        sets the rate (frames per second) that sessions are replayed at
+        None replays sessions as fast as possible
+
+        """
+        self._replay_rate = rate
 
     def set_frame_dimensions(self, cap, source):
         """
-        set the camera or video resolution and show in terminal (for debugging)
+        set the camera or video resolution using the capture policy
+        and show in terminal (for debugging)
 
         """
         if cap is not None:
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, util.FRAME_WIDTH)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, util.FRAME_HEIGHT)
-
-            width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-            height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            print(f"{source} resolution: {int(width)} x {int(height)}")
+            width, height, fps, fourcc = cap.apply_policy(self._capture_policy)
+            print(f"{source} resolution: {width} x {height} @ {round(fps)}fps {fourcc}")
 
     def get_file(self, name):
         """
@@ -243,12 +455,21 @@ class MainThread(QtCore.QThread):
 
         """ check that the file is valid and supported by program """
         if file_type == util.MP4 or file_type == util.AVI:
+            self._video_name = name
+            self.close_timeline()
+            self.load_cached_landmarks(name)
             self._cap = self.get_video_capture(self._cap, name=name)
             print(f'video file: "{name}"')
 
         elif file_type == util.CSV:
+            self._cap = self.get_replay_capture(name)
             print(f'csv file: "{name}"')
 
+        elif file_type == util.PNG or file_type == util.JPG:
+            path = os.path.dirname(name)
+            self._cap = self.open_source(ImageDirectorySource(path))
+            print(f'image sequence: "{path}"')
+
         elif file_type == util.FILE_NOT_SUPPORTED:
             invalid_file_msg_box = QtWidgets.QMessageBox()
             invalid_file_msg_box.setWindowTitle("File Not Supported")
@@ -259,6 +480,227 @@ class MainThread(QtCore.QThread):
             )
             invalid_file_msg_box.exec()
 
+    def load_cached_landmarks(self, name):
+        """
+        looks up the landmarks of the video file in the landmark cache on a background
+        thread (called from the main-window thread, which hashing would hold up)
+        landmarks are recorded while the video is played until the lookup is done, and
+        kept so they can be cached if the video is not in the cache
+
+        """
+        with self._cache_lock:
+            self._cache_key = None
+            self._cached_landmarks = None
+            self._cache_frames = {}
+            self._cache_lookup = threading.Thread(
+                target=self.find_cached_landmarks, args=(name,), daemon=True
+            )
+            self._cache_lookup.start()
+
+    def find_cached_landmarks(self, name):
+        """
+        background thread: hashes the video and looks it up in the landmark cache
+        cached landmarks are used from the next frame on
+        the result is dropped if another file was opened in the meantime
+
+        """
+        key = self._landmark_cache.get_key(name, self._motion.get_params())
+        entry = self._landmark_cache.get(key)
+
+        with self._cache_lock:
+            if threading.current_thread() is not self._cache_lookup:
+                return
+
+            self._cache_key = key
+            if entry is None:
+                return
+
+            _, self._cached_landmarks = entry
+            self._cache_frames = None
+
+        print("using cached landmarks")
+        self.load_timeline(name, key, entry[1])
+
+    def save_cached_landmarks(self):
+        """
+        stores the recorded landmarks in the landmark cache
+        only if every frame of the video was processed
+
+        """
+        """ the key is needed to store the landmarks (short videos end before it is) """
+        lookup = self._cache_lookup
+        if lookup is not None:
+            lookup.join()
+
+        with self._cache_lock:
+            frames, self._cache_frames = self._cache_frames, None
+        if frames is None or len(frames) == 0 or self._cache_key is None:
+            return
+
+        if sorted(frames.keys()) != list(range(len(frames))):
+            return
+
+        self._landmark_cache.put(
+            self._cache_key,
+            [frames[i][0] for i in range(len(frames))],
+            [frames[i][1] for i in range(len(frames))],
+        )
+
+        """ the video can be reviewed on the timeline now its landmarks are stored """
+        entry = self._landmark_cache.get(self._cache_key)
+        if entry is not None and self._video_name is not None:
+            self.load_timeline(self._video_name, self._cache_key, entry[1])
+
+    def load_timeline(self, name, key, landmarks):
+        """
+        creates the review timeline of a video on a background thread
+        (the keyframe index is built in one pass over the video the first time)
+        the main-window thread is signalled when the timeline is ready
+
+        """
+        threading.Thread(
+            target=self.create_timeline, args=(name, key, landmarks), daemon=True
+        ).start()
+
+    def create_timeline(self, name, key, landmarks):
+        """
+        background thread: loads or builds the keyframe index and creates the timeline
+        stops if another video is opened or the program exits
+
+        """
+
+        def should_stop():
+            return self._cache_key != key or not self._active
+
+        index = load_index(name, key, should_stop)
+        if index is None or should_stop():
+            return
+
+        timeline = Timeline(name, index, landmarks, self.create_timeline_movements)
+        if should_stop():
+            timeline.close()
+            return
+
+        self._timeline = timeline
+        self.timeline_ready.emit(timeline.get_length())
+
+    def create_timeline_movements(self):
+        """
+        returns new counters of the movements counted by the program (threshold and
+        template movements) for the review timeline, without rep events
+
+        """
+        movements = create_movements()
+        for name, movement in self._template_movements.items():
+            movements[name] = movement.copy()
+
+        return movements
+
+    def close_timeline(self):
+        """
+        closes the review timeline of the previous video
+
+        """
+        if self._timeline is not None:
+            self._timeline.close()
+
+        self._timeline = None
+        self._seek_index = None
+        self.timeline_ready.emit(0)
+
+    def preview(self, index, exact=False):
+        """
+        shows the annotated frame and counts at a position of the review timeline
+        called from the main-window thread while the video is stopped
+        exact: True to decode the exact frame, otherwise the nearest keyframe is shown
+            (eg: while scrubbing)
+
+        """
+        if self._timeline is None or self._is_recording or self._source != util.VIDEO:
+            return
+
+        img, index = self._timeline.render(index, exact)
+        self.image.emit(self.to_qimage(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)))
+        self.session_time.emit(int(self._timeline.get_timestamp(index)))
+        self.emit_counts(
+            {
+                name: count
+                for name, count in self._timeline.get_counts(index).items()
+                if self._tracking_movements[name].get_tracking_status()
+            }
+        )
+
+    def seek(self, index):
+        """
+        shows the exact frame at a position of the review timeline, and carries on
+        playing the video from that frame when recording starts again
+
+        """
+        if self._timeline is None or self._is_recording or self._source != util.VIDEO:
+            return
+
+        self.preview(index, exact=True)
+        self._seek_index = index
+
+    def seek_capture(self):
+        """
+        moves the video to the seek position (the next frame read is the frame after
+        it), and restores the state of each movement counter at the frame it landed on
+        from the review timeline
+        (called in the main worker thread, before the next frame is read)
+
+        seeking can land on the wrong frame, so where it landed is checked against the
+        timestamps of the review timeline (see `Timeline.seek_capture()`)
+        a seek starts a new session: the session statistics and any other counts are
+        reset, so earlier timestamps are not mixed into the session after a seek back
+
+        """
+        index, self._seek_index = self._seek_index, None
+        if self._timeline is None or self._source != util.VIDEO:
+            return
+
+        landed = self._timeline.seek_capture(self._cap, index)
+        if landed is None:
+            print("could not seek the video")
+            return
+
+        self._cap.set_index(landed)
+        while landed < index and self._cap.grab():
+            landed += 1
+        self._cap.set_index(landed)
+
+        """ the template movements are restored too, untracked movements stay reset """
+        self.reset_all_count()
+        for name, state in self._timeline.get_movement_states(landed).items():
+            if self._tracking_movements[name].get_tracking_status():
+                self._tracking_movements[name].set_state(state)
+
+    def emit_counts(self, counts):
+        """
+        emits the count of each movement to the main-window thread to be displayed
+
+        """
+        signals = {
+            "right arm ext": self.right_arm_ext,
+            "left arm ext": self.left_arm_ext,
+            "sit to stand": self.sit_to_stand,
+        }
+        for name, count in counts.items():
+            if name in signals:
+                signals[name].emit(str(count))
+
+    def to_qimage(self, img):
+        """
+        converts an rgb frame to an image scaled to fit the display
+
+        """
+        height, width, _ = img.shape
+        return QtGui.QImage(img.data, width, height, QtGui.QImage.Format_RGB888).scaled(
+            int(util.DISPLAY_WIDTH - util.DISPLAY_WIDTH / 80),
+            int(util.DISPLAY_HEIGHT - util.DISPLAY_HEIGHT / 80),
+            QtCore.Qt.KeepAspectRatio,
+        )
+
     def generate_file(self, generate):
         """
         callback function for the main-window thread to update whether or not
@@ -267,6 +709,14 @@ class MainThread(QtCore.QThread):
         """
         self._save_file = generate
 
+    def set_sample_period(self, sample_period):
+        """
+        sets the time between saved samples in seconds (0 to save every frame)
+        applied from the start of the next recording
+
+        """
+        self._sample_period = sample_period
+
     def handle_exit(self, event):
         """
         handles user exit
@@ -289,6 +739,16 @@ class MainThread(QtCore.QThread):
             if button_clicked == QtWidgets.QMessageBox.Yes:
                 self._write_file.write(self._name_id)
 
+        """ finish encoding the recorded session before exiting """
+        if self._recorder is not None:
+            self._recorder.stop(wait=True)
+
+        """ deliver the remaining rep events before exiting """
+        self._events.stop()
+
+        """ checkpoint the current background job before exiting """
+        self._jobs.stop()
+
     def get_frame_rate(self, frame_times):
         """
         calculates frame rate: used for testing
@@ -326,9 +786,16 @@ class MainThread(QtCore.QThread):
         if self._is_recording:
             """
             create new file object
+            replayed sessions are already saved, so they are not saved again (as a csv
+            file or a duplicate session in the session store)
 
             """
-            self._write_file = File(save=self._save_file)
+            replay = self._source == util.REPLAY
+            self._write_file = File(
+                save=self._save_file and not replay,
+                sample_period=self._sample_period,
+                store=None if replay else self._session_store,
+            )
 
             if self._stop_time is not None and (
                 self._source == util.VIDEO or self._is_paused
@@ -341,12 +808,71 @@ class MainThread(QtCore.QThread):
             if self._source == util.WEBCAM:
                 self.reset_all_count()
 
+            self._idle.reset()
+
+            """ background jobs are paused (and checkpointed) while recording """
+            self._jobs.pause()
+
+            if self._recorder is not None:
+                self._recorder.start(self._name_id)
+            if self._motion.gate is not None:
+                self._motion.gate.reset()
+
+            """ carry on playing a stopped video """
+            self._resume.set()
+
         else:
             self._stop_time = time.time()
 
+            """ show the time spent in each idle mode in terminal (webcam only) """
+            mode_times = self._idle.get_mode_times()
+            if sum(mode_times.values()) > 0:
+                print(
+                    f"active: {round(mode_times['active'], 1)}s, "
+                    + f"idle: {round(mode_times['idle'], 1)}s"
+                )
+
+            """ show how often pose inference was skipped by the motion gate in terminal """
+            if self._motion.gate is not None:
+                gate_stats = self._motion.gate.get_stats()
+                print(
+                    f"motion gate: skipped {gate_stats['skipped']} frames "
+                    + f"({round(gate_stats['skip rate'] * 100, 1)}%), "
+                    + f"saved {round(gate_stats['time saved'], 2)}s cpu time"
+                )
+
+            """ show the session summary in terminal """
+            for line in format_summary(self.get_summary()):
+                print(line)
+
+            """ show the counts of each person in terminal (multi-person tracking) """
+            if self._people is not None:
+                for id, counts in self._people.get_counts().items():
+                    print(f"person {id}: {counts}")
+
+            """ show how many frames the recorder dropped in terminal """
+            if self._recorder is not None:
+                self._recorder.stop()
+                record_stats = self._recorder.get_stats()
+                print(
+                    f"recording: {record_stats['frames']} frames, "
+                    + f"dropped {record_stats['dropped']} "
+                    + f"({round(record_stats['drop rate'] * 100, 1)}%)"
+                )
+
             """ write to csv file """
             self._write_file.write(self._name_id)
 
+            self._jobs.resume()
+
+    def get_summary(self):
+        """
+        returns the summary of the running session statistics
+        (available as soon as the session stops)
+
+        """
+        return self._stats.get_summary()
+
     def pause(self):
         """
         pauses the recording
@@ -367,6 +893,16 @@ class MainThread(QtCore.QThread):
         """
         return self._is_paused
 
+    def add_jobs(self, names, priority=0):
+        """
+        adds videos to the background job queue (analysed while not recording)
+        see "jobs.py"
+
+        """
+        for name in names:
+            self._job_queue.add(name, self._name_id, priority)
+        self._jobs.notify()
+
     def update_name_id(self, name_id):
         """
         updated the name of id
@@ -388,43 +924,111 @@ class MainThread(QtCore.QThread):
         self._left_arm_ext.reset_count()
         self._sit_to_stand.reset_count()
 
+        for movement in self._template_movements.values():
+            movement.reset_count()
+
+        """ the session statistics follow the counts (kept when a video is resumed) """
+        self._stats.reset()
+
+        if self._people is not None:
+            self._people.reset_count()
+
     def add_movements(self):
         """
-        add right arm extensions
+        add right arm extensions, left arm extensions and sit to stand
+        (see `create_movements` in the movement module)
 
         """
-        self._right_arm_ext = Movement(
-            config.RIGHT_ARM_EXT_ANGULAR_THRESH,
-            config.RIGHT_ARM_EXT_POSITIONAL_THRESH,
-            True,
-            debug=False,
-        )
-        self._tracking_movements.update({"right arm ext": self._right_arm_ext})
+        movements = create_movements(events=self._events)
+        self._right_arm_ext = movements["right arm ext"]
+        self._left_arm_ext = movements["left arm ext"]
+        self._sit_to_stand = movements["sit to stand"]
+        self._tracking_movements.update(movements)
+
+        """ template movements are counted alongside the threshold movements """
+        for name, recordings in self._templates.items():
+            movement = create_template_movement(
+                name,
+                recordings,
+                points=self._template_angles.get(name),
+                events=self._events,
+            )
+            if movement is None:
+                print(f"no template reps recorded for {name}")
+                continue
 
-        """ 
-        add left arm extensions 
-        
+            self._template_movements[movement.get_name()] = movement
+        self._tracking_movements.update(self._template_movements)
+
+        """ each person's movements follow the movements tracked from the gui """
+        if self._people is not None:
+            self._people.set_movements(movements)
+
+    def track_motion(self):
         """
-        self._left_arm_ext = Movement(
-            config.LEFT_ARM_EXT_ANGULAR_THRESH,
-            config.LEFT_ARM_EXT_POSITIONAL_THRESH,
-            True,
-            debug=False,
-        )
-        self._tracking_movements.update({"left arm ext": self._left_arm_ext})
+        tracks motion in the current frame
+        uses cached landmarks instead of pose inference if the video was processed before
+
+        """
+        self._pose_landmarks = []
 
         """ 
-        add sit to stand movement 
+        some frame sources provide landmarks with each frame 
+        (eg: replayed sessions and shared memory sources)
         
         """
-        self._sit_to_stand = Movement(
-            config.SIT_TO_STAND_ANGULAR_THRESH,
-            config.SIT_TO_STAND_POSITIONAL_THRESH,
-            True,
-            ignore_vis=True,
-            debug=False,
-        )
-        self._tracking_movements.update({"sit to stand": self._sit_to_stand})
+        landmarks = self._cap.get_landmarks()
+        if landmarks is not None:
+            self._pose_landmarks = landmarks
+            self._img, self._pixels = self._motion.draw_landmarks(
+                self._img,
+                self._pose_landmarks,
+            )
+            return
+
+        index = None
+        if self._source == util.VIDEO:
+            index = self._cap.get_index()
+
+        """ the cache lookup can finish on another thread at any frame """
+        cached_landmarks, cache_frames = self._cached_landmarks, self._cache_frames
+
+        if cached_landmarks is not None and 0 <= index < len(cached_landmarks):
+            self._pose_landmarks = to_landmarks(cached_landmarks[index])
+            self._img, self._pixels = self._motion.draw_landmarks(
+                self._img,
+                self._pose_landmarks,
+            )
+            return
+
+        if self._people is not None:
+            self.track_people(index)
+        else:
+            self._img, self._pixels = self._motion.track_motion(
+                self._img,
+                self._pose_landmarks,
+            )
+
+        """ record landmarks to be cached at the end of the video """
+        if cache_frames is not None and index is not None:
+            cache_frames[index] = (self._frame_time, self._pose_landmarks)
+
+    def track_people(self, index):
+        """
+        tracks each person in the current frame and counts their reps separately
+        the gui counts, session data and landmark cache follow the person tracked for
+        the longest, so they do not switch between people
+
+        """
+        self._people.track(self._img, self._source, self._session_time, index)
+        self._img, pixels = self._people.draw(self._img, self._source)
+
+        person = self._people.get_primary()
+        if person is not None:
+            self._pose_landmarks = list(person.get_landmarks())
+            self._pixels = pixels[person.get_id()]
+        else:
+            self._pixels = []
 
     def count_movements(self):
         """
@@ -437,6 +1041,8 @@ class MainThread(QtCore.QThread):
                 self._pixels,
                 self._img,
                 self._source,
+                timestamp=self._session_time,
+                frame_index=self._cap.get_index(),
             )
             self.right_arm_ext.emit(str(self._right_arm_ext_count))
 
@@ -450,6 +1056,8 @@ class MainThread(QtCore.QThread):
                 self._pixels,
                 self._img,
                 self._source,
+                timestamp=self._session_time,
+                frame_index=self._cap.get_index(),
             )
             self.left_arm_ext.emit(str(self._left_arm_ext_count))
 
@@ -463,9 +1071,43 @@ class MainThread(QtCore.QThread):
                 self._pixels,
                 self._img,
                 self._source,
+                timestamp=self._session_time,
+                frame_index=self._cap.get_index(),
             )
             self.sit_to_stand.emit(str(self._sit_to_stand_count))
 
+        """
+        template movements (if enabled), shown in the session summary
+
+        """
+        for movement in self._template_movements.values():
+            if movement.get_tracking_status():
+                self._img, _ = movement.count_movement(
+                    self._pose_landmarks,
+                    self._pixels,
+                    self._img,
+                    self._source,
+                    timestamp=self._session_time,
+                    frame_index=self._cap.get_index(),
+                )
+
+    def get_state(self):
+        """
+        returns the recording status and the count of each tracked movement
+        (broadcast by the stream server)
+
+        """
+        return {
+            "recording": self._is_recording,
+            "paused": self._is_paused,
+            "session time": int(self._session_time or 0),
+            "counts": {
+                name: movement.get_count()
+                for name, movement in self._tracking_movements.items()
+                if movement.get_tracking_status()
+            },
+        }
+
     def get_tracking_movements(self):
         """
         returns a dictionary containing all movements
@@ -481,7 +1123,18 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
     """
 
-    def __init__(self, parent=None):
+    def __init__(
+        self,
+        parent=None,
+        inference_process=False,
+        server=None,
+        event_sinks=None,
+        recorder=None,
+        max_people=None,
+        motion_gate=True,
+        templates=None,
+        template_angles=None,
+    ):
         super().__init__(parent)
 
         """ set up gui """
@@ -489,7 +1142,16 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.setWindowTitle("BIOE6901 Project")
 
         """ create the worker thread """
-        self._main_thread = MainThread()
+        self._main_thread = MainThread(
+            inference_process=inference_process,
+            server=server,
+            event_sinks=event_sinks,
+            recorder=recorder,
+            max_people=max_people,
+            motion_gate=motion_gate,
+            templates=templates,
+            template_angles=template_angles,
+        )
         self._main_thread.start()
         # self._main_thread.setTerminationEnabled(True)
 
@@ -497,6 +1159,9 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self._main_thread.image.connect(self.update_frame)
         self._main_thread.frame_rate.connect(self.display_frame_rate)
         self._main_thread.session_time.connect(self.display_session_time)
+        self._main_thread.capture_status.connect(self.display_capture_status)
+        self._main_thread.timeline_ready.connect(self.update_timeline)
+        self._main_thread.frame_index.connect(self.update_timeline_position)
 
         """ connect motion traking signals """
         self._main_thread.right_arm_ext.connect(self.display_right_arm_ext_count)
@@ -513,9 +1178,15 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         """ connect line edit """
         self.name_id_lineEdit.editingFinished.connect(self.update_name_id)
 
+        """ connect timeline slider """
+        self.timeline_slider.sliderMoved.connect(self.preview_position)
+        self.timeline_slider.sliderReleased.connect(self.seek_position)
+        self.timeline_slider.valueChanged.connect(self.update_position)
+
         """ connect action triggers """
         self.actionOpen.triggered.connect(self.open_file)
         self.actionWebcam.triggered.connect(self.open_webcam)
+        self.actionQueue_Videos.triggered.connect(self.queue_files)
         self.actionGenerate_CSV_File.triggered.connect(self.generate_file)
 
         self._frame_rates = []
@@ -570,9 +1241,66 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
         """
         self.sessiontime_label.setText(
-            "Session Time: %d:%02d:%02d" % (time // 3600, time // 60, time % 60)
+            "Session Time: %d:%02d:%02d"
+            % (time // 3600, time // 60 % 60, time % 60)
         )
 
+    def display_capture_status(self, status):
+        """
+        shows the webcam status on the status bar (eg: while reconnecting)
+
+        """
+        self.statusbar.showMessage(status)
+
+    def update_timeline(self, frames):
+        """
+        enables the timeline slider once the review timeline of a video is ready
+        (disabled when there is no timeline)
+
+        """
+        self.timeline_slider.blockSignals(True)
+        self.timeline_slider.setRange(0, max(0, frames - 1))
+        self.timeline_slider.setValue(0)
+        self.timeline_slider.blockSignals(False)
+        self.timeline_slider.setEnabled(frames > 0)
+
+    def update_timeline_position(self, index):
+        """
+        moves the timeline slider to the frame being played (unless it is held)
+
+        """
+        if self.timeline_slider.isSliderDown():
+            return
+
+        self.timeline_slider.blockSignals(True)
+        self.timeline_slider.setValue(index)
+        self.timeline_slider.blockSignals(False)
+
+    def preview_position(self, index):
+        """
+        callback for when the timeline slider is dragged
+        shows the nearest keyframe straight away
+
+        """
+        self._main_thread.preview(index)
+
+    def seek_position(self):
+        """
+        callback for when the timeline slider is released
+        shows the exact frame and carries on playing from there
+
+        """
+        self._main_thread.seek(self.timeline_slider.value())
+
+    def update_position(self, index):
+        """
+        callback for when the timeline slider is moved with the keyboard or by clicking
+        on the groove (dragging is handled by `preview_position()`)
+
+        """
+        if not self.timeline_slider.isSliderDown():
+            self._main_thread.seek(index)
+
     def update_start_pushButton(self):
         """
         updates the gui interface whenever the start / stop button is pressed
@@ -603,6 +1331,16 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self._file_name = QtWidgets.QFileDialog.getOpenFileName(self, "Open File", "./")
         self._main_thread.get_file(self._file_name[0])
 
+    def queue_files(self):
+        """
+        callback for when the queue videos action is triggered from the file menu
+        adds the selected videos to the background job queue
+
+        """
+        names, _ = QtWidgets.QFileDialog.getOpenFileNames(self, "Queue Videos", "./")
+        if names:
+            self._main_thread.add_jobs(names)
+
     def open_webcam(self):
         """
         callback for when the webcam action is triggered from the file menu
@@ -635,10 +1373,125 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
 
 def main():
-    app = QtWidgets.QApplication(sys.argv)
-    win = MainWindow()
+    parser = argparse.ArgumentParser(description="PhysiCam")
+    parser.add_argument(
+        "--process",
+        action="store_true",
+        help="run webcam capture and motion tracking in a separate process",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="stream counts and the preview to other displays (see doc/server.md)",
+    )
+    parser.add_argument("--host", default=util.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=util.SERVER_PORT)
+    parser.add_argument("--events-file", help="append rep events to a jsonl file")
+    parser.add_argument("--events-socket", help="send rep events to a unix socket")
+    parser.add_argument(
+        "--record",
+        nargs="?",
+        const=util.DEFAULT_FILE_PATH,
+        help="record the annotated sessions to video files in a directory",
+    )
+    parser.add_argument(
+        "--record-size", help="size of the recorded videos, eg: 1280x720"
+    )
+    parser.add_argument("--record-fps", type=int, default=util.RECORD_FPS)
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=util.DEFAULT_PROFILE_PATH,
+        help="log memory usage periodically to a file (see doc/profiler.md)",
+    )
+    parser.add_argument(
+        "--people",
+        type=int,
+        nargs="?",
+        const=util.MAX_PEOPLE,
+        help="count each person separately, up to N people (see doc/people.md)",
+    )
+    parser.add_argument(
+        "--no-motion-gate",
+        action="store_true",
+        help="run pose inference on every frame (see doc/gate.md)",
+    )
+    parser.add_argument(
+        "--template",
+        nargs=4,
+        action="append",
+        metavar=("MOVEMENT", "CSV", "START", "STOP"),
+        help="also count a movement by matching a rep recorded in a session csv file "
+        + "between two times (seconds) with dtw, can be repeated (see doc/dtw.md)",
+    )
+    parser.add_argument(
+        "--template-angles",
+        nargs=4,
+        action="append",
+        metavar=("MOVEMENT", "POINT", "POINT", "POINT"),
+        help="joint angle (three landmarks, eg: right_elbow right_shoulder right_hip) "
+        + "matched by the template reps of a new movement, can be repeated",
+    )
+    args, qt_args = parser.parse_known_args()
+
+    template_angles = {}
+    for name, *points in args.template_angles or []:
+        try:
+            angle = tuple(get_landmark(point) for point in points)
+        except ValueError as e:
+            parser.error(str(e))
+        template_angles.setdefault(name, []).append(angle)
+
+    templates = {}
+    for name, session, start, stop in args.template or []:
+        try:
+            get_template_points(name, template_angles.get(name))
+        except ValueError as e:
+            parser.error(str(e))
+        templates.setdefault(name, []).append((session, float(start), float(stop)))
+
+    event_sinks = []
+    if args.events_file is not None:
+        event_sinks.append(JsonlSink(args.events_file))
+    if args.events_socket is not None:
+        event_sinks.append(UnixSocketSink(args.events_socket))
+
+    profiler = None
+    if args.profile is not None:
+        profiler = MemoryProfiler(args.profile)
+        profiler.start()
+
+    recorder = None
+    if args.record is not None:
+        size = None
+        if args.record_size is not None:
+            size = tuple(int(x) for x in args.record_size.lower().split("x"))
+        recorder = SessionRecorder(args.record, size, args.record_fps)
+
+    server = None
+    if args.serve:
+        server = StreamServer(args.host, args.port)
+        server.start()
+
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
+    win = MainWindow(
+        inference_process=args.process,
+        server=server,
+        event_sinks=event_sinks,
+        recorder=recorder,
+        max_people=args.people,
+        motion_gate=not args.no_motion_gate,
+        templates=templates,
+        template_angles=template_angles,
+    )
     win.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+
+    if server is not None:
+        server.stop()
+    if profiler is not None:
+        profiler.stop()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -15,8 +15,9 @@ see "doc/motion.md" for more details
 
 """
 
-import cv2, util
-import mediapipe as mp
+import cv2, time, util
+from gate import MotionGate
+from preprocess import Preprocessor
 
 
 __author__ = "Mike Smith"
@@ -50,9 +51,21 @@ class Motion:
     left_ankle = 27
     right_ankle = 28
 
+    """ connections between landmarks (same as the "MediaPipe Pose Estimation" library) """
+    pose_connections = [
+        (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+        (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+        (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20), (11, 23),
+        (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28), (27, 29),
+        (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+    ]
+
     crop = {"start": util.INIT, "end": util.INIT}
     cropped = False
 
+    """ idle monitor (see "idle.py"), None to run motion tracking on every frame """
+    idle = None
+
     def __init__(
         self,
         static_image_mode=False,
@@ -62,6 +75,8 @@ class Motion:
         smooth_segmentation=True,
         min_detection_confidence=min_detection_confidence,
         min_tracking_confidence=min_tracking_confidence,
+        gate=True,
+        preprocess_size=util.PREPROCESS_SIZE,
     ):
         self._static_image_mode = static_image_mode
         self._model_complexity = model_complexity
@@ -70,12 +85,30 @@ class Motion:
         self._smooth_segmentation = smooth_segmentation
         self._min_detection_confidence = min_detection_confidence
         self._min_tracking_confidence = min_tracking_confidence
+        self._preprocess_size = preprocess_size
 
-        self._pose_param_dict = {
-            "mp pose": mp.solutions.pose,
-            "mp draw": mp.solutions.drawing_utils,
-        }
-        self._pose = self._pose_param_dict["mp pose"].Pose(
+        """ resizes and converts frames for pose inference into a reused buffer """
+        self._preprocessor = Preprocessor(preprocess_size)
+
+        """ 
+        the pose estimation graph is created on first use, so stored landmarks 
+        can be drawn without loading the "MediaPipe Pose Estimation" library
+        
+        """
+        self._pose = None
+
+        """ reuse the previous landmarks while the scene is static (see "gate.py") """
+        self.gate = MotionGate() if gate else None
+        self._landmarks = []
+
+    def create_pose(self):
+        """
+        creates the "MediaPipe Pose Estimation" graph using the motion capture parameters
+
+        """
+        import mediapipe as mp
+
+        return mp.solutions.pose.Pose(
             static_image_mode=self._static_image_mode,
             model_complexity=self._model_complexity,
             smooth_landmarks=self._smooth_landmarks,
@@ -85,16 +118,62 @@ class Motion:
             min_tracking_confidence=self._min_tracking_confidence,
         )
 
+    def close(self):
+        """
+        releases the resources of the pose estimation graph
+        (the graph is created again if motion is tracked afterwards)
+
+        """
+        if self._pose is not None:
+            self._pose.close()
+            self._pose = None
+
+        self._landmarks = []
+
+    def get_params(self):
+        """
+        returns the motion capture parameters
+        (landmarks are only comparable between runs with the same parameters)
+
+        """
+        return {
+            "static_image_mode": self._static_image_mode,
+            "model_complexity": self._model_complexity,
+            "smooth_landmarks": self._smooth_landmarks,
+            "enable_segmentation": self._enable_segmentation,
+            "smooth_segmentation": self._smooth_segmentation,
+            "min_detection_confidence": self._min_detection_confidence,
+            "min_tracking_confidence": self._min_tracking_confidence,
+            "preprocess_size": self._preprocess_size,
+            "gate": self.gate.get_params() if self.gate is not None else None,
+        }
+
     def track_motion(self, img, landmarks):
         """
         used for tracking motion within a bounding box
 
         """
-        self._landmark_x_min = -1
-        self._landmark_x_max = -1
+        self.find_landmarks(img, landmarks)
+
+        """ returns image frame and landmark pixel co-ordinates """
+        return self.draw_landmarks(img, landmarks)
+
+    def find_landmarks(self, img, landmarks):
+        """
+        runs pose inference on the bounding box / cropped frame and appends the
+        detected landmarks (does not draw on the frame)
 
+        """
         adjust = [0, 0]
-        lm_pixels = []
+
+        """ skip frames while idle (nobody in view) between probes for a person """
+        if self.idle is not None and not self.idle.should_track():
+            return landmarks
+
+        """ reuse the previous landmarks if the scene has not changed """
+        if self.gate is not None and not self.gate.should_track(img, self._landmarks):
+            landmarks.extend(self._landmarks)
+            return landmarks
 
         """ 
         crop frame based on the position of the detected person 
@@ -114,16 +193,20 @@ class Motion:
         else:
             img_crop = img
 
+        """ probe downscaled frames while idle """
+        if self.idle is not None:
+            img_crop = self.idle.downscale(img_crop)
+
         """ look for human motion in the bounding box / cropped frame """
-        img_crop = cv2.cvtColor(img_crop, cv2.COLOR_BGR2RGB)
-        results = self._pose.process(img_crop)
-        img_crop = cv2.cvtColor(img_crop, cv2.COLOR_RGB2BGR)
+        if self._pose is None:
+            self._pose = self.create_pose()
 
-        if results.pose_landmarks:
-            """
-            if human motion is detected, overlay the stick figure on the frame
+        start_time = time.process_time()
+        img_rgb = self._preprocessor.process(img_crop)
+        results = self._pose.process(img_rgb)
+        inference_time = time.process_time() - start_time
 
-            """
+        if results.pose_landmarks:
             for id, landmark in enumerate(results.pose_landmarks.landmark):
                 """
                 apply positional adjustment for the cropped frame
@@ -136,12 +219,39 @@ class Motion:
                 """ append raw co-ordinate values (ranges from 0 to 1) """
                 landmarks.append((id, landmark.x, landmark.y, landmark.visibility))
 
+        if self.idle is not None:
+            self.idle.update(results.pose_landmarks is not None)
+
+        self._landmarks = landmarks.copy()
+        if self.gate is not None:
+            self.gate.set_reference(img, landmarks, inference_time)
+
+        return landmarks
+
+    def draw_landmarks(self, img, landmarks):
+        """
+        overlays the stick figure and bounding box on the frame from the landmarks
+        (does not run pose inference, so can also be used with stored landmarks)
+
+        """
+        self._landmark_x_min = -1
+        self._landmark_x_max = -1
+
+        height, width, _ = img.shape
+        lm_pixels = []
+
+        if len(landmarks) > 0:
+            """
+            if human motion is detected, overlay the stick figure on the frame
+
+            """
+            for id, x, y, _ in landmarks:
                 """ 
                 calculate co-ordinate values in pixels to be used later for 
                 drawing the bounding box and to crop the next frame
                 
                 """
-                lm_pixels.append((int(landmark.x * width), int(landmark.y * height)))
+                lm_pixels.append((int(x * width), int(y * height)))
 
                 """ highlight important points """
                 wrists = id == self.left_wrist or id == self.right_wrist
@@ -156,35 +266,34 @@ class Motion:
                     cv2.circle(img, (x, y), 8, util.YELLOW, cv2.FILLED)
 
             """ draw connections between detected points """
-            self._pose_param_dict["mp draw"].draw_landmarks(
-                img,
-                results.pose_landmarks,
-                self._pose_param_dict["mp pose"].POSE_CONNECTIONS,
-            )
+            for start, end in self.pose_connections:
+                if landmarks[start][3] > util.VIS and landmarks[end][3] > util.VIS:
+                    cv2.line(img, lm_pixels[start], lm_pixels[end], util.WHITE, 2)
+
+            for id, _, _, visibility in landmarks:
+                if visibility > util.VIS:
+                    cv2.circle(img, lm_pixels[id], 3, util.WHITE, 2)
+                    cv2.circle(img, lm_pixels[id], 2, util.RED, 2)
 
             """ draw the bounding box """
-            if len(lm_pixels) > 0:
-                self._landmark_x_min = min([lm[util.X] for lm in lm_pixels]) - int(
-                    0.03 * width
-                )
-                self._landmark_x_max = max([lm[util.X] for lm in lm_pixels]) + int(
-                    0.03 * width
-                )
-                self._landmark_y_min = min([lm[util.Y] for lm in lm_pixels]) - int(
-                    0.05 * height
-                )
-                self._landmark_y_max = max([lm[util.Y] for lm in lm_pixels]) + int(
-                    0.04 * height
-                )
-
-                x_min, y_min = self._landmark_x_min, self._landmark_y_min
-                x_max, y_max = self._landmark_x_max, self._landmark_y_max
-                cv2.rectangle(img, (x_min, y_min), (x_max, y_max), util.BLUE, 3)
-
-                self.cropped = True
-
-            else:
-                self.cropped = False
+            self._landmark_x_min = min([lm[util.X] for lm in lm_pixels]) - int(
+                0.03 * width
+            )
+            self._landmark_x_max = max([lm[util.X] for lm in lm_pixels]) + int(
+                0.03 * width
+            )
+            self._landmark_y_min = min([lm[util.Y] for lm in lm_pixels]) - int(
+                0.05 * height
+            )
+            self._landmark_y_max = max([lm[util.Y] for lm in lm_pixels]) + int(
+                0.04 * height
+            )
+
+            x_min, y_min = self._landmark_x_min, self._landmark_y_min
+            x_max, y_max = self._landmark_x_max, self._landmark_y_max
+            cv2.rectangle(img, (x_min, y_min), (x_max, y_max), util.BLUE, 3)
+
+            self.cropped = True
 
         """ returns image frame and landmark pixel co-ordinates """
         return img, lm_pixels.copy()
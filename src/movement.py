@@ -9,7 +9,8 @@ see "doc/movement.md" for more details
 
 """
 
-import math, cv2, util
+import math, cv2, util, config
+from events import RepEvent
 
 
 __author__ = "Mike Smith"
@@ -25,7 +26,16 @@ class Movement:
 
     """
 
-    def __init__(self, points, positions, is_tracking, ignore_vis=False, debug=False):
+    def __init__(
+        self,
+        points,
+        positions,
+        is_tracking,
+        ignore_vis=False,
+        debug=False,
+        name="",
+        events=None,
+    ):
         """
         points: a list containing tuples of three points and the threshold angle
         positions: a list containing pairs of point with thresholds for relative positioning
@@ -34,8 +44,13 @@ class Movement:
         ignore_vis: a boolean to ignore visibility thresholds
             set to "True" if tracking full-body / compound movements
         debug: a boolean to allow program to overlay angle values on frame
+        name: name of the movement (used in rep events)
+        events: event stream that rep events are put on (see "events.py"), None to
+            not raise rep events
 
         """
+        self._name = name
+        self._events = events
 
         self._points = points
         self._positions = positions
@@ -91,9 +106,52 @@ class Movement:
         """
         return self._is_tracking
 
-    def count_movement(self, landmarks, pixels, img, source):
+    def get_name(self):
+        """
+        returns the name of the movement, eg: "right arm ext"
+
+        """
+        return self._name
+
+    def get_points(self):
+        """
+        returns the tuples of three points and the threshold angle of each angle tracked
+
+        """
+        return self._points
+
+    def get_ignore_vis(self):
+        """
+        returns True if visibility thresholds are ignored for the movement
+
+        """
+        return self._ignore_vis
+
+    def get_phase(self):
+        """
+        returns the current phase of the movement (see "util.py"):
+        - "lost": the movement is not visible in the current frame
+        - "reset": all angles are below their thresholds, the next rep can be counted
+        - "set": waiting for the movement to return to the "reset" phase
+
+        """
+        if any(angle["curr"] < 0 for angle in self._angles):
+            return util.PHASES[0]
+
+        return util.PHASES[1] if self._reset else util.PHASES[2]
+
+    def set_events(self, events):
+        """
+        sets the event stream that rep events are put on (None to not raise rep events)
+        """
+        self._events = events
+
+    def count_movement(
+        self, landmarks, pixels, img, source, timestamp=None, frame_index=None
+    ):
         """
         count the number of reps for the movement
+        timestamp / frame_index: session time and index of the frame (used in rep events)
 
         """
 
@@ -154,11 +212,29 @@ class Movement:
             and all(self._position_conditions)
             and self._reset
         ):
-            self._count += 1
+            self.add_rep(timestamp, frame_index)
             self._reset = False
 
         return img, self._count
 
+    def add_rep(self, timestamp=None, frame_index=None):
+        """
+        increments the count and raises a rep event (does not block)
+
+        """
+        self._count += 1
+
+        if self._events is not None:
+            self._events.put(
+                RepEvent(
+                    self._name,
+                    self._count,
+                    timestamp,
+                    frame_index,
+                    [angle["curr"] for angle in self._angles],
+                )
+            )
+
     def get_count(self):
         """
         returns the current movement count value
@@ -166,6 +242,34 @@ class Movement:
         """
         return self._count
 
+    def get_state(self):
+        """
+        returns the counter state of the movement (eg: to checkpoint a job)
+        only contains lists, dictionaries and numbers, so it can be saved as json
+
+        """
+        return {
+            "count": self._count,
+            "reset": self._reset,
+            "angles": [angle.copy() for angle in self._angles],
+            "less_than_thresh": self._less_than_thresh.copy(),
+            "greater_than_thresh": self._greater_than_thresh.copy(),
+            "position_conditions": self._position_conditions.copy(),
+        }
+
+    def set_state(self, state):
+        """
+        restores the counter state returned by `get_state()`
+        (counting continues exactly where it left off)
+
+        """
+        self._count = state["count"]
+        self._reset = state["reset"]
+        self._angles = [angle.copy() for angle in state["angles"]]
+        self._less_than_thresh = list(state["less_than_thresh"])
+        self._greater_than_thresh = list(state["greater_than_thresh"])
+        self._position_conditions = list(state["position_conditions"])
+
     def find_angle(self, p1, p2, p3):
         """
         generic function for calutating the angle between two lines
@@ -243,3 +347,40 @@ class Movement:
             cv2.putText(img, str(angle), (x, y), font, 0.8, colour, 2)
 
         return img
+
+
+def create_movements(debug=False, events=None):
+    """
+    creates the movements tracked by the program using the thresholds in the config file
+    returns a dictionary of movements keyed by name
+    events: event stream that rep events are put on (see "events.py")
+    make sure to update when adding new movements
+
+    """
+    return {
+        "right arm ext": Movement(
+            config.RIGHT_ARM_EXT_ANGULAR_THRESH,
+            config.RIGHT_ARM_EXT_POSITIONAL_THRESH,
+            True,
+            debug=debug,
+            name="right arm ext",
+            events=events,
+        ),
+        "left arm ext": Movement(
+            config.LEFT_ARM_EXT_ANGULAR_THRESH,
+            config.LEFT_ARM_EXT_POSITIONAL_THRESH,
+            True,
+            debug=debug,
+            name="left arm ext",
+            events=events,
+        ),
+        "sit to stand": Movement(
+            config.SIT_TO_STAND_ANGULAR_THRESH,
+            config.SIT_TO_STAND_POSITIONAL_THRESH,
+            True,
+            ignore_vis=True,
+            debug=debug,
+            name="sit to stand",
+            events=events,
+        ),
+    }
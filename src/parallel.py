@@ -0,0 +1,205 @@
+"""
+parallel.py
+
+Processes a single video file in parallel.
+The video is split into frame-index segments and motion tracking is run on each segment
+in its own process. The landmark streams are then merged and replayed through the
+movement counters in order so that rep counts carry across segment boundaries.
+
+Usage: `python src/parallel.py <video> [--workers N] [--threads N] [--pin] [--segments N]
+[--name-id ID] [--no-gate]`
+
+see "doc/parallel.md" for more details
+
+"""
+
+import cv2, math, time, argparse, util
+from governor import Governor
+from movement import create_movements
+from motion import Motion
+from file import File
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+def get_segments(num_frames, num_segments):
+    """
+    splits the frames of a video into segments of (start, stop) frame indexes
+    the last segment has no stop index so it always reads to the end of the video
+
+    """
+    num_segments = max(1, min(num_segments, num_frames))
+    size = math.ceil(num_frames / num_segments) if num_frames > 0 else 1
+
+    segments = []
+    for start in range(0, max(num_frames, 1), size):
+        stop = start + size if start + size < num_frames else None
+        segments.append((start, stop))
+
+    return segments
+
+
+def seek(cap, name, index):
+    """
+    moves the video capture to the given frame index
+    falls back to stepping through the frames if the backend cannot seek accurately
+
+    """
+    if index == 0:
+        return cap
+
+    cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == index:
+        return cap
+
+    cap.release()
+    cap = cv2.VideoCapture(name)
+    for _ in range(index):
+        if not cap.grab():
+            break
+
+    return cap
+
+
+def process_segment(segment):
+    """
+    runs motion tracking on one segment of a video (called in a worker process)
+    tracking starts `overlap` frames early so it has warmed up by the start of the segment
+    returns a list of (frame index, timestamp, landmarks) for the frames in the segment
+
+    """
+    name, start, stop, overlap, gate = segment
+
+    warmup = max(0, start - overlap)
+    cap = seek(cv2.VideoCapture(name), name, warmup)
+    motion = Motion(gate=gate)
+
+    frames = []
+    index = warmup
+    while stop is None or index < stop:
+        ret, img = cap.read()
+        if ret == False or img is None:
+            break
+
+        timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+
+        """ track the full frame (same as the main worker thread) """
+        height, width, _ = img.shape
+        motion.crop = {"start": util.INIT, "end": (width, height)}
+
+        landmarks = []
+        motion.track_motion(img, landmarks)
+
+        if index >= start:
+            frames.append((index, timestamp, landmarks))
+        index += 1
+
+    cap.release()
+    motion.close()
+    return frames
+
+
+def replay(frames, movements, file):
+    """
+    passes recorded landmarks through the movement counters and the file object in order
+
+    """
+    for index, timestamp, landmarks in frames:
+        for movement in movements.values():
+            if movement.get_tracking_status():
+                movement.count_movement(
+                    landmarks,
+                    [],
+                    None,
+                    util.VIDEO,
+                    timestamp=timestamp,
+                    frame_index=index,
+                )
+
+        file.parse_movements(movements, landmarks, timestamp)
+
+
+def process_video(
+    name,
+    workers=None,
+    num_segments=None,
+    overlap=util.SEGMENT_OVERLAP,
+    save=True,
+    name_id="",
+    sample_period=util.SAMPLE_PERIOD,
+    gate=True,
+    threads=util.WORKER_THREADS,
+    pin=False,
+):
+    """
+    processes a video file in parallel and saves the session data to a csv file
+    returns the dictionary of movements (with their final counts) and the file object
+
+    """
+    governor = Governor(workers, threads, pin)
+    workers = governor.get_workers()
+    num_segments = num_segments if num_segments is not None else workers
+
+    cap = cv2.VideoCapture(name)
+    num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    segments = [
+        (name, start, stop, overlap, gate)
+        for start, stop in get_segments(num_frames, num_segments)
+    ]
+
+    movements = create_movements()
+    file = File(save=save, sample_period=sample_period)
+
+    """ segments are returned in order, so each is replayed as soon as it is ready """
+    with governor.create_pool(len(segments)) as pool:
+        for frames in pool.imap(process_segment, segments):
+            replay(frames, movements, file)
+
+    file.write(name_id)
+    return movements, file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="process a video file in parallel")
+    parser.add_argument("video", help="video file to process")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=util.WORKER_THREADS)
+    parser.add_argument("--pin", action="store_true", help="pin workers to cores")
+    parser.add_argument("--segments", type=int, default=None)
+    parser.add_argument("--overlap", type=int, default=util.SEGMENT_OVERLAP)
+    parser.add_argument("--name-id", default="")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument(
+        "--no-gate",
+        action="store_true",
+        help="run pose inference on every frame (to compare counts without the gate)",
+    )
+    args = parser.parse_args()
+
+    start_time = time.time()
+    movements, _ = process_video(
+        args.video,
+        workers=args.workers,
+        num_segments=args.segments,
+        overlap=args.overlap,
+        save=not args.no_save,
+        name_id=args.name_id,
+        gate=not args.no_gate,
+        threads=args.threads,
+        pin=args.pin,
+    )
+
+    print(f"processed in {round(time.time() - start_time, 1)}s")
+    for name, movement in movements.items():
+        print(f"{name}: {movement.get_count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,680 @@
+"""
+people.py
+
+Multi-person tracking module.
+`Motion` tracks a single person, so in group sessions it switches between people and
+their reps are counted together. The people tracker follows each person separately:
+- people are found with a cheap person detector (OpenCV's HOG person detector) on a
+  downscaled frame every few frames
+- each person has their own pose tracking context (`Motion`), run on a crop of the frame
+  around the person, and the crops are inferred in parallel on a thread pool
+- people keep the same ID across frames by matching their boxes (intersection over
+  union)
+- each person has their own movement counters
+
+Usage: `python src/main.py --people [N]` (the gui counts follow the first person)
+`python src/people.py <video> [--max-people N] [--benchmark]`
+
+see "doc/people.md" for more details
+
+"""
+
+import cv2, math, time, argparse, util
+from concurrent.futures import ThreadPoolExecutor
+from motion import Motion
+from movement import create_movements
+from stats import Trend
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+""" smallest crop (pixels) pose inference is run on """
+MIN_CROP = 32
+
+
+def get_iou(a, b):
+    """
+    returns the intersection over union of two boxes (x min, y min, x max, y max)
+
+    """
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0
+
+    intersection = width * height
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return intersection / (area_a + area_b - intersection)
+
+
+def match_boxes(boxes, detections, threshold=util.PERSON_MATCH_IOU):
+    """
+    matches detections to boxes, the pairs that overlap the most first
+    returns a dictionary of the index of the matched detection keyed by box index
+
+    """
+    pairs = sorted(
+        [
+            (get_iou(box, detection), i, j)
+            for i, box in enumerate(boxes)
+            for j, detection in enumerate(detections)
+        ],
+        reverse=True,
+    )
+
+    matches = {}
+    for iou, i, j in pairs:
+        if iou < threshold:
+            break
+        if i not in matches and j not in matches.values():
+            matches[i] = j
+
+    return matches
+
+
+def get_box(landmarks, padding=util.PERSON_PADDING):
+    """
+    returns the box around the visible landmarks (normalised co-ordinates), padded by a
+    fraction of its size so the person can move between frames
+    returns None if no landmarks are visible
+
+    """
+    points = [(x, y) for _, x, y, visibility in landmarks if visibility > util.VIS]
+    if len(points) == 0:
+        return None
+
+    x_min, x_max = min(x for x, _ in points), max(x for x, _ in points)
+    y_min, y_max = min(y for _, y in points), max(y for _, y in points)
+    pad_x = (x_max - x_min) * padding
+    pad_y = (y_max - y_min) * padding
+
+    return (
+        max(0, x_min - pad_x),
+        max(0, y_min - pad_y),
+        min(1, x_max + pad_x),
+        min(1, y_max + pad_y),
+    )
+
+
+class PersonDetector:
+    """
+    person detector: finds people with OpenCV's HOG person detector
+    (cheap and does not need another model, only used to find where each person is)
+
+    """
+
+    def __init__(self, width=util.PERSON_DETECT_WIDTH):
+        """
+        width: width frames are downscaled to before detection
+
+        """
+        self._width = width
+        self._hog = None
+
+        """ the HOG person detector is not part of some OpenCV builds (eg: OpenCV 5) """
+        if not hasattr(cv2, "HOGDescriptor"):
+            print("HOG person detector not available, only one person is tracked")
+            return
+
+        self._hog = cv2.HOGDescriptor()
+        self._hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(self, img):
+        """
+        returns the boxes of the people in the frame (normalised co-ordinates)
+
+        """
+        if self._hog is None:
+            return []
+
+        height, width, _ = img.shape
+        scale = min(1, self._width / width)
+        if scale < 1:
+            img = cv2.resize(
+                img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+
+        height, width, _ = img.shape
+        rects, _ = self._hog.detectMultiScale(
+            img, winStride=(8, 8), padding=(8, 8), scale=1.1
+        )
+
+        return [
+            (x / width, y / height, (x + w) / width, (y + h) / height)
+            for x, y, w, h in rects
+        ]
+
+
+class Person:
+    """
+    tracked person: pose tracking context, box and movement counters of one person
+
+    """
+
+    def __init__(self, box, movements, motion):
+        """
+        box: where the person is in the frame (normalised co-ordinates)
+        movements: the person's movement counters (see `create_movements()`)
+        motion: the person's pose tracking context
+
+        """
+        self._id = None
+        self._box = box
+        self._movements = movements
+        self._motion = motion
+        self._landmarks = []
+        self._lost = 0
+
+    def get_id(self):
+        """
+        returns the ID of the person, None until their landmarks are first found
+
+        """
+        return self._id
+
+    def set_id(self, id):
+        self._id = id
+
+    def get_box(self):
+        return self._box
+
+    def set_box(self, box):
+        self._box = box
+
+    def get_landmarks(self):
+        return self._landmarks
+
+    def get_movements(self):
+        return self._movements
+
+    def get_motion(self):
+        return self._motion
+
+    def get_lost(self):
+        """
+        returns the number of frames in a row the person's landmarks were not found
+
+        """
+        return self._lost
+
+    def get_counts(self):
+        """
+        returns the count of each tracked movement
+
+        """
+        return {
+            name: movement.get_count()
+            for name, movement in self._movements.items()
+            if movement.get_tracking_status()
+        }
+
+    def find_landmarks(self, img):
+        """
+        runs pose inference on the crop of the frame around the person
+        returns the landmarks in frame co-ordinates (does not update the person, so it
+        can be called on a worker thread)
+
+        """
+        height, width, _ = img.shape
+        x_min, y_min = int(self._box[0] * width), int(self._box[1] * height)
+        x_max = math.ceil(self._box[2] * width)
+        y_max = math.ceil(self._box[3] * height)
+
+        if x_max - x_min < MIN_CROP or y_max - y_min < MIN_CROP:
+            return []
+
+        img_crop = img[y_min:y_max, x_min:x_max]
+        crop_width, crop_height = x_max - x_min, y_max - y_min
+        self._motion.crop = {"start": util.INIT, "end": (crop_width, crop_height)}
+
+        return [
+            (
+                id,
+                (x_min + x * crop_width) / width,
+                (y_min + y * crop_height) / height,
+                visibility,
+            )
+            for id, x, y, visibility in self._motion.find_landmarks(img_crop, [])
+        ]
+
+    def update(self, landmarks):
+        """
+        updates the person with the landmarks found in the current frame
+        the box follows the person's landmarks, and is kept while they are lost
+
+        """
+        self._landmarks = landmarks
+
+        box = get_box(landmarks)
+        if box is None:
+            self._lost += 1
+            return
+
+        self._box = box
+        self._lost = 0
+
+    def count_movements(self, tracking, source, timestamp=None, frame_index=None):
+        """
+        counts the person's reps for each tracked movement
+        tracking: names of the movements to track (None to keep the tracking status of
+            each movement)
+
+        """
+        for name, movement in self._movements.items():
+            if tracking is not None:
+                movement.set_tracking_status(name in tracking)
+
+            if movement.get_tracking_status():
+                movement.count_movement(
+                    self._landmarks,
+                    [],
+                    None,
+                    source,
+                    timestamp=timestamp,
+                    frame_index=frame_index,
+                )
+
+    def reset_count(self):
+        for movement in self._movements.values():
+            movement.reset_count()
+
+
+class PeopleTracker:
+    """
+    people tracker: finds the people in each frame, follows each of them with their own
+    pose tracking context and counts their reps separately
+
+    """
+
+    def __init__(
+        self,
+        max_people=util.MAX_PEOPLE,
+        detect_period=util.PERSON_DETECT_PERIOD,
+        detector=None,
+        movements=None,
+    ):
+        """
+        max_people: max number of people tracked at once
+        detect_period: frames between person detections
+        detector: person detector (defaults to `PersonDetector()`)
+        movements: movements whose tracking status each person's movements follow
+            (eg: the movements of the main worker thread), None to keep the default
+            tracking status of each movement
+
+        """
+        self._max_people = max_people
+        self._detect_period = detect_period
+        self._detector = detector if detector is not None else PersonDetector()
+        self._movements = movements
+
+        """ only draws landmarks (each person has their own pose tracking context) """
+        self._drawer = Motion(gate=False)
+
+        """ 
+        pose tracking contexts of people no longer tracked, reused for new people
+        (creating a pose estimation graph takes much longer than a pose inference)
+        
+        """
+        self._contexts = []
+
+        """ crops are inferred in parallel (OpenCV and MediaPipe release the GIL) """
+        self._pool = ThreadPoolExecutor(max_people, thread_name_prefix="people")
+
+        self._people = []
+        self._next_id = 1
+        self._frames = 0
+        self.reset_stats()
+
+    def set_movements(self, movements):
+        """
+        sets the movements whose tracking status each person's movements follow
+
+        """
+        self._movements = movements
+
+    def reset(self):
+        """
+        stops tracking everyone, IDs start from 1 again
+
+        """
+        for motion in self._contexts + [person.get_motion() for person in self._people]:
+            motion.close()
+
+        self._contexts = []
+        self._people = []
+        self._next_id = 1
+        self._frames = 0
+
+    def reset_count(self):
+        for person in self._people:
+            person.reset_count()
+
+    def reset_stats(self):
+        self._detect_time = 0
+        self._detections = 0
+        self._inference_time = 0
+        self._person_frames = 0
+        self._stats_frames = 0
+        self._trend = Trend()
+
+    def track(self, img, source=util.VIDEO, timestamp=None, frame_index=None):
+        """
+        finds and follows the people in the frame, and counts their reps
+        returns the people tracked in the frame (see `get_people()`)
+
+        """
+        start_time = time.perf_counter()
+
+        """ 
+        the person detector only runs every few frames, in between the whole frame is 
+        tried while nobody is tracked (the same as tracking a single person)
+        
+        """
+        if self._frames % self._detect_period == 0:
+            self.detect(img)
+        elif len(self._people) == 0:
+            self.add_people([(0, 0, 1, 1)])
+        self._frames += 1
+
+        detect_time = time.perf_counter()
+
+        """ one pose inference per person, in parallel if more than one person """
+        if len(self._people) == 1:
+            results = [self._people[0].find_landmarks(img)]
+        else:
+            results = list(
+                self._pool.map(lambda person: person.find_landmarks(img), self._people)
+            )
+
+        for person, landmarks in zip(self._people, results):
+            person.update(landmarks)
+
+        inference_time = time.perf_counter()
+        self.remove_people()
+
+        """ IDs are only given out once duplicates and false detections are removed """
+        for person in self._people:
+            if person.get_id() is None:
+                person.set_id(self._next_id)
+                self._next_id += 1
+
+        tracking = None
+        if self._movements is not None:
+            tracking = [
+                name
+                for name, movement in self._movements.items()
+                if movement.get_tracking_status()
+            ]
+
+        for person in self.get_people():
+            person.count_movements(tracking, source, timestamp, frame_index)
+
+        """ cost of each frame against the number of people inferred """
+        self._detect_time += detect_time - start_time
+        self._inference_time += inference_time - detect_time
+        self._person_frames += len(results)
+        self._stats_frames += 1
+        self._trend.update(len(results), time.perf_counter() - start_time)
+
+        return self.get_people()
+
+    def detect(self, img):
+        """
+        runs the person detector, re-anchors lost people to the detections that match
+        them and starts tracking new people
+        if nothing is detected while nobody is tracked, the whole frame is tried
+        (eg: people too close to the webcam for the person detector)
+
+        """
+        detections = self._detector.detect(img)
+        self._detections += 1
+
+        matches = match_boxes([person.get_box() for person in self._people], detections)
+        for i, j in matches.items():
+            if self._people[i].get_lost() > 0:
+                self._people[i].set_box(detections[j])
+
+        new = [box for j, box in enumerate(detections) if j not in matches.values()]
+        if len(self._people) == 0 and len(new) == 0:
+            new = [(0, 0, 1, 1)]
+
+        self.add_people(new)
+
+    def add_people(self, boxes):
+        """
+        starts tracking a person in each box (up to the max number of people)
+        pose tracking contexts of people no longer tracked are reused
+
+        """
+        for box in boxes[: self._max_people - len(self._people)]:
+            motion = self._contexts.pop() if len(self._contexts) > 0 else None
+            motion = motion if motion is not None else Motion(gate=False)
+            self._people.append(Person(box, create_movements(), motion))
+
+    def remove_people(self):
+        """
+        stops tracking people that have been lost for too long, and people tracked
+        twice (the person tracked first is kept)
+        people are dropped straight away if their landmarks were never found (eg: false
+        detections), and their pose tracking contexts are kept to be reused
+
+        """
+        people = []
+        for person in self._people:
+            duplicate = any(
+                get_iou(person.get_box(), other.get_box()) > util.PERSON_DUPLICATE_IOU
+                for other in people
+            )
+            lost = person.get_lost() > (
+                util.PERSON_MAX_LOST if person.get_id() is not None else 0
+            )
+
+            if duplicate or lost:
+                self._contexts.append(person.get_motion())
+            else:
+                people.append(person)
+
+        self._people = people
+
+    def get_people(self):
+        """
+        returns the people whose landmarks have been found, ordered by ID
+
+        """
+        return sorted(
+            [person for person in self._people if person.get_id() is not None],
+            key=lambda person: person.get_id(),
+        )
+
+    def get_primary(self):
+        """
+        returns the person tracked for the longest (lowest ID)
+        returns None if nobody is tracked
+
+        """
+        people = self.get_people()
+        return people[0] if len(people) > 0 else None
+
+    def draw(self, img, source=util.VIDEO):
+        """
+        overlays each person's stick figure, bounding box, ID and counts on the frame
+        returns the frame and the landmark pixel co-ordinates of each person keyed by ID
+
+        """
+        height, width, _ = img.shape
+        pixels = {}
+        labels = []
+
+        for person in self.get_people():
+            img, pixels[person.get_id()] = self._drawer.draw_landmarks(
+                img, person.get_landmarks()
+            )
+
+            box = person.get_box()
+            x = (
+                int(box[0] * width)
+                if source != util.WEBCAM
+                else int((1 - box[2]) * width)
+            )
+            lines = [f"person {person.get_id()}"] + [
+                f"{name}: {count}" for name, count in person.get_counts().items()
+            ]
+            for i, line in enumerate(lines):
+                labels.append((line, (x + 10, int(box[1] * height) + 30 + i * 28)))
+
+        """ webcam frames are flipped for display, so the labels are drawn flipped """
+        if source == util.WEBCAM:
+            img = cv2.flip(img, 1)
+
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        for line, position in labels:
+            cv2.putText(img, line, position, font, 0.8, util.BLACK, 4)
+            cv2.putText(img, line, position, font, 0.8, util.CYAN, 2)
+
+        if source == util.WEBCAM:
+            img = cv2.flip(img, 1)
+
+        return img, pixels
+
+    def get_counts(self):
+        """
+        returns the counts of each person keyed by ID
+
+        """
+        return {person.get_id(): person.get_counts() for person in self.get_people()}
+
+    def get_stats(self):
+        """
+        returns the average number of people inferred per frame, the time taken by
+        person detection and pose inference (ms per frame), and the cost of each extra
+        person (ms per frame, least squares slope of the frame time against the number
+        of people)
+
+        """
+        frames = max(1, self._stats_frames)
+        slope = self._trend.get_slope()
+
+        return {
+            "frames": self._stats_frames,
+            "people": self._person_frames / frames,
+            "detections": self._detections,
+            "detect ms": self._detect_time / frames * 1000,
+            "inference ms": self._inference_time / frames * 1000,
+            "ms per person": slope * 1000 if slope is not None else None,
+        }
+
+    def close(self):
+        """
+        stops tracking everyone and shuts down the thread pool
+
+        """
+        self.reset()
+        self._pool.shutdown()
+        self._drawer.close()
+
+
+def process_video(name, max_people=util.MAX_PEOPLE, output=None):
+    """
+    tracks the people in a video and counts their reps
+    output: filename of an annotated copy of the video (optional)
+    returns the counts of each person keyed by ID and the tracker stats
+
+    """
+    from source import VideoFileSource
+    from render import FrameWriter
+
+    cap = VideoFileSource(name)
+    if not cap.isOpened():
+        raise IOError(f'could not open video: "{name}"')
+
+    tracker = PeopleTracker(max_people)
+    writer = None
+    counts = {}
+
+    try:
+        while True:
+            ret, img = cap.read()
+            if ret == False or img is None:
+                break
+
+            tracker.track(img, util.VIDEO, cap.get_timestamp(), cap.get_index())
+
+            """ people that are no longer tracked keep their last counts """
+            counts.update(tracker.get_counts())
+
+            if output is not None:
+                img, _ = tracker.draw(img)
+                if writer is None:
+                    fps = cap.get(cv2.CAP_PROP_FPS) or util.CAMERA_FPS
+                    height, width, _ = img.shape
+                    writer = FrameWriter(output, fps, (width, height))
+                writer.write(img)
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.close()
+
+    stats = tracker.get_stats()
+    tracker.close()
+    return counts, stats
+
+
+def benchmark(name, max_people=util.MAX_PEOPLE):
+    """
+    tracks the people in a video with 1 to `max_people` people at most
+    returns a list of (max people, average people, frames per second)
+
+    """
+    results = []
+    for people in range(1, max_people + 1):
+        start_time = time.perf_counter()
+        _, stats = process_video(name, people)
+        elapsed = time.perf_counter() - start_time
+
+        results.append((people, stats["people"], stats["frames"] / elapsed))
+        print(
+            f"max {people} people: {round(results[-1][1], 2)} people per frame, "
+            + f"{round(results[-1][2], 1)} fps"
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="track and count several people")
+    parser.add_argument("video", help="video file to process")
+    parser.add_argument("--max-people", type=int, default=util.MAX_PEOPLE)
+    parser.add_argument("--output", default=None, help="annotated video to write")
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="measure throughput against the max number of people",
+    )
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.video, args.max_people)
+        return
+
+    counts, stats = process_video(args.video, args.max_people, args.output)
+
+    for id, person_counts in counts.items():
+        print(f"person {id}: {person_counts}")
+
+    print(
+        f"{round(stats['people'], 2)} people per frame, "
+        + f"detection: {round(stats['detect ms'], 1)} ms per frame, "
+        + f"pose inference: {round(stats['inference ms'], 1)} ms per frame"
+    )
+    if stats["ms per person"] is not None:
+        print(f"each extra person: {round(stats['ms per person'], 1)} ms per frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+preprocess.py
+
+Inference preprocessing module.
+Prepares frames for pose inference without allocating new frames:
+- frames are resized and converted to rgb into a single reused buffer
+- the rgb frame is only used for pose inference, so it is never converted back to bgr
+
+Usage: `python src/preprocess.py [video] [--frames N]` (measures allocations and latency)
+
+see "doc/preprocess.md" for more details
+
+"""
+
+import cv2, time, tracemalloc, argparse, util
+import numpy as np
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class Preprocessor:
+    """
+    preprocessor: resizes and converts frames for pose inference into a reused buffer
+
+    """
+
+    def __init__(self, max_size=util.PREPROCESS_SIZE):
+        """
+        max_size: max side length of the frames passed to pose inference
+        (frames are not resized if None)
+
+        """
+        self._max_size = max_size
+
+        """ flat pool of memory, viewed as a frame of the size needed """
+        self._pool = np.empty(0, dtype=np.uint8)
+        self._allocations = 0
+
+    def get_size(self, width, height):
+        """
+        returns the (width, height) of the frame passed to pose inference
+        (scaled down to fit the max size, keeping the aspect ratio)
+
+        """
+        if self._max_size is None or max(width, height) <= self._max_size:
+            return width, height
+
+        scale = self._max_size / max(width, height)
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    def get_buffer(self, width, height):
+        """
+        returns a contiguous (height, width, 3) view of the pool
+        the pool only grows, so it is only allocated when a larger frame is needed
+
+        """
+        size = width * height * 3
+        if self._pool.size < size:
+            self._pool = np.empty(size, dtype=np.uint8)
+            self._allocations += 1
+
+        return self._pool[:size].reshape(height, width, 3)
+
+    def process(self, img):
+        """
+        returns the frame resized and converted to rgb for pose inference
+        the returned frame is a view of the reused buffer: it is overwritten by the
+        next call, so it must not be kept
+
+        """
+        height, width, _ = img.shape
+        size = self.get_size(width, height)
+        buffer = self.get_buffer(*size)
+
+        if size == (width, height):
+            return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=buffer)
+
+        """ linear (the pose model input is also resampled with linear interpolation) """
+        cv2.resize(img, size, dst=buffer, interpolation=cv2.INTER_LINEAR)
+        return cv2.cvtColor(buffer, cv2.COLOR_BGR2RGB, dst=buffer)
+
+    def get_allocations(self):
+        """
+        returns the number of times the buffer was allocated
+
+        """
+        return self._allocations
+
+
+def measure(name, num_frames, preprocess):
+    """
+    measures the bytes allocated and the latency of reading and preprocessing each frame
+    preprocess: False to measure reading new frames and converting them to rgb and back
+    (without the preprocessor)
+    returns the mean (bytes allocated, latency in ms) per frame
+
+    """
+    cap = cv2.VideoCapture(name)
+    preprocessor = Preprocessor()
+    img = None
+    allocated, latency, frames = 0, 0, 0
+
+    tracemalloc.start()
+    while frames < num_frames:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        start_time = time.perf_counter()
+
+        if preprocess:
+            ret, img = cap.read(img)
+            if ret == False:
+                break
+
+            preprocessor.process(img)
+        else:
+            ret, img = cap.read()
+            if ret == False:
+                break
+
+            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            img_rgb = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
+
+        latency += time.perf_counter() - start_time
+        _, peak = tracemalloc.get_traced_memory()
+
+        """ the first frame allocates the buffers, so is not counted """
+        if frames > 0 or not preprocess:
+            allocated += peak - before
+        frames += 1
+
+    tracemalloc.stop()
+    cap.release()
+
+    if frames == 0:
+        return 0, 0
+
+    return allocated / frames, latency / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="measure inference preprocessing")
+    parser.add_argument("video", nargs="?", default=0, help="video file (or webcam)")
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    for preprocess, label in [(False, "before"), (True, "after")]:
+        allocated, latency = measure(args.video, args.frames, preprocess)
+        print(f"{label}: {round(allocated / 1024)} kB allocated per frame")
+        print(f"{label}: {latency:.2f} ms per frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""
+profiler.py
+
+Memory profiling module.
+Profiling mode for long-running sessions (eg: kiosks running the program for a whole
+shift). A background thread periodically takes a `tracemalloc` snapshot and logs a line
+of json with the resident memory (rss), traced memory, the allocation sites that grew
+the most and the object types whose counts grew the most since the previous sample.
+
+Also contains a soak test, which runs the pipeline on replayed sessions (or a video
+through pose inference) for hours and flags any memory growth.
+
+Usage: `python src/main.py --profile [<log>]` (profile the program)
+`python src/profiler.py [<session csv>] [--video <path>] [--duration S] [--period S]
+[--warmup S] [--log <path>]` (soak test, replays a synthetic session if no session csv
+or video is given)
+
+see "doc/profiler.md" for more details
+
+"""
+
+import cv2, gc, os, sys, json, time, argparse, threading, tracemalloc, util
+from collections import Counter
+from stats import Trend
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+def get_rss():
+    """
+    returns the resident memory of the process in bytes
+    (the peak resident memory on platforms other than linux and windows)
+
+    """
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    if sys.platform.startswith("win"):
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (field, ctypes.c_size_t)
+                for field in [
+                    "PeakWorkingSetSize",
+                    "WorkingSetSize",
+                    "QuotaPeakPagedPoolUsage",
+                    "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage",
+                    "QuotaNonPagedPoolUsage",
+                    "PagefileUsage",
+                    "PeakPagefileUsage",
+                ]
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess
+        process.restype = wintypes.HANDLE
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            process(), ctypes.byref(counters), counters.cb
+        )
+        return counters.WorkingSetSize
+
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def count_objects():
+    """
+    returns the number of objects tracked by the garbage collector of each type
+
+    """
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+class MemoryProfiler:
+    """
+    memory profiler: logs memory usage from a background thread
+
+    """
+
+    def __init__(
+        self,
+        path=util.DEFAULT_PROFILE_PATH,
+        period=util.PROFILE_PERIOD,
+        top=util.PROFILE_TOP,
+    ):
+        """
+        path: path to the log file (a line of json is appended for every sample)
+        period: seconds between samples
+        top: number of allocation sites and object types logged for every sample
+
+        """
+        self._path = path
+        self._period = period
+        self._top = top
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._start_time = None
+        self._snapshot = None
+        self._objects = None
+        self._samples = []
+
+    def start(self):
+        """
+        starts tracing allocations and the sampling thread
+
+        """
+        if self._thread is not None:
+            return
+
+        directory = os.path.dirname(self._path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        tracemalloc.start()
+        self._start_time = time.time()
+        self._snapshot = tracemalloc.take_snapshot()
+        self._objects = count_objects()
+        self._samples = []
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        takes a final sample, then stops the sampling thread and tracing allocations
+
+        """
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+        self.sample()
+        tracemalloc.stop()
+        self._snapshot = None
+
+    def run(self):
+        """
+        sampling thread: takes a sample every period until stopped
+
+        """
+        while not self._stop.wait(self._period):
+            self.sample()
+
+    def sample(self):
+        """
+        takes a snapshot and logs the memory usage and the growth since the last sample
+        returns the logged sample
+
+        """
+        with self._lock:
+            return self.log_sample()
+
+    def log_sample(self):
+        """
+        takes a sample (see `sample()`), called with the lock held
+
+        """
+        snapshot = tracemalloc.take_snapshot()
+        snapshot = snapshot.filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+        )
+        current, peak = tracemalloc.get_traced_memory()
+
+        """ allocation sites that grew the most since the last sample """
+        sites = [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size": stat.size,
+                "size diff": stat.size_diff,
+                "count diff": stat.count_diff,
+            }
+            for stat in snapshot.compare_to(self._snapshot, "lineno")[: self._top]
+            if stat.size_diff != 0
+        ]
+
+        """ object types whose counts grew the most since the last sample """
+        objects = count_objects()
+        growth = objects.copy()
+        growth.subtract(self._objects)
+        growth = {
+            name: count for name, count in growth.most_common(self._top) if count > 0
+        }
+
+        self._snapshot = snapshot
+        self._objects = objects
+
+        sample = {
+            "time": time.time(),
+            "elapsed": time.time() - self._start_time,
+            "rss": get_rss(),
+            "traced": current,
+            "traced peak": peak,
+            "objects": sum(objects.values()),
+            "gc counts": gc.get_count(),
+            "top sites": sites,
+            "object growth": growth,
+        }
+        self._samples.append(
+            {key: sample[key] for key in ["elapsed", "rss", "traced", "objects"]}
+        )
+
+        with open(self._path, "a") as log:
+            log.write(json.dumps(sample) + "\n")
+
+        return sample
+
+    def get_samples(self):
+        """
+        returns the elapsed time, rss, traced memory and number of objects of each
+        sample
+
+        """
+        return self._samples
+
+
+def get_measured(samples, warmup=util.SOAK_WARMUP):
+    """
+    returns the samples taken after the warm-up (seconds), while caches and the
+    allocator fill up the rss rises in steps before it levels out
+
+    """
+    return [sample for sample in samples if sample["elapsed"] >= warmup]
+
+
+def get_growth(samples, key, warmup=util.SOAK_WARMUP):
+    """
+    returns the growth of a logged value in bytes per hour (least squares slope)
+    samples taken during the warm-up (seconds) are ignored (see `get_measured()`)
+
+    """
+    samples = get_measured(samples, warmup)
+    trend = Trend()
+    for sample in samples:
+        trend.update(sample["elapsed"] / 3600, sample[key])
+
+    slope = trend.get_slope()
+    return slope if slope is not None else 0
+
+
+def soak(
+    frames,
+    duration,
+    period=util.PROFILE_PERIOD,
+    path=util.DEFAULT_PROFILE_PATH,
+    warmup=util.SOAK_WARMUP,
+    video=None,
+):
+    """
+    runs the pipeline of the main worker thread on the replayed frames (drawing,
+    counting reps, session statistics and session data) over and over for `duration`
+    seconds while profiling memory, starting a new session every time the frames end
+    returns the samples taken at the end of each session and the growth of the rss and
+    traced memory between them (bytes per hour, after the warm-up)
+    session data is kept until the end of each session, so memory rises and falls within
+    every session and only the end of each session is compared
+
+    video: filename of a video to loop through pose inference instead (the pose graph,
+        preprocessing and motion gate), the pose graph is closed at the end of each
+        session and created again for the next, as it is for each video processed by
+        the background job runner
+
+    """
+    from movement import create_movements
+    from motion import Motion
+    from file import File
+    from replay import ReplaySource
+    from source import VideoFileSource
+    from stats import SessionStats
+
+    profiler = MemoryProfiler(path, period)
+    profiler.start()
+
+    motion = Motion()
+    movements = create_movements()
+    sessions = []
+    end_time = time.perf_counter() + duration
+
+    try:
+        while time.perf_counter() < end_time:
+            if video is not None:
+                source, source_type = VideoFileSource(video), util.VIDEO
+            else:
+                source, source_type = ReplaySource(frames), util.REPLAY
+
+            """ session data is parsed (but not written) as in the main thread """
+            file = File()
+            stats = SessionStats()
+            for movement in movements.values():
+                movement.reset_count()
+
+            """ read into the previous frame buffer, the same as the main thread """
+            img = None
+            ret = True
+            while time.perf_counter() < end_time:
+                ret, img = source.read(img)
+                if ret == False:
+                    break
+
+                if video is None:
+                    landmarks = source.get_landmarks()
+                    img, pixels = motion.draw_landmarks(img, landmarks)
+                else:
+                    """ pose inference on the full frame (as in the main thread) """
+                    height, width, _ = img.shape
+                    motion.crop = {"start": util.INIT, "end": (width, height)}
+                    landmarks = []
+                    img, pixels = motion.track_motion(img, landmarks)
+
+                for movement in movements.values():
+                    if movement.get_tracking_status():
+                        img, _ = movement.count_movement(
+                            landmarks,
+                            pixels,
+                            img,
+                            source_type,
+                            timestamp=source.get_timestamp(),
+                            frame_index=source.get_index(),
+                        )
+
+                stats.update(movements, source.get_timestamp())
+                file.parse_movements(movements, landmarks, source.get_timestamp())
+                cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+            source.release()
+            if video is not None:
+                motion.close()
+                if motion.gate is not None:
+                    motion.gate.reset()
+
+            if ret == False:
+                """ the session data is released before sampling """
+                file = stats = None
+                sessions.append(profiler.sample())
+    finally:
+        motion.close()
+        profiler.stop()
+
+    print(f"{len(sessions)} sessions, {len(profiler.get_samples())} samples")
+    return (
+        sessions,
+        get_growth(sessions, "rss", warmup),
+        get_growth(sessions, "traced", warmup),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="memory soak test")
+    parser.add_argument("session", nargs="?", help="session csv file to replay")
+    parser.add_argument(
+        "--video", help="video to loop through pose inference (needs mediapipe)"
+    )
+    parser.add_argument("--duration", type=float, default=3600, help="seconds")
+    parser.add_argument("--period", type=float, default=util.PROFILE_PERIOD)
+    parser.add_argument(
+        "--warmup",
+        type=float,
+        default=util.SOAK_WARMUP,
+        help="seconds ignored at the start while memory levels out",
+    )
+    parser.add_argument("--log", default=util.DEFAULT_PROFILE_PATH)
+    parser.add_argument(
+        "--max-growth",
+        type=float,
+        default=util.SOAK_MAX_GROWTH,
+        help="max memory growth (MiB per hour)",
+    )
+    args = parser.parse_args()
+
+    frames = None
+    if args.video is not None and not cv2.VideoCapture(args.video).isOpened():
+        print("could not open video:", args.video)
+        sys.exit(1)
+    elif args.session is not None:
+        from replay import load_csv
+
+        frames = load_csv(args.session)
+    elif args.video is None:
+        from synthetic import SyntheticTrace
+
+        frames = list(SyntheticTrace("right arm ext", seed=0).frames())
+
+    samples, rss_growth, traced_growth = soak(
+        frames, args.duration, args.period, args.log, args.warmup, args.video
+    )
+
+    if len(get_measured(samples, args.warmup)) < util.SOAK_MIN_SESSIONS:
+        print(
+            f"not enough sessions after the {round(args.warmup)}s warm-up to measure "
+            + "memory growth, increase --duration"
+        )
+        sys.exit(1)
+
+    mib = 1024 * 1024
+    print(f"rss: {round(samples[-1]['rss'] / mib, 1)} MiB")
+    print(f"rss growth: {round(rss_growth / mib, 2)} MiB per hour")
+    print(f"traced growth: {round(traced_growth / mib, 2)} MiB per hour")
+
+    if max(rss_growth, traced_growth) > args.max_growth * mib:
+        print("memory growth detected, see the top sites in the log:", args.log)
+        sys.exit(1)
+
+    print("no memory growth detected")
+
+
+if __name__ == "__main__":
+    main()
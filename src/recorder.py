@@ -0,0 +1,181 @@
+"""
+recorder.py
+
+Session recorder module.
+Optionally records the annotated frames of a session (as shown on the gui) to a video
+file. The main worker thread only copies each frame into a bounded queue, and frames are
+resized and encoded on a separate encoder thread (see `FrameWriter` in "render.py").
+If the encoder falls behind, frames are dropped and counted rather than holding up
+capture and motion tracking.
+
+Enable the recorder with: `python src/main.py --record [<directory>]`
+
+see "doc/recorder.md" for more details
+
+"""
+
+import os, time, threading, util
+from render import FrameWriter
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class SessionRecorder:
+    """
+    session recorder: writes the annotated frames of each session to a video file
+
+    """
+
+    def __init__(
+        self,
+        path=util.DEFAULT_FILE_PATH,
+        size=None,
+        fps=util.RECORD_FPS,
+        codec=util.RENDER_CODEC,
+        queue_size=util.RECORD_QUEUE_SIZE,
+    ):
+        """
+        path: directory the recorded videos are saved to
+        size: (width, height) of the recorded videos (None to use the frame size)
+        fps: frame rate of the recorded videos
+        queue_size: max number of frames waiting to be encoded
+
+        """
+        self._path = path
+        self._size = size
+        self._fps = fps
+        self._codec = codec
+        self._queue_size = queue_size
+
+        self._name = None
+        self._writer = None
+        self._closing = None
+        self._next_time = None
+        self._frames = 0
+        self._dropped = 0
+
+    def start(self, name_id=""):
+        """
+        starts recording a new video (opened when the first frame is written)
+
+        """
+        self.stop()
+
+        prefix = f"{name_id}-" if name_id != "" else ""
+        self._name = os.path.join(
+            self._path, f'{prefix}{time.strftime("%y%m%d-%H%M%S")}.mp4'
+        )
+        self._next_time = None
+        self._frames = 0
+        self._dropped = 0
+
+    def write(self, img, timestamp):
+        """
+        adds an annotated frame to the recording without blocking
+        frames are written at the recording frame rate using their timestamps (frames
+        are skipped or repeated if the frame rate of the source is different)
+        img: the frame is copied, so the frame buffer can be reused
+        timestamp: session time of the frame (seconds)
+        returns the number of frames added to the recording
+
+        """
+        if self._name is None:
+            return 0
+
+        if self._writer is None:
+            height, width, _ = img.shape
+            try:
+                self._writer = FrameWriter(
+                    self._name,
+                    self._fps,
+                    self._size if self._size is not None else (width, height),
+                    self._codec,
+                    self._queue_size,
+                    drop=True,
+                )
+            except IOError as error:
+                """ the session carries on without a recording """
+                print(f"recording error: {error}")
+                self._name = None
+                return 0
+
+            self._next_time = timestamp
+
+        """ gaps in the session time (eg: skipped video frames) are not filled in """
+        if timestamp - self._next_time > 1:
+            self._next_time = timestamp
+
+        """ number of recording frames up to this frame """
+        slots = 0
+        while self._next_time <= timestamp:
+            self._next_time += 1 / self._fps
+            slots += 1
+
+        if slots == 0:
+            return 0
+
+        self._frames += slots
+        if self._writer.is_full():
+            self._dropped += slots
+            return 0
+
+        """ copied once, repeated frames share the copy """
+        img = img.copy()
+        added = 0
+        for _ in range(slots):
+            if self._writer.write(img):
+                added += 1
+            else:
+                self._dropped += 1
+
+        return added
+
+    def stop(self, wait=False):
+        """
+        stops recording, the remaining frames are encoded on a background thread
+        wait: True to wait until the video file is closed (eg: on exit)
+
+        """
+        if self._writer is not None:
+            writer, name = self._writer, self._name
+            self._closing = threading.Thread(
+                target=close_writer, args=(writer, name), daemon=True
+            )
+            self._closing.start()
+
+        self._writer = None
+        self._name = None
+
+        if wait and self._closing is not None:
+            self._closing.join()
+            self._closing = None
+
+    def get_stats(self):
+        """
+        returns the number of frames of the recording, the number of frames dropped
+        because the encoder fell behind and the drop rate
+
+        """
+        return {
+            "frames": self._frames,
+            "dropped": self._dropped,
+            "drop rate": self._dropped / self._frames if self._frames > 0 else 0,
+        }
+
+
+def close_writer(writer, name):
+    """
+    encodes the remaining frames and closes the video file
+    (called on a background thread)
+
+    """
+    try:
+        writer.close()
+        print(f"saved recording: {name}")
+    except Exception as error:
+        print(f'recording error: "{name}" ({error})')
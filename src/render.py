@@ -0,0 +1,296 @@
+"""
+render.py
+
+Review video renderer module.
+Renders an annotated copy of a video for review (eg: by a clinician) from its stored
+landmarks (landmark cache, session csv file or session store), without pose inference.
+Frames are drawn the same way as in the main worker thread (stick figure, bounding box
+and angles) with the movement counts, and encoded on a background writer thread so
+rendering runs much faster than real time.
+
+Usage: `python src/render.py <video> [--session <csv> | --session-id N] [--output <path>]`
+
+see "doc/render.md" for more details
+
+"""
+
+import cv2, os, queue, time, argparse, threading, util
+from movement import create_movements
+from motion import Motion
+from cache import LandmarkCache
+from store import SessionStore
+from replay import load_csv, load_store, load_cache
+from source import VideoFileSource
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class FrameWriter:
+    """
+    frame writer: encodes frames to a video file on a background thread
+    frames wait in a bounded queue, so encoding does not hold up drawing
+
+    """
+
+    def __init__(
+        self,
+        name,
+        fps,
+        size,
+        codec=util.RENDER_CODEC,
+        queue_size=util.RENDER_QUEUE_SIZE,
+        drop=False,
+    ):
+        """
+        name: filename of the output video
+        fps: frame rate of the output video
+        size: (width, height) of the output video (frames are resized to fit)
+        queue_size: max number of frames waiting to be encoded
+        drop: True to drop frames if the queue is full (eg: live sessions), otherwise
+            `write()` waits for the encoder
+
+        """
+        directory = os.path.dirname(name)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._writer = cv2.VideoWriter(name, cv2.VideoWriter_fourcc(*codec), fps, size)
+        if not self._writer.isOpened():
+            raise IOError(f'could not open video writer: "{name}"')
+
+        self._size = tuple(size)
+        self._queue = queue.Queue(queue_size)
+        self._drop = drop
+        self._written = 0
+        self._dropped = 0
+        self._error = None
+
+        self._thread = threading.Thread(target=self.encode, daemon=True)
+        self._thread.start()
+
+    def write(self, img):
+        """
+        adds a frame to be encoded (the frame must not be changed afterwards)
+        returns False if the frame was dropped because the queue is full
+
+        """
+        if self._error is not None:
+            raise self._error
+
+        if not self._drop:
+            self._queue.put(img)
+            return True
+
+        try:
+            self._queue.put_nowait(img)
+            return True
+        except queue.Full:
+            self._dropped += 1
+            return False
+
+    def encode(self):
+        """
+        writer thread: encodes the queued frames in order
+
+        """
+        while True:
+            img = self._queue.get()
+            if img is None:
+                break
+
+            if self._error is not None:
+                continue
+
+            try:
+                """ frames are resized here so resizing does not hold up drawing """
+                if (img.shape[1], img.shape[0]) != self._size:
+                    img = cv2.resize(img, self._size, interpolation=cv2.INTER_AREA)
+
+                self._writer.write(img)
+                self._written += 1
+            except Exception as error:
+                self._error = error
+
+    def close(self):
+        """
+        encodes the remaining frames and closes the video file
+
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._writer.release()
+
+        if self._error is not None:
+            raise self._error
+
+    def is_full(self):
+        """
+        returns True if the next frame would be dropped (or would wait for the encoder)
+
+        """
+        return self._queue.full()
+
+    def get_written(self):
+        return self._written
+
+    def get_dropped(self):
+        """
+        returns the number of frames dropped because the queue was full
+
+        """
+        return self._dropped
+
+
+def draw_counts(img, counts, timestamp):
+    """
+    overlays the session time and the count of each tracked movement on the frame
+    counts: count of each tracked movement keyed by name
+
+    """
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    minutes, seconds = divmod(int(timestamp), 60)
+    lines = [f"{minutes // 60}:{minutes % 60:02d}:{seconds:02d}"]
+    lines += [f"{name}: {count}" for name, count in counts.items()]
+
+    for i, line in enumerate(lines):
+        position = (20, 40 + i * 36)
+        cv2.putText(img, line, position, font, 1, util.BLACK, 5)
+        cv2.putText(img, line, position, font, 1, util.WHITE, 2)
+
+    return img
+
+
+def get_frames(name, session=None, session_id=None, cache=None, store=None):
+    """
+    loads the stored landmarks of a video as a list of (timestamp, landmarks)
+    from a session csv file, a session in the session store or the landmark cache
+    (in that order), returns None if no landmarks are stored
+
+    """
+    if session is not None:
+        return load_csv(session)
+
+    if session_id is not None:
+        store = store if store is not None else SessionStore()
+        return load_store(store, session_id)
+
+    cache = cache if cache is not None else LandmarkCache()
+    entry = cache.get(cache.get_key(name, Motion().get_params()))
+    return load_cache(entry) if entry is not None else None
+
+
+def render(name, output, frames, codec=util.RENDER_CODEC):
+    """
+    renders an annotated copy of a video from its stored landmarks
+    frames: list of (timestamp, landmarks), each video frame is drawn with the
+        landmarks of the last stored frame at or before its timestamp
+    returns the final count of each movement
+
+    """
+    cap = VideoFileSource(name)
+    if not cap.isOpened():
+        raise IOError(f'could not open video: "{name}"')
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or util.CAMERA_FPS
+    size = (
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    )
+
+    motion = Motion()
+    movements = create_movements()
+    writer = FrameWriter(output, fps, size, codec)
+
+    next_frame = 0
+    landmarks = []
+
+    try:
+        while True:
+            ret, img = cap.read()
+            if ret == False or img is None:
+                break
+
+            timestamp = cap.get_timestamp()
+
+            """ count every stored frame up to this frame (each is counted once) """
+            while (
+                next_frame < len(frames) and frames[next_frame][0] <= timestamp + 1e-6
+            ):
+                stored_time, landmarks = frames[next_frame]
+                next_frame += 1
+
+                for movement in movements.values():
+                    if movement.get_tracking_status():
+                        movement.count_movement(
+                            landmarks,
+                            [],
+                            None,
+                            util.VIDEO,
+                            timestamp=stored_time,
+                            frame_index=cap.get_index(),
+                        )
+
+            """ same drawing as the main worker thread (angles as in debug mode) """
+            img, pixels = motion.draw_landmarks(img, landmarks)
+            if len(landmarks) > 0:
+                for movement in movements.values():
+                    if not movement.get_tracking_status():
+                        continue
+
+                    for i, angle in enumerate(movement.get_state()["angles"]):
+                        img = movement.annotate(img, util.VIDEO, pixels, angle, i)
+
+            counts = {
+                name: movement.get_count()
+                for name, movement in movements.items()
+                if movement.get_tracking_status()
+            }
+            writer.write(draw_counts(img, counts, timestamp))
+    finally:
+        cap.release()
+        writer.close()
+
+    return {name: movement.get_count() for name, movement in movements.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="render an annotated review video from stored landmarks"
+    )
+    parser.add_argument("video", help="video file to render")
+    parser.add_argument("--session", default=None, help="session csv file")
+    parser.add_argument("--session-id", type=int, default=None, help="stored session")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--codec", default=util.RENDER_CODEC)
+    args = parser.parse_args()
+
+    frames = get_frames(args.video, args.session, args.session_id)
+    if frames is None:
+        print(
+            f'no stored landmarks for "{args.video}": open the video in the program '
+            + "first, or use --session / --session-id"
+        )
+        return
+
+    output = args.output
+    if output is None:
+        stem = os.path.splitext(os.path.basename(args.video))[0]
+        output = os.path.join(util.DEFAULT_FILE_PATH, f"{stem}-review.mp4")
+
+    start_time = time.perf_counter()
+    counts = render(args.video, output, frames, args.codec)
+
+    print(f"rendered {output} in {round(time.perf_counter() - start_time, 1)}s")
+    for name, count in counts.items():
+        print(f"{name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
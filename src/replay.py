@@ -0,0 +1,237 @@
+"""
+replay.py
+
+Replay module.
+Plays back recorded landmark streams (from session csv files, the session store or the
+landmark cache) in place of a video capture and motion tracking. This allows counting
+reps, parsing session data, signal emission and gui updates to be tested and benchmarked
+without a webcam or video, at a controlled rate, with the same results on every run.
+
+Usage: `python src/replay.py <session csv> [--repeat N]` (headless benchmark)
+
+see "doc/replay.md" for more details
+
+"""
+
+import cv2, time, hashlib, argparse, util
+import numpy as np
+from movement import create_movements
+from motion import Motion
+from file import File
+from cache import to_landmarks
+from source import FrameSource
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class ReplaySource(FrameSource):
+    """
+    replay source: plays back recorded landmarks in place of a video capture and
+    motion tracking
+
+    """
+
+    source_type = util.REPLAY
+    name = "replay"
+
+    def __init__(
+        self, frames, rate=None, size=(util.DISPLAY_WIDTH, util.DISPLAY_HEIGHT)
+    ):
+        """
+        frames: list of (timestamp, landmarks) to be played back in order
+        rate: frames per second to play back at (None to play back as fast as possible)
+        size: (width, height) of the blank frames the landmarks are drawn on
+
+        """
+        super().__init__()
+        self._frames = frames
+        self._rate = rate
+        self._size = size
+
+        self._blank = np.zeros((size[util.Y], size[util.X], 3), dtype=np.uint8)
+        self._opened = True
+        self._next_time = None
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self, img=None):
+        """
+        moves to the next recorded frame
+        returns a blank frame for the landmarks to be drawn on (copied into `img` if given)
+
+        """
+        if not self._opened or self._index + 1 >= len(self._frames):
+            return False, None
+
+        self.wait()
+        self._index += 1
+        self._timestamp = self._frames[self._index][0]
+        return True, self.copy_frame(self._blank, img)
+
+    def wait(self):
+        """
+        waits until the next frame is due (if playing back at a controlled rate)
+
+        """
+        if self._rate is None:
+            return
+
+        now = time.perf_counter()
+        if self._next_time is None:
+            self._next_time = now
+        elif self._next_time > now:
+            time.sleep(self._next_time - now)
+
+        self._next_time += 1 / self._rate
+
+    def get_landmarks(self):
+        """
+        returns the recorded landmarks of the current frame
+
+        """
+        if self._index < 0:
+            return []
+
+        return self._frames[self._index][1]
+
+    def get(self, prop):
+        """
+        returns the value of a video capture property
+
+        """
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self._frames)
+        if prop == cv2.CAP_PROP_FPS:
+            return self._rate if self._rate is not None else 0
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self._size[util.X]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self._size[util.Y]
+
+        return super().get(prop)
+
+    def set(self, prop, value):
+        """
+        sets the value of a video capture property (only seeking is supported)
+
+        """
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self._index = min(max(int(value), 0), len(self._frames)) - 1
+            self._timestamp = self._frames[self._index][0] if self._index >= 0 else 0
+            return True
+
+        return False
+
+    def release(self):
+        self._opened = False
+
+
+def from_points(points):
+    """
+    converts a list of saved (x, y) points to landmarks (id, x, y, visibility)
+    visibility is not saved, so all saved landmarks are treated as visible
+
+    """
+    return [(i, x, y, 1.0) for i, (x, y) in enumerate(points)]
+
+
+def load_csv(name):
+    """
+    loads the recorded frames from a session csv file
+
+    """
+    return File().read(name)
+
+
+def load_store(store, session_id):
+    """
+    loads the recorded frames of a session from the session store
+
+    """
+    return [(t, from_points(points)) for t, _, points in store.get_samples(session_id)]
+
+
+def load_cache(entry):
+    """
+    loads the recorded frames from a landmark cache entry (timestamps, landmarks)
+
+    """
+    timestamps, landmarks = entry
+    return [(float(t), to_landmarks(lm)) for t, lm in zip(timestamps, landmarks)]
+
+
+def repeat(frames, times):
+    """
+    repeats the recorded frames, offsetting the timestamps so they keep increasing
+
+    """
+    if len(frames) < 2:
+        return frames * times
+
+    period = frames[-1][0] - frames[0][0] + (frames[1][0] - frames[0][0])
+    return [(t + i * period, lm) for i in range(times) for t, lm in frames]
+
+
+def benchmark(frames):
+    """
+    runs the recorded frames through drawing, counting reps and parsing session data
+    (everything the main worker thread does after motion tracking, without the gui)
+    returns the frame rate, the final counts and a digest of the parsed session data
+
+    """
+    source = ReplaySource(frames)
+    motion = Motion()
+    movements = create_movements()
+    file = File()
+
+    start_time = time.perf_counter()
+    while True:
+        ret, img = source.read()
+        if ret == False:
+            break
+
+        landmarks = source.get_landmarks()
+        img, pixels = motion.draw_landmarks(img, landmarks)
+
+        for movement in movements.values():
+            if movement.get_tracking_status():
+                img, _ = movement.count_movement(
+                    landmarks,
+                    pixels,
+                    img,
+                    util.REPLAY,
+                    timestamp=source.get_timestamp(),
+                    frame_index=source.get_index(),
+                )
+
+        file.parse_movements(movements, landmarks, source.get_timestamp())
+
+    elapsed = time.perf_counter() - start_time
+    counts = {name: movement.get_count() for name, movement in movements.items()}
+    digest = hashlib.sha256(repr(file.get_data()).encode()).hexdigest()
+    return len(frames) / elapsed, counts, digest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="replay a recorded session")
+    parser.add_argument("session", help="session csv file to replay")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    frames = repeat(load_csv(args.session), args.repeat)
+    frame_rate, counts, digest = benchmark(frames)
+
+    print(f"{len(frames)} frames at {round(frame_rate)} fps")
+    for name, count in counts.items():
+        print(f"{name}: {count}")
+    print(f"session data digest: {digest}")
+
+
+if __name__ == "__main__":
+    main()
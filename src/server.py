@@ -0,0 +1,443 @@
+"""
+server.py
+
+Stream server module.
+Optional http server that lets other displays (eg: a wall screen or a tablet) follow a
+session from a web browser:
+- count / state updates are broadcast over a websocket (`/ws`)
+- the annotated preview is streamed as mjpeg (`/stream.mjpg`)
+- a simple page showing both is served at `/`
+
+Each frame is encoded once (on the encoder thread) and the same jpeg is sent to every
+client. Clients only ever get the latest frame / state, so a slow client skips updates
+and never holds up the main worker thread.
+
+Only python standard library modules are used for the server.
+
+Usage: `python src/server.py [--host HOST] [--port PORT]` (streams a synthetic test pattern)
+
+see "doc/server.md" for more details
+
+"""
+
+import cv2, json, time, base64, select, hashlib, argparse, threading, util
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+""" websocket handshake key (rfc 6455) and opcodes """
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+TEXT = 0x1
+CLOSE = 0x8
+PING = 0x9
+PONG = 0xA
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><title>PhysiCam</title></head>
+<body style="font-family: sans-serif; background: #000; color: #fff; text-align: center">
+<img src="/stream.mjpg" style="max-width: 100%">
+<h1 id="counts"></h1>
+<p id="state">connecting...</p>
+<script>
+function connect() {
+    const ws = new WebSocket(`ws://${location.host}/ws`);
+    ws.onmessage = (event) => {
+        const state = JSON.parse(event.data);
+        document.getElementById("counts").innerHTML = Object.entries(state.counts)
+            .map(([name, count]) => `${name}: ${count}`).join("<br>");
+        document.getElementById("state").textContent =
+            (state.recording ? (state.paused ? "paused" : "recording") : "stopped")
+            + ` - ${state["session time"]}s`;
+    };
+    ws.onclose = () => setTimeout(connect, 1000);
+}
+connect();
+</script>
+</body>
+</html>
+"""
+
+
+class Broadcast:
+    """
+    latest-value broadcast: publishing replaces the value, and each client waits for
+    a value newer than the last one it was sent (older values are skipped)
+
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._value = None
+        self._sequence = 0
+        self._closed = False
+
+    def publish(self, value):
+        with self._condition:
+            self._value = value
+            self._sequence += 1
+            self._condition.notify_all()
+
+    def wait(self, sequence, timeout=None):
+        """
+        waits for a value newer than `sequence`
+        returns (sequence, value) of the latest value (unchanged if timed out)
+
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._sequence != sequence or self._closed, timeout
+            )
+            return self._sequence, self._value
+
+    def get(self):
+        with self._condition:
+            return self._sequence, self._value
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def is_closed(self):
+        return self._closed
+
+
+class StreamServer:
+    """
+    stream server: broadcasts count / state updates and the annotated preview
+
+    """
+
+    def __init__(
+        self,
+        host=util.SERVER_HOST,
+        port=util.SERVER_PORT,
+        fps=util.STREAM_FPS,
+        quality=util.STREAM_QUALITY,
+    ):
+        """
+        host: address to bind to ("127.0.0.1" for this computer only, "0.0.0.0" for the lan)
+        port: port to bind to (0 to choose a free port)
+        fps: max frame rate of the preview stream
+        quality: jpeg quality (0 to 100) of the preview stream
+
+        """
+        self._host = host
+        self._port = port
+        self._fps = fps
+        self._quality = quality
+
+        self._frames = Broadcast()
+        self._jpegs = Broadcast()
+        self._states = Broadcast()
+
+        self._viewers = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    def start(self):
+        """
+        starts the http server and the encoder thread in the background
+
+        """
+        self._httpd = ThreadingHTTPServer((self._host, self._port), StreamHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stream = self
+        self._port = self._httpd.server_address[1]
+
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        threading.Thread(target=self.encode_frames, daemon=True).start()
+        print(f"stream server: http://{self._host}:{self._port}/")
+
+    def stop(self):
+        """
+        stops the http server and disconnects all clients
+
+        """
+        for broadcast in (self._frames, self._jpegs, self._states):
+            broadcast.close()
+
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def get_port(self):
+        return self._port
+
+    def publish_frame(self, img):
+        """
+        publishes the latest preview frame (rgb)
+        called from the main worker thread: only stores a reference to the frame, so the
+        frame must not be modified afterwards. Frames are encoded on the encoder thread.
+
+        """
+        if self._viewers > 0:
+            self._frames.publish(img)
+
+    def publish_state(self, state):
+        """
+        publishes the latest count / state update (a json serialisable dictionary)
+        only sent to clients if the state has changed
+
+        """
+        _, last = self._states.get()
+        message = json.dumps(state)
+        if message != last:
+            self._states.publish(message)
+
+    def encode_frames(self):
+        """
+        encoder thread: encodes each new frame once (at the max preview frame rate)
+        and publishes the jpeg to all preview clients
+
+        """
+        sequence = 0
+        while not self._frames.is_closed():
+            start_time = time.perf_counter()
+            sequence, img = self._frames.wait(sequence, timeout=1)
+            if img is None or self._viewers == 0:
+                continue
+
+            img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+            ret, jpeg = cv2.imencode(
+                ".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, self._quality]
+            )
+            if ret:
+                self._jpegs.publish(jpeg.tobytes())
+
+            """ limit the preview frame rate """
+            delay = 1 / self._fps - (time.perf_counter() - start_time)
+            if delay > 0:
+                time.sleep(delay)
+
+    def wait_jpeg(self, sequence):
+        """
+        waits for a jpeg newer than `sequence` (called from the client threads)
+        returns (sequence, jpeg) of the latest jpeg
+
+        """
+        return self._jpegs.wait(sequence, timeout=1)
+
+    def wait_state(self, sequence):
+        """
+        waits for a state newer than `sequence` (called from the client threads)
+        returns (sequence, state) of the latest state (json string)
+
+        """
+        return self._states.wait(sequence, timeout=1)
+
+    def get_state(self):
+        _, state = self._states.get()
+        return state
+
+    def is_stopped(self):
+        return self._states.is_closed()
+
+    def add_viewer(self, count):
+        """
+        counts the preview clients (frames are only encoded while there are clients)
+
+        """
+        with self._lock:
+            self._viewers += count
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    """
+    handles a single client connection (each client is handled on its own thread)
+
+    """
+
+    """
+    websocket handshakes must be http/1.1 (rfc 6455), so responses either have a
+    content length (the connection is kept alive) or close the connection
+
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        stream = self.server.stream
+
+        """ a slow client is disconnected rather than blocking forever """
+        self.connection.settimeout(util.SERVER_TIMEOUT)
+
+        if self.path == "/":
+            self.send_content(PAGE.encode(), "text/html")
+        elif self.path == "/state":
+            state = stream.get_state() or "{}"
+            self.send_content(state.encode(), "application/json")
+        elif self.path == "/stream.mjpg":
+            self.send_mjpeg(stream)
+        elif self.path == "/ws":
+            self.send_websocket(stream)
+        else:
+            self.send_error(404)
+
+    def send_content(self, content, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def send_mjpeg(self, stream):
+        """
+        streams the latest jpeg to the client until it disconnects
+
+        """
+        self.send_response(200)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        stream.add_viewer(1)
+        try:
+            sequence = 0
+            while not stream.is_stopped():
+                sequence, jpeg = stream.wait_jpeg(sequence)
+                if jpeg is None:
+                    continue
+
+                self.wfile.write(
+                    b"--frame\r\nContent-Type: image/jpeg\r\n"
+                    + f"Content-Length: {len(jpeg)}\r\n\r\n".encode()
+                    + jpeg
+                    + b"\r\n"
+                )
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            stream.add_viewer(-1)
+
+    def send_websocket(self, stream):
+        """
+        upgrades the connection to a websocket and sends each new state until the
+        client disconnects
+
+        """
+        key = self.headers.get("Sec-WebSocket-Key")
+        if self.headers.get("Upgrade", "").lower() != "websocket" or key is None:
+            self.send_error(400)
+            return
+
+        accept = hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", base64.b64encode(accept).decode())
+        self.end_headers()
+        self.wfile.flush()
+
+        try:
+            sequence = -1
+            while not stream.is_stopped():
+                latest, state = stream.wait_state(sequence)
+                if latest != sequence and state is not None:
+                    send_message(self.wfile, state.encode())
+                sequence = latest
+
+                """ handle messages from the client (close and ping) """
+                readable, _, _ = select.select([self.connection], [], [], 0)
+                if readable:
+                    opcode, payload = read_message(self.rfile)
+                    if opcode is None or opcode == CLOSE:
+                        send_message(self.wfile, b"", CLOSE)
+                        break
+                    if opcode == PING:
+                        send_message(self.wfile, payload, PONG)
+        except OSError:
+            pass
+
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        """
+        requests are not logged to the terminal
+
+        """
+        pass
+
+
+def send_message(wfile, payload, opcode=TEXT):
+    """
+    sends a websocket message (server messages are not masked)
+
+    """
+    header = bytearray([0x80 | opcode])
+    if len(payload) < 126:
+        header.append(len(payload))
+    elif len(payload) < 2**16:
+        header.append(126)
+        header += len(payload).to_bytes(2, "big")
+    else:
+        header.append(127)
+        header += len(payload).to_bytes(8, "big")
+
+    wfile.write(bytes(header) + payload)
+    wfile.flush()
+
+
+def read_message(rfile):
+    """
+    reads a websocket message from the client (client messages are masked)
+    returns (opcode, payload), or (None, None) if the client disconnected
+
+    """
+    header = rfile.read(2)
+    if len(header) < 2:
+        return None, None
+
+    opcode = header[0] & 0x0F
+    length = header[1] & 0x7F
+    if length == 126:
+        length = int.from_bytes(rfile.read(2), "big")
+    elif length == 127:
+        length = int.from_bytes(rfile.read(8), "big")
+
+    mask = rfile.read(4) if header[1] & 0x80 else b"\x00\x00\x00\x00"
+    payload = rfile.read(length)
+    return opcode, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+def main():
+    from source import SyntheticSource
+
+    parser = argparse.ArgumentParser(description="stream a synthetic test pattern")
+    parser.add_argument("--host", default=util.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=util.SERVER_PORT)
+    args = parser.parse_args()
+
+    server = StreamServer(args.host, args.port)
+    server.start()
+
+    source = SyntheticSource()
+    try:
+        while True:
+            _, img = source.read()
+            server.publish_frame(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+            server.publish_state(
+                {
+                    "recording": True,
+                    "paused": False,
+                    "session time": int(source.get_timestamp()),
+                    "counts": {"frames": source.get_index() + 1},
+                }
+            )
+            time.sleep(1 / util.CAMERA_FPS)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+shm.py
+
+Shared memory module.
+Contains a ring buffer of video frames (and their landmarks) in shared memory, used to
+pass frames between processes without pickling them. One producer writes the slots in
+turn and consumers only ever read the latest slot, so a slow consumer skips frames
+rather than holding up the producer.
+
+see "doc/shm.md" for more details
+
+"""
+
+import util
+import numpy as np
+from multiprocessing import shared_memory
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class FrameRing:
+    """
+    ring buffer of frames and landmarks in shared memory
+
+    """
+
+    """ header fields (int64) """
+    count_field = 0
+    width_field = 1
+    height_field = 2
+    slots_field = 3
+    closed_field = 4
+    header_size = 8
+
+    """ slot metadata fields (float64) """
+    sequence_field = 0
+    timestamp_field = 1
+    index_field = 2
+    landmarks_field = 3
+    meta_size = 4
+
+    def __init__(self, name=None, size=None, slots=util.SHM_SLOTS, create=True):
+        """
+        name: name of the shared memory block (generated if creating a new ring)
+        size: (width, height) of the frames (only needed when creating a new ring)
+        slots: number of frames held in the ring
+        create: True to create a new ring, False to attach to an existing ring
+
+        """
+        if create:
+            width, height = size
+            self._shm = shared_memory.SharedMemory(
+                name=name,
+                create=True,
+                size=self.get_size(width, height, slots),
+            )
+            self._header = np.ndarray((self.header_size,), np.int64, self._shm.buf)
+            self._header[:] = 0
+            self._header[self.width_field] = width
+            self._header[self.height_field] = height
+            self._header[self.slots_field] = slots
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._header = np.ndarray((self.header_size,), np.int64, self._shm.buf)
+
+        self._width = int(self._header[self.width_field])
+        self._height = int(self._header[self.height_field])
+        self._slots = int(self._header[self.slots_field])
+        self._last_read = 0
+
+        """ views of each slot: metadata, landmarks (33 x 4) and frame """
+        self._meta, self._landmarks, self._frames = [], [], []
+        offset = self._header.nbytes
+        for _ in range(self._slots):
+            meta = np.ndarray((self.meta_size,), np.float64, self._shm.buf, offset)
+            offset += meta.nbytes
+            landmarks = np.ndarray((33, 4), np.float32, self._shm.buf, offset)
+            offset += landmarks.nbytes
+            frame = np.ndarray(
+                (self._height, self._width, 3), np.uint8, self._shm.buf, offset
+            )
+            offset += frame.nbytes
+
+            self._meta.append(meta)
+            self._landmarks.append(landmarks)
+            self._frames.append(frame)
+
+    def get_size(self, width, height, slots):
+        """
+        returns the number of bytes needed for the ring
+
+        """
+        slot = self.meta_size * 8 + 33 * 4 * 4 + width * height * 3
+        return self.header_size * 8 + slot * slots
+
+    def get_name(self):
+        return self._shm.name
+
+    def get_frame_size(self):
+        return self._width, self._height
+
+    def write(self, frame, timestamp, index, landmarks=None):
+        """
+        writes a frame (and optionally its landmarks) to the next slot
+        the frame must be the same size as the ring
+
+        """
+        count = int(self._header[self.count_field])
+        slot = count % self._slots
+        meta = self._meta[slot]
+
+        """ mark the slot as being written so readers do not use a partial frame """
+        meta[self.sequence_field] = -1
+        self._frames[slot][:] = frame
+        meta[self.timestamp_field] = timestamp
+        meta[self.index_field] = index
+
+        if landmarks is not None and len(landmarks) > 0:
+            self._landmarks[slot][:] = landmarks
+            meta[self.landmarks_field] = 1
+        else:
+            meta[self.landmarks_field] = 0
+
+        meta[self.sequence_field] = count + 1
+        self._header[self.count_field] = count + 1
+
+    def read_latest(self, frame):
+        """
+        copies the latest frame into `frame` (must be the same size as the ring)
+        returns (timestamp, index, landmarks) or None if there is no new frame
+        landmarks is a (33, 4) array, or None if the producer did not provide landmarks
+
+        """
+        count = int(self._header[self.count_field])
+        if count == self._last_read:
+            return None
+
+        slot = (count - 1) % self._slots
+        meta = self._meta[slot]
+
+        frame[:] = self._frames[slot]
+        timestamp, index = meta[self.timestamp_field], int(meta[self.index_field])
+        landmarks = self._landmarks[slot].copy() if meta[self.landmarks_field] else None
+
+        """ the producer has lapped the ring while copying, skip this frame """
+        if meta[self.sequence_field] != count:
+            return None
+
+        self._last_read = count
+        return timestamp, index, landmarks
+
+    def is_closed(self):
+        return bool(self._header[self.closed_field])
+
+    def close_ring(self):
+        """
+        marks the ring as closed (called by the producer when there are no more frames)
+
+        """
+        self._header[self.closed_field] = 1
+
+    def close(self):
+        """
+        releases this process's view of the shared memory
+
+        """
+        self._meta, self._landmarks, self._frames = [], [], []
+        self._header = None
+        self._shm.close()
+
+    def unlink(self):
+        """
+        frees the shared memory (called once by the process that created the ring)
+
+        """
+        self._shm.unlink()
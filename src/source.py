@@ -0,0 +1,506 @@
+"""
+source.py
+
+Frame source module.
+Contains a generic frame source class and the input sources supported by the program:
+- Webcam (default backend for each platform, eg: V4L2 on Linux, DirectShow on Windows)
+- Video files
+- Image sequences (a directory of images)
+- Synthetic test pattern
+- Shared memory (frames written to a ring buffer by another process)
+
+All frame sources have the same interface as `cv2.VideoCapture` and report the timestamp,
+index and metadata of each frame, so the choice of source does not change the main loop.
+
+see "doc/source.md" for more details
+
+"""
+
+import cv2, os, sys, time, util
+import numpy as np
+from shm import FrameRing
+from cache import to_landmarks
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class FrameSource:
+    """
+    generic frame source
+
+    """
+
+    """ input source type (see "util.py"), used to decide how frames are played back """
+    source_type = util.VIDEO
+    name = "source"
+
+    def __init__(self):
+        self._timestamp = 0
+        self._index = -1
+
+    def isOpened(self):
+        """
+        returns True while the source is open
+        (sources stay open at the end of their frames, like `cv2.VideoCapture`)
+
+        """
+        return False
+
+    def read(self, img=None):
+        """
+        reads the next frame (into `img` if it is given and the same size as the frame)
+        returns (True, frame) or (False, None) if there are no more frames
+
+        """
+        return False, None
+
+    def copy_frame(self, frame, img=None):
+        """
+        copies the frame into `img` if it is the same size, else returns a new copy
+
+        """
+        if img is None or img.shape != frame.shape or img.dtype != frame.dtype:
+            return frame.copy()
+
+        np.copyto(img, frame)
+        return img
+
+    def get(self, prop):
+        """
+        returns the value of a video capture property
+
+        """
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self._timestamp * 1000
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self._index + 1
+
+        return 0
+
+    def set(self, prop, value):
+        """
+        sets the value of a video capture property
+        returns False if the property is not supported
+
+        """
+        return False
+
+    def release(self):
+        pass
+
+    def get_source_type(self):
+        return self.source_type
+
+    def get_timestamp(self):
+        """
+        returns the timestamp of the current frame in seconds
+
+        """
+        return self._timestamp
+
+    def get_index(self):
+        """
+        returns the index of the current frame
+
+        """
+        return self._index
+
+    def set_index(self, index):
+        """
+        sets the index of the current frame (eg: once a seek has been checked against
+        the timestamps of the video)
+
+        """
+        self._index = index
+
+    def get_metadata(self):
+        """
+        returns a dictionary describing the source and the current frame
+
+        """
+        return {
+            "source": self.name,
+            "width": int(self.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": self.get(cv2.CAP_PROP_FPS),
+            "frame count": int(self.get(cv2.CAP_PROP_FRAME_COUNT)),
+            "index": self._index,
+            "timestamp": self._timestamp,
+        }
+
+    def get_landmarks(self):
+        """
+        returns the landmarks of the current frame if provided by the source
+        returns None if motion tracking needs to be run on the frame
+
+        """
+        return None
+
+    def apply_policy(self, policy):
+        """
+        negotiates the frame size with the capture policy
+        returns the negotiated (width, height, fps, fourcc)
+
+        """
+        return policy.negotiate(self)
+
+
+class CaptureSource(FrameSource):
+    """
+    frame source backed by `cv2.VideoCapture`
+
+    """
+
+    def __init__(self, cap):
+        super().__init__()
+        self._cap = cap
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def read(self, img=None):
+        ret, img = self._cap.read(img)
+        if ret and img is not None:
+            self._index += 1
+            self._timestamp = self.read_timestamp()
+
+        return ret, img
+
+    def grab(self):
+        """
+        moves to the next frame without decoding it
+        returns False if there are no more frames
+
+        """
+        ret = self._cap.grab()
+        if ret:
+            self._index += 1
+            self._timestamp = self.read_timestamp()
+
+        return ret
+
+    def read_timestamp(self):
+        return self._cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+
+    def get(self, prop):
+        return self._cap.get(prop)
+
+    def set(self, prop, value):
+        return self._cap.set(prop, value)
+
+    def release(self):
+        self._cap.release()
+
+
+class WebcamSource(CaptureSource):
+    """
+    webcam: uses the default capture backend for the platform
+    frames are timestamped with the time they were captured
+
+    """
+
+    source_type = util.WEBCAM
+    name = "webcam"
+
+    def __init__(self, device=0):
+        super().__init__(cv2.VideoCapture(device, self.get_backend()))
+        self._device = device
+
+    def get_backend(self):
+        """
+        returns the capture backend for the current platform
+
+        """
+        if sys.platform.startswith("win"):
+            return cv2.CAP_DSHOW
+        if sys.platform.startswith("linux"):
+            return cv2.CAP_V4L2
+        if sys.platform == "darwin":
+            return cv2.CAP_AVFOUNDATION
+
+        return cv2.CAP_ANY
+
+    def read_timestamp(self):
+        return time.time()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self._index + 1
+
+        return self._cap.get(prop)
+
+    def apply_policy(self, policy):
+        return policy.apply_webcam(self)
+
+
+class VideoFileSource(CaptureSource):
+    """
+    video file: frames are timestamped with their position in the video
+
+    """
+
+    name = "video"
+
+    def __init__(self, filename):
+        super().__init__(cv2.VideoCapture(filename))
+        self._filename = filename
+
+    def set(self, prop, value):
+        ret = self._cap.set(prop, value)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self._index = int(self._cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+
+        return ret
+
+    def get_metadata(self):
+        metadata = super().get_metadata()
+        metadata["filename"] = self._filename
+        return metadata
+
+    def apply_policy(self, policy):
+        return policy.apply_video(self)
+
+
+class ImageDirectorySource(FrameSource):
+    """
+    image sequence: plays back the images in a directory in filename order
+    frames are timestamped using the given frame rate
+
+    """
+
+    name = "images"
+    extensions = (".png", ".jpg", ".jpeg", ".bmp")
+
+    def __init__(self, path, fps=util.CAMERA_FPS):
+        super().__init__()
+        self._path = path
+        self._fps = fps
+
+        self._images = []
+        if os.path.isdir(path):
+            self._images = sorted(
+                os.path.join(path, image)
+                for image in os.listdir(path)
+                if image.lower().endswith(self.extensions)
+            )
+
+        self._size = (0, 0)
+        if len(self._images) > 0:
+            img = cv2.imread(self._images[0])
+            if img is not None:
+                self._size = (img.shape[1], img.shape[0])
+
+    def isOpened(self):
+        return len(self._images) > 0
+
+    def read(self, img=None):
+        """
+        images are decoded into new frames (`img` is not used)
+
+        """
+        while self._index + 1 < len(self._images):
+            self._index += 1
+            self._timestamp = self._index / self._fps
+
+            img = cv2.imread(self._images[self._index])
+            if img is not None:
+                return True, img
+
+        return False, None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self._size[util.X]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self._size[util.Y]
+        if prop == cv2.CAP_PROP_FPS:
+            return self._fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self._images)
+
+        return super().get(prop)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self._index = min(max(int(value), 0), len(self._images)) - 1
+            return True
+
+        return False
+
+    def get_metadata(self):
+        metadata = super().get_metadata()
+        if 0 <= self._index < len(self._images):
+            metadata["filename"] = self._images[self._index]
+
+        return metadata
+
+
+class SyntheticSource(FrameSource):
+    """
+    synthetic test pattern: colour bars with a moving bar and the frame index
+    frames are timestamped using the given frame rate
+
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        size=(util.DISPLAY_WIDTH, util.DISPLAY_HEIGHT),
+        fps=util.CAMERA_FPS,
+        num_frames=None,
+    ):
+        """
+        size: (width, height) of the frames
+        fps: frame rate used to timestamp the frames
+        num_frames: number of frames to generate (None to generate frames forever)
+
+        """
+        super().__init__()
+        self._size = size
+        self._fps = fps
+        self._num_frames = num_frames
+
+        """ draw the colour bars once, frames are copies with the moving parts added """
+        width, height = size
+        colours = [util.WHITE, util.YELLOW, util.CYAN, util.GREEN]
+        colours += [util.MAGENTA, util.RED, util.BLUE, util.BLACK]
+        self._pattern = np.zeros((height, width, 3), dtype=np.uint8)
+        for i, colour in enumerate(colours):
+            start, end = i * width // len(colours), (i + 1) * width // len(colours)
+            self._pattern[:, start:end] = colour
+
+    def isOpened(self):
+        return True
+
+    def read(self, img=None):
+        if self._num_frames is not None and self._index + 1 >= self._num_frames:
+            return False, None
+
+        self._index += 1
+        self._timestamp = self._index / self._fps
+
+        width, height = self._size
+        img = self.copy_frame(self._pattern, img)
+        x = int(self._index * 8 % width)
+        img[:, x : x + 8] = util.BLACK
+        cv2.putText(
+            img,
+            str(self._index),
+            (20, height - 20),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            1.5,
+            util.BLACK,
+            3,
+        )
+        return True, img
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self._size[util.X]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self._size[util.Y]
+        if prop == cv2.CAP_PROP_FPS:
+            return self._fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self._num_frames if self._num_frames is not None else 0
+
+        return super().get(prop)
+
+
+class SharedMemorySource(FrameSource):
+    """
+    shared memory: reads the latest frame written to a shared memory ring buffer
+    by a producer process (landmarks are provided if the producer tracked motion)
+
+    """
+
+    source_type = util.WEBCAM
+    name = "shared memory"
+
+    def __init__(self, ring_name, timeout=1):
+        """
+        ring_name: name of the shared memory ring buffer
+        timeout: seconds to wait for a new frame before giving up
+
+        """
+        super().__init__()
+        self._ring = FrameRing(name=ring_name, create=False)
+        self._timeout = timeout
+        self._opened = True
+
+        width, height = self._ring.get_frame_size()
+        self._frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self._landmarks = None
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self, img=None):
+        """
+        waits for a new frame and returns a copy of it (copied into `img` if given)
+        older frames that were not read in time are skipped
+
+        """
+        if img is None or img.shape != self._frame.shape or img.dtype != np.uint8:
+            img = np.empty_like(self._frame)
+
+        deadline = time.perf_counter() + self._timeout
+        while self._opened:
+            latest = self._ring.read_latest(img)
+            if latest is not None:
+                self._timestamp, self._index, landmarks = latest
+                self._landmarks = None
+                if landmarks is not None:
+                    self._landmarks = to_landmarks(landmarks)
+
+                return True, img
+
+            if self._ring.is_closed() or time.perf_counter() > deadline:
+                break
+
+            time.sleep(0.001)
+
+        return False, None
+
+    def get(self, prop):
+        width, height = self._ring.get_frame_size()
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return height
+
+        return super().get(prop)
+
+    def get_landmarks(self):
+        return self._landmarks
+
+    def release(self):
+        if self._opened:
+            self._opened = False
+            self._ring.close()
+
+
+def produce(source, ring):
+    """
+    shared memory producer: copies the frames of any frame source into a ring buffer
+    frames are resized to the size of the ring if needed
+
+    """
+    width, height = ring.get_frame_size()
+    while source.isOpened():
+        ret, img = source.read()
+        if ret == False or img is None:
+            break
+
+        if img.shape[1] != width or img.shape[0] != height:
+            img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+
+        ring.write(img, source.get_timestamp(), source.get_index())
+
+    ring.close_ring()
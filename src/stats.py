@@ -0,0 +1,270 @@
+"""
+stats.py
+
+Session statistics module.
+Keeps running statistics of a session as it is recorded, so a summary is available as soon
+as the session stops (without re-reading the session data). Each frame is an O(1) update:
+- rep durations (time between reps): mean, standard deviation, min and max (welford)
+- fatigue trend: change in rep duration per rep (least squares slope)
+- rest time: time between reps longer than `util.REST_PERIOD`
+- reps per minute of the session (histogram)
+- time spent in each movement phase
+
+see "doc/stats.md" for more details
+
+"""
+
+import math, util
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class RunningStats:
+    """
+    running mean, variance, min and max of a series of values (welford's algorithm)
+
+    """
+
+    def __init__(self):
+        self._count = 0
+        self._mean = 0
+        self._m2 = 0
+        self._min = None
+        self._max = None
+
+    def update(self, value):
+        self._count += 1
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+
+        self._min = value if self._min is None else min(self._min, value)
+        self._max = value if self._max is None else max(self._max, value)
+
+    def get_count(self):
+        return self._count
+
+    def get_mean(self):
+        return self._mean if self._count > 0 else None
+
+    def get_variance(self):
+        """
+        returns the sample variance (None if there are less than two values)
+
+        """
+        return self._m2 / (self._count - 1) if self._count > 1 else None
+
+    def get_stdev(self):
+        variance = self.get_variance()
+        return math.sqrt(variance) if variance is not None else None
+
+    def get_min(self):
+        return self._min
+
+    def get_max(self):
+        return self._max
+
+
+class Trend:
+    """
+    running least squares slope of a series of (x, y) values
+
+    """
+
+    def __init__(self):
+        self._n = 0
+        self._sum_x = 0
+        self._sum_y = 0
+        self._sum_xx = 0
+        self._sum_xy = 0
+
+    def update(self, x, y):
+        self._n += 1
+        self._sum_x += x
+        self._sum_y += y
+        self._sum_xx += x * x
+        self._sum_xy += x * y
+
+    def get_slope(self):
+        """
+        returns the slope (None if there are less than two values)
+
+        """
+        denominator = self._n * self._sum_xx - self._sum_x**2
+        if self._n < 2 or denominator == 0:
+            return None
+
+        return (self._n * self._sum_xy - self._sum_x * self._sum_y) / denominator
+
+
+class MovementStats:
+    """
+    running statistics of a single movement
+
+    """
+
+    def __init__(self):
+        self._count = None
+        self._reps = 0
+        self._last_rep = None
+        self._durations = RunningStats()
+        self._trend = Trend()
+        self._rest_time = 0
+        self._reps_per_minute = []
+        self._phase_times = {phase: 0 for phase in util.PHASES}
+
+    def update(self, movement, timestamp, frame_time):
+        """
+        updates the statistics from the movement on the current frame
+        frame_time: time since the previous frame (seconds)
+
+        """
+        self._phase_times[movement.get_phase()] += frame_time
+
+        """
+        movement counts can be reset during a session, and reps counted before the
+        statistics started (eg: a video resumed after being stopped) have no duration
+
+        """
+        count = movement.get_count()
+        if self._count is None or count < self._count:
+            self._count = count
+
+        while self._count < count:
+            self._count += 1
+            self.add_rep(timestamp)
+
+    def add_rep(self, timestamp):
+        self._reps += 1
+
+        if self._last_rep is not None:
+            duration = timestamp - self._last_rep
+            self._durations.update(duration)
+            self._trend.update(self._durations.get_count(), duration)
+
+            if duration > util.REST_PERIOD:
+                self._rest_time += duration
+
+        self._last_rep = timestamp
+
+        """ reps per minute of the session """
+        minute = int(timestamp // 60)
+        if minute >= len(self._reps_per_minute):
+            self._reps_per_minute.extend([0] * (minute + 1 - len(self._reps_per_minute)))
+        self._reps_per_minute[minute] += 1
+
+    def get_summary(self, duration):
+        """
+        returns a dictionary summarising the movement
+        duration: length of the session (seconds)
+
+        """
+        minutes = math.ceil(duration / 60) if duration > 0 else 0
+        reps_per_minute = self._reps_per_minute + [0] * max(
+            0, minutes - len(self._reps_per_minute)
+        )
+
+        return {
+            "reps": self._reps,
+            "reps per minute": self._reps / (duration / 60) if duration > 0 else 0,
+            "rep duration mean": self._durations.get_mean(),
+            "rep duration stdev": self._durations.get_stdev(),
+            "rep duration min": self._durations.get_min(),
+            "rep duration max": self._durations.get_max(),
+            "fatigue trend": self._trend.get_slope(),
+            "rest time": self._rest_time,
+            "reps per minute histogram": reps_per_minute,
+            "phase times": self._phase_times.copy(),
+        }
+
+
+class SessionStats:
+    """
+    running statistics of a session: updated every frame while recording
+
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._movements = {}
+        self._start_time = None
+        self._last_time = None
+
+    def update(self, movements, timestamp):
+        """
+        updates the statistics of all tracked movements on the current frame
+        movements: dictionary of movements keyed by name
+        timestamp: session time of the frame (seconds)
+
+        """
+        if self._start_time is None:
+            self._start_time = timestamp
+
+        frame_time = timestamp - self._last_time if self._last_time is not None else 0
+        self._last_time = timestamp
+
+        for name, movement in movements.items():
+            if not movement.get_tracking_status():
+                continue
+
+            if name not in self._movements:
+                self._movements[name] = MovementStats()
+            self._movements[name].update(movement, timestamp, max(frame_time, 0))
+
+    def get_duration(self):
+        if self._start_time is None:
+            return 0
+
+        return self._last_time - self._start_time
+
+    def get_summary(self):
+        """
+        returns a dictionary summarising the session (session duration and a summary
+        of each tracked movement)
+
+        """
+        duration = self.get_duration()
+        return {
+            "duration": duration,
+            "movements": {
+                name: stats.get_summary(duration)
+                for name, stats in self._movements.items()
+            },
+        }
+
+
+def format_summary(summary):
+    """
+    returns the session summary as lines of text (eg: to be shown in terminal)
+
+    """
+    lines = [f"session duration: {round(summary['duration'], 1)}s"]
+    for name, stats in summary["movements"].items():
+        lines.append(
+            f"{name}: {stats['reps']} reps, "
+            + f"{round(stats['reps per minute'], 1)} reps/min, "
+            + f"rest {round(stats['rest time'], 1)}s"
+        )
+
+        if stats["rep duration mean"] is not None:
+            stdev = stats["rep duration stdev"] or 0
+            lines.append(
+                f"    rep duration: {round(stats['rep duration mean'], 2)}s "
+                + f"(sd {round(stdev, 2)}s)"
+            )
+        if stats["fatigue trend"] is not None:
+            lines.append(f"    fatigue trend: {stats['fatigue trend']:+.3f}s per rep")
+
+        phases = ", ".join(
+            f"{phase} {round(time, 1)}s" for phase, time in stats["phase times"].items()
+        )
+        lines.append(f"    phases: {phases}")
+
+    return lines
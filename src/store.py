@@ -0,0 +1,243 @@
+"""
+store.py
+
+Session store module.
+Stores recorded sessions in an embedded SQLite database alongside the csv files.
+Session metadata is indexed by patient name / ID and date, and samples are inserted
+in batched transactions, so a patient's history can be queried without reading
+every csv file.
+
+Usage: `python src/store.py <name_id> [--movement MOVEMENT] [--days N]`
+
+see "doc/store.md" for more details
+
+"""
+
+import os, sqlite3, time, argparse, util
+from array import array
+from contextlib import closing
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class SessionStore:
+    """
+    session store: sqlite database of recorded sessions
+
+    """
+
+    schema = [
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY,
+            name_id TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            duration REAL NOT NULL
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS sessions_name_id_started_at
+        ON sessions (name_id, started_at)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS sessions_started_at ON sessions (started_at)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS counts (
+            session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+            movement TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (session_id, movement)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS samples (
+            session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+            time REAL NOT NULL,
+            counts TEXT NOT NULL,
+            landmarks BLOB
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS samples_session_id ON samples (session_id, time)
+        """,
+    ]
+
+    def __init__(self, path=util.DEFAULT_DB_PATH, batch_size=util.DB_BATCH_SIZE):
+        """
+        path: path to the database file
+        batch_size: number of samples inserted per batch
+
+        """
+        self._path = path
+        self._batch_size = batch_size
+
+        directory = os.path.dirname(self._path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with closing(self.connect()) as db:
+            db.execute("PRAGMA journal_mode = WAL")
+            with db:
+                for statement in self.schema:
+                    db.execute(statement)
+
+    def connect(self):
+        """
+        opens a new connection to the database
+        (a connection is opened per call so the store can be used from any thread)
+
+        """
+        db = sqlite3.connect(self._path, timeout=10)
+        db.execute("PRAGMA foreign_keys = ON")
+        db.execute("PRAGMA synchronous = NORMAL")
+        return db
+
+    def add_session(self, name_id, started_at, duration, counts, samples):
+        """
+        adds a session and its samples in a single transaction
+        counts: dictionary of final counts for each movement
+        samples: iterable of (time, counts string, landmarks blob) tuples
+        returns the id of the new session
+
+        """
+        with closing(self.connect()) as db:
+            with db:
+                cursor = db.execute(
+                    "INSERT INTO sessions (name_id, started_at, duration) "
+                    "VALUES (?, ?, ?)",
+                    (name_id, started_at, duration),
+                )
+                session_id = cursor.lastrowid
+
+                db.executemany(
+                    "INSERT INTO counts (session_id, movement, count) VALUES (?, ?, ?)",
+                    [(session_id, key, value) for key, value in counts.items()],
+                )
+
+                """ insert samples in batches to bound memory use """
+                batch = []
+                for sample in samples:
+                    batch.append((session_id, *sample))
+                    if len(batch) >= self._batch_size:
+                        self.insert_samples(db, batch)
+                        batch = []
+
+                self.insert_samples(db, batch)
+
+        return session_id
+
+    def insert_samples(self, db, batch):
+        db.executemany(
+            "INSERT INTO samples (session_id, time, counts, landmarks) "
+            "VALUES (?, ?, ?, ?)",
+            batch,
+        )
+
+    def get_sessions(self, name_id, since=None, until=None):
+        """
+        returns the (id, started_at, duration) of a patient's sessions between two dates
+        since / until: unix timestamps, defaults to all sessions
+
+        """
+        with closing(self.connect()) as db:
+            return db.execute(
+                "SELECT id, started_at, duration FROM sessions "
+                "WHERE name_id = ? AND started_at >= ? AND started_at < ? "
+                "ORDER BY started_at",
+                (name_id, *self.get_range(since, until)),
+            ).fetchall()
+
+    def get_counts(self, name_id, movement, since=None, until=None):
+        """
+        returns the (started_at, count) of a movement for a patient's sessions
+        between two dates, eg: all sit to stand counts for a patient over 90 days
+
+        """
+        with closing(self.connect()) as db:
+            return db.execute(
+                "SELECT sessions.started_at, counts.count FROM sessions "
+                "JOIN counts ON counts.session_id = sessions.id "
+                "WHERE sessions.name_id = ? "
+                "AND sessions.started_at >= ? AND sessions.started_at < ? "
+                "AND counts.movement = ? "
+                "ORDER BY sessions.started_at",
+                (name_id, *self.get_range(since, until), movement),
+            ).fetchall()
+
+    def get_samples(self, session_id):
+        """
+        returns the (time, counts, landmarks) samples of a session in time order
+        landmarks are returned as a list of (x, y) tuples, or an empty list
+
+        """
+        with closing(self.connect()) as db:
+            rows = db.execute(
+                "SELECT time, counts, landmarks FROM samples "
+                "WHERE session_id = ? ORDER BY time",
+                (session_id,),
+            ).fetchall()
+
+        return [(t, counts, unpack_landmarks(blob)) for t, counts, blob in rows]
+
+    def delete_session(self, session_id):
+        """
+        deletes a session along with its counts and samples
+
+        """
+        with closing(self.connect()) as db:
+            with db:
+                db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def get_range(self, since, until):
+        since = since if since is not None else 0
+        until = until if until is not None else float("inf")
+        return since, until
+
+
+def pack_landmarks(points):
+    """
+    packs a list of (x, y) tuples into a blob of 32-bit floats
+    returns None if there are no landmarks
+
+    """
+    if len(points) == 0:
+        return None
+
+    return array("f", [value for point in points for value in point]).tobytes()
+
+
+def unpack_landmarks(blob):
+    """
+    unpacks a blob of 32-bit floats into a list of (x, y) tuples
+
+    """
+    if blob is None:
+        return []
+
+    values = array("f")
+    values.frombytes(blob)
+    return list(zip(values[0::2], values[1::2]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="query a patient's session history")
+    parser.add_argument("name_id", help="patient name or id")
+    parser.add_argument("--movement", default="sit to stand")
+    parser.add_argument("--days", type=float, default=90)
+    args = parser.parse_args()
+
+    store = SessionStore()
+    since = time.time() - args.days * 24 * 60 * 60
+    for started_at, count in store.get_counts(args.name_id, args.movement, since):
+        date = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started_at))
+        print(f"{date}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,570 @@
+"""
+synthetic.py
+
+Synthetic landmark trace module.
+Generates realistic 33-landmark traces of the configured movements (arm extensions and
+sit to stand) with a known number of reps, for load testing counting reps and writing
+session data far beyond what can be recorded.
+
+Each trace is generated from a simple 2d kinematic model of the body (joint angles
+driving fixed length segments), with:
+- a controllable rep rate and rep to rep variability
+- gaussian noise on the landmark co-ordinates
+- visibility dropouts (some landmarks not visible) and frames where the person is lost
+- edge of frame excursions (the person stepping partly out of frame)
+
+Dropouts and excursions never last long enough to hide a whole rep, so the expected
+counts stay exact. Frames are generated in chunks with numpy, so traces of millions of
+frames can be generated without holding them all in memory.
+
+Usage: `python src/synthetic.py [movement] [--reps N] [--rate R] [--noise S]
+[--dropouts D] [--excursions E] [--seed N] [--save] [--store PATH] [--gate]`
+
+see "doc/synthetic.md" for more details
+
+"""
+
+import cv2, math, time, argparse, util
+import numpy as np
+from movement import create_movements
+from file import File
+from store import SessionStore
+from gate import MotionGate
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+""" movements that traces can be generated for (same names as `create_movements()`) """
+MOVEMENTS = ("right arm ext", "left arm ext", "sit to stand")
+
+"""
+front view of a person standing (normalised co-ordinates, in landmark order)
+the person's right side is on the left of the frame
+- face: nose, left eye (inner, centre, outer), right eye, ears and mouth
+- left and right shoulders
+- arms: elbows, wrists, pinkies, index fingers and thumbs (set by the arm model)
+- left and right hips, knees, ankles, heels and foot indexes
+
+"""
+FRONT_POSE = (
+    [(0.5, 0.2), (0.51, 0.185), (0.52, 0.185), (0.53, 0.185), (0.49, 0.185)]
+    + [(0.48, 0.185), (0.47, 0.185), (0.545, 0.195), (0.455, 0.195)]
+    + [(0.51, 0.225), (0.49, 0.225)]
+    + [(0.58, 0.32), (0.42, 0.32)]
+    + [(0, 0)] * 10
+    + [(0.55, 0.58), (0.45, 0.58), (0.55, 0.74), (0.45, 0.74), (0.55, 0.9)]
+    + [(0.45, 0.9), (0.555, 0.92), (0.445, 0.92), (0.57, 0.93), (0.43, 0.93)]
+)
+
+""" landmarks joined by a limb when rendering a frame (see `render_frame()`) """
+LIMBS = (
+    [(11, 12), (11, 23), (12, 24), (23, 24), (11, 13), (13, 15), (12, 14), (14, 16)]
+    + [(23, 25), (25, 27), (24, 26), (26, 28), (27, 31), (28, 32)]
+)
+
+""" segment lengths (normalised) """
+UPPER_ARM = 0.13
+FOREARM = 0.12
+HAND = 0.03
+SHANK = 0.2
+THIGH = 0.2
+TRUNK = 0.28
+HEAD = 0.07
+
+
+class SyntheticTrace:
+    """
+    synthetic trace: a generated landmark trace of a movement with a known number of reps
+
+    """
+
+    """ fractions of each rep spent resting, rising, holding and returning """
+    rest = 0.125
+    rise = 0.25
+    hold = 0.25
+
+    """ max length of a dropout or excursion (as a fraction of the shortest rep) """
+    max_gap = 0.2
+
+    """ offset of the far side of the body in the side view """
+    depth = (0.015, -0.005)
+
+    def __init__(
+        self,
+        movement=MOVEMENTS[0],
+        reps=util.SYNTHETIC_REPS,
+        rate=util.SYNTHETIC_RATE,
+        fps=util.CAMERA_FPS,
+        noise=util.SYNTHETIC_NOISE,
+        variability=0.1,
+        dropouts=0,
+        excursions=0,
+        seed=None,
+    ):
+        """
+        movement: name of the movement to generate (see `MOVEMENTS`)
+        reps: number of reps in the trace
+        rate: reps per minute
+        fps: frame rate of the trace
+        noise: standard deviation of the landmark co-ordinate noise (normalised)
+        variability: max change in the length of each rep (fraction of the mean length)
+        dropouts: visibility dropouts / lost frames per minute
+        excursions: edge of frame excursions per minute
+        seed: random seed (the same seed generates the same trace)
+
+        """
+        if movement not in MOVEMENTS:
+            raise ValueError(f"invalid movement: {movement}")
+
+        self._movement = movement
+        self._reps = reps
+        self._fps = fps
+        self._noise = noise
+        self._seed = seed
+
+        rng = np.random.default_rng(seed)
+
+        """ length and start time of each rep """
+        period = 60 / rate
+        self._periods = period * (1 + variability * rng.uniform(-1, 1, reps))
+        self._starts = np.concatenate(([0], np.cumsum(self._periods)))
+        self._num_frames = int(math.ceil(self._starts[-1] * fps))
+
+        """ dropouts and excursions: (start time, end time, kind, value) """
+        max_gap = self.max_gap * (self._periods.min() if reps > 0 else period)
+        self._events = []
+        for per_minute, kinds in [
+            (dropouts, ("lost", "hidden")),
+            (excursions, ("edge",)),
+        ]:
+            num_events = rng.poisson(per_minute * self.get_duration() / 60)
+            for start in np.sort(rng.uniform(0, self.get_duration(), num_events)):
+                kind = kinds[rng.integers(len(kinds))]
+                value = rng.choice([-1, 1]) * rng.uniform(0.4, 0.5)
+                length = rng.uniform(0.25, 1) * max_gap
+                self._events.append((start, start + length, kind, value))
+
+    def get_params(self):
+        return {
+            "movement": self._movement,
+            "reps": self._reps,
+            "fps": self._fps,
+            "noise": self._noise,
+            "events": len(self._events),
+            "seed": self._seed,
+        }
+
+    def get_num_frames(self):
+        return self._num_frames
+
+    def get_duration(self):
+        """
+        returns the length of the trace (seconds)
+
+        """
+        return float(self._starts[-1])
+
+    def get_rep_times(self):
+        """
+        returns the (start, end) time of each rep (seconds)
+
+        """
+        return list(zip(self._starts[:-1].tolist(), self._starts[1:].tolist()))
+
+    def get_expected_counts(self):
+        """
+        returns the expected count of every movement at the end of the trace
+        (only the generated movement is counted)
+
+        """
+        return {
+            name: self._reps if name == self._movement else 0 for name in MOVEMENTS
+        }
+
+    def get_progress(self, times):
+        """
+        returns how far each frame is through the movement (0: rest, 1: fully extended)
+
+        """
+        rep = np.clip(np.searchsorted(self._starts, times, "right") - 1, 0, None)
+        in_rep = rep < self._reps
+        rep = np.minimum(rep, max(self._reps - 1, 0))
+
+        u = np.zeros_like(times)
+        if self._reps > 0:
+            u = (times - self._starts[rep]) / self._periods[rep]
+        u = np.where(in_rep, u, 0)
+
+        """ rest, rise, hold, return and rest again (smoothstep transitions) """
+        up = np.clip((u - self.rest) / self.rise, 0, 1)
+        down = np.clip((u - self.rest - self.rise - self.hold) / self.rise, 0, 1)
+        up = up * up * (3 - 2 * up)
+        down = down * down * (3 - 2 * down)
+        return up - down
+
+    def get_pose(self, progress):
+        """
+        returns the (x, y) co-ordinates of the 33 landmarks for each frame
+
+        """
+        if self._movement == "sit to stand":
+            return get_side_pose(progress)
+
+        points = np.tile(np.array(FRONT_POSE), (len(progress), 1, 1))
+
+        """
+        the arm being exercised curls at rest and is raised straight out to the side,
+        the other arm hangs at the side with a straight elbow
+
+        """
+        for side in ("right", "left"):
+            if self._movement == f"{side} arm ext":
+                set_arm(points, side, 90 * progress + 5, 150 * (1 - progress))
+            else:
+                set_arm(points, side, np.full_like(progress, 5), np.zeros_like(progress))
+
+        return points
+
+    def get_chunk(self, start, stop):
+        """
+        generates the frames from `start` to `stop`
+        returns the timestamps, the (id, x, y, visibility) of each landmark and a mask
+        of the frames where the person is lost
+
+        """
+        times, landmarks, lost, _ = self.get_chunk_poses(start, stop)
+        return times, landmarks, lost
+
+    def get_chunk_poses(self, start, stop):
+        """
+        generates the frames from `start` to `stop` (see `get_chunk()`), and also
+        returns the (x, y) co-ordinates of the person without the landmark noise
+        (eg: to render the frames)
+
+        """
+        rng = np.random.default_rng(
+            None if self._seed is None else (self._seed, start)
+        )
+        times = np.arange(start, stop) / self._fps
+        points = self.get_pose(self.get_progress(times))
+
+        """ noise on the co-ordinates, and the visibility of each landmark """
+        noise = rng.normal(0, self._noise, points.shape)
+        visibility = np.clip(rng.normal(0.95, 0.02, points.shape[:2]), 0, 1)
+        lost = np.zeros(len(times), dtype=bool)
+
+        for event_start, event_stop, kind, value in self._events:
+            frames = (times >= event_start) & (times < event_stop)
+            if not frames.any():
+                continue
+
+            if kind == "lost":
+                lost |= frames
+            elif kind == "hidden":
+                """ half of the landmarks are not visible """
+                hidden = np.arange(33) % 2 == int(value > 0)
+                visibility[np.ix_(frames, hidden)] = 0.2
+            else:
+                """ step partly out of frame and back """
+                t = (times[frames] - event_start) / (event_stop - event_start)
+                points[frames, :, 0] += value * np.sin(math.pi * t)[:, None]
+
+        landmarks = np.dstack((points + noise, visibility))
+        return times, landmarks, lost, points
+
+    def frames(self, chunk_size=util.SYNTHETIC_CHUNK, size=None):
+        """
+        generates the trace frame by frame
+        yields (timestamp, landmarks) of each frame, with landmarks as a list of
+        (id, x, y, visibility) like motion tracking (empty if the person is lost)
+        size: (width, height) to also render each frame at, yields
+            (timestamp, landmarks, frame) (see `FrameRenderer`)
+
+        """
+        ids = range(33)
+        render = None
+        if size is not None:
+            render = FrameRenderer(size, self._seed)
+
+        for start in range(0, self._num_frames, chunk_size):
+            stop = min(start + chunk_size, self._num_frames)
+            times, landmarks, lost, points = self.get_chunk_poses(start, stop)
+
+            xs = landmarks[:, :, 0].tolist()
+            ys = landmarks[:, :, 1].tolist()
+            vs = landmarks[:, :, 2].tolist()
+            for i, t in enumerate(times.tolist()):
+                frame = [] if lost[i] else list(zip(ids, xs[i], ys[i], vs[i]))
+                if render is None:
+                    yield t, frame
+                else:
+                    yield t, frame, render(None if lost[i] else points[i])
+
+
+class FrameRenderer:
+    """
+    renders synthetic frames of a person: a stick figure on a textured background with
+    camera noise, so the scene is only static while the person is still
+
+    """
+
+    """ number of camera noise patterns (reused in random order) """
+    patterns = 8
+
+    def __init__(self, size, seed=None, noise=util.SYNTHETIC_CAMERA_NOISE):
+        """
+        size: (width, height) of the frames
+        noise: standard deviation of the camera noise (grayscale levels)
+
+        """
+        self._size = size
+        self._rng = np.random.default_rng(seed)
+
+        width, height = size
+        background = self._rng.integers(60, 120, (height // 16 + 1, width // 16 + 1))
+        background = cv2.resize(
+            background.astype(np.uint8), size, interpolation=cv2.INTER_LINEAR
+        )
+        self._background = cv2.cvtColor(background, cv2.COLOR_GRAY2BGR)
+        self._noise = [
+            self._rng.normal(0, noise, (height, width, 1)).astype(np.int16)
+            for _ in range(self.patterns)
+        ]
+
+    def __call__(self, points):
+        """
+        returns the frame of the person at the (x, y) co-ordinates of each landmark
+        points: None if there is nobody in the frame
+
+        """
+        img = self._background.copy()
+        if points is not None:
+            render_frame(img, points)
+
+        noise = self._noise[self._rng.integers(self.patterns)]
+        return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def render_frame(img, points):
+    """
+    draws a stick figure of the person at the (x, y) co-ordinates of each landmark
+
+    """
+    height, width, _ = img.shape
+    pixels = np.round(np.array(points) * (width, height)).astype(int).tolist()
+    thickness = max(2, width // 40)
+
+    for start, end in LIMBS:
+        cv2.line(img, pixels[start], pixels[end], (230, 210, 200), thickness)
+    cv2.circle(img, pixels[0], thickness * 2, (200, 180, 170), -1)
+
+
+def get_direction(angle, side=1):
+    """
+    returns the (x, y) unit vectors at each angle (degrees from pointing down)
+    side: -1 for angles measured towards the left of the frame
+
+    """
+    angle = np.radians(angle)
+    return np.stack((side * np.sin(angle), np.cos(angle)), axis=-1)
+
+
+def get_vector(angle):
+    """
+    returns the (x, y) unit vectors at each angle (radians from the x axis)
+
+    """
+    return np.stack((np.cos(angle), np.sin(angle)), axis=-1)
+
+
+def set_arm(points, side, abduction, flexion):
+    """
+    sets the arm landmarks of one side of the front view
+    abduction: angle of the upper arm from hanging down (degrees)
+    flexion: angle of the elbow from straight (degrees), curling the forearm inwards
+
+    """
+    if side == "right":
+        shoulder, elbow, wrist, hand, outwards = 12, 14, 16, (18, 20, 22), -1
+    else:
+        shoulder, elbow, wrist, hand, outwards = 11, 13, 15, (17, 19, 21), 1
+
+    forearm = abduction - flexion
+    points[:, elbow] = points[:, shoulder] + UPPER_ARM * get_direction(
+        abduction, outwards
+    )
+    points[:, wrist] = points[:, elbow] + FOREARM * get_direction(forearm, outwards)
+
+    """ pinky, index and thumb """
+    for point, offset in zip(hand, (10, -10, -30)):
+        points[:, point] = points[:, wrist] + HAND * get_direction(
+            forearm + offset, outwards
+        )
+
+
+def get_side_pose(progress):
+    """
+    returns the landmarks of the side view of a person standing up from a chair
+    (facing the left of the frame) for each frame
+    progress: 0 sitting, 1 standing
+
+    """
+    points = np.zeros((len(progress), 33, 2))
+
+    """ knee and hip angles (the trunk leans forward while standing up) """
+    knee_angle = 90 + 90 * progress
+    hip_angle = 90 + 90 * progress - 25 * np.sin(math.pi * progress)
+
+    """ the shank stays vertical, the thigh and trunk rotate """
+    ankle = np.tile([0.5, 0.88], (len(progress), 1))
+    knee = ankle + [0, -SHANK]
+    hip = knee + THIGH * get_direction(knee_angle)
+
+    thigh = np.arctan2(*(knee - hip).T[::-1])
+    trunk = thigh + np.radians(hip_angle)
+    trunk_direction = get_vector(trunk)
+    shoulder = hip + TRUNK * trunk_direction
+
+    """ head in line with the trunk, facing forwards """
+    head = shoulder + HEAD * trunk_direction
+    forwards = np.array([-1, 0])
+
+    """ arms hang slightly forwards of the trunk (the forearm more than the upper arm) """
+    down = trunk + math.pi
+    elbow = shoulder + UPPER_ARM * get_vector(down + np.radians(10))
+    wrist = elbow + FOREARM * get_vector(down + np.radians(30))
+
+    """ near (right) side of the body, the far (left) side is offset """
+    sides = [
+        (12, 14, 16, 18, 20, 22, 24, 26, 28, 30, 32, 8),
+        (11, 13, 15, 17, 19, 21, 23, 25, 27, 29, 31, 7),
+    ]
+    for side, offset in zip(sides, [(0, 0), SyntheticTrace.depth]):
+        s, e, w, p, i, t, h, k, a, heel, foot, ear = side
+        points[:, s] = shoulder + offset
+        points[:, e] = elbow + offset
+        points[:, w] = wrist + offset
+        points[:, p] = wrist + offset + [-0.01, HAND]
+        points[:, i] = wrist + offset + [-0.02, HAND]
+        points[:, t] = wrist + offset + [-0.02, HAND / 2]
+        points[:, h] = hip + offset
+        points[:, k] = knee + offset
+        points[:, a] = ankle + offset
+        points[:, heel] = ankle + offset + [0.02, 0.02]
+        points[:, foot] = ankle + offset + [-0.05, 0.025]
+        points[:, ear] = head + offset + [0.01, 0]
+
+    points[:, 0] = head + 0.035 * forwards
+    for point in range(1, 7):
+        points[:, point] = head + [-0.025, -0.01]
+    points[:, 9] = points[:, 10] = head + [-0.03, 0.02]
+    return points
+
+
+def run(trace, file=None, gate=None, size=util.SYNTHETIC_SIZE):
+    """
+    counts the reps of every movement in the trace (and parses the session data if a
+    file is given), as the main worker thread does after motion tracking
+    returns the frame rate and the final counts
+
+    gate: motion gate to run the rendered frames through (see "gate.py"), the trace
+        stands in for pose inference on the frames that are tracked
+    size: (width, height) the frames are rendered at for the motion gate
+
+    """
+    movements = create_movements()
+    frames = trace.frames() if gate is None else trace.frames(size=size)
+    previous = []
+
+    start_time = time.perf_counter()
+    for index, (timestamp, landmarks, *img) in enumerate(frames):
+        """ skipped frames reuse the previous landmarks (see "motion.py") """
+        if gate is not None:
+            if gate.should_track(img[0], previous):
+                gate.set_reference(img[0], landmarks, 0)
+                previous = landmarks
+            else:
+                landmarks = previous
+
+        for movement in movements.values():
+            if movement.get_tracking_status():
+                movement.count_movement(
+                    landmarks,
+                    [],
+                    None,
+                    util.REPLAY,
+                    timestamp=timestamp,
+                    frame_index=index,
+                )
+
+        if file is not None:
+            file.parse_movements(movements, landmarks, timestamp)
+
+    elapsed = time.perf_counter() - start_time
+    counts = {name: movement.get_count() for name, movement in movements.items()}
+    return trace.get_num_frames() / elapsed, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate a synthetic session")
+    parser.add_argument("movement", nargs="?", default=MOVEMENTS[0], choices=MOVEMENTS)
+    parser.add_argument("--reps", type=int, default=util.SYNTHETIC_REPS)
+    parser.add_argument("--rate", type=float, default=util.SYNTHETIC_RATE)
+    parser.add_argument("--noise", type=float, default=util.SYNTHETIC_NOISE)
+    parser.add_argument("--dropouts", type=float, default=0, help="per minute")
+    parser.add_argument("--excursions", type=float, default=0, help="per minute")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--save", action="store_true", help="write a session csv")
+    parser.add_argument("--store", default=None, help="also add to a session store")
+    parser.add_argument(
+        "--gate",
+        action="store_true",
+        help="render the frames and run them through the motion gate",
+    )
+    parser.add_argument("--gate-threshold", type=float, default=util.GATE_THRESHOLD)
+    parser.add_argument("--gate-max-reuse", type=int, default=util.GATE_MAX_REUSE)
+    args = parser.parse_args()
+
+    trace = SyntheticTrace(
+        args.movement,
+        args.reps,
+        args.rate,
+        noise=args.noise,
+        dropouts=args.dropouts,
+        excursions=args.excursions,
+        seed=args.seed,
+    )
+
+    file = None
+    if args.save or args.store is not None:
+        store = SessionStore(args.store) if args.store is not None else None
+        file = File(save=True, store=store)
+
+    gate = None
+    if args.gate:
+        gate = MotionGate(threshold=args.gate_threshold, max_reuse=args.gate_max_reuse)
+
+    frame_rate, counts = run(trace, file, gate)
+    if file is not None:
+        file.write("synthetic")
+
+    print(
+        f"{trace.get_num_frames()} frames ({round(trace.get_duration())}s) "
+        + f"at {round(frame_rate)} fps"
+    )
+    if gate is not None:
+        print(f"motion gate: skipped {round(gate.get_stats()['skip rate'] * 100, 1)}%")
+
+    expected = trace.get_expected_counts()
+    for name, count in counts.items():
+        result = "ok" if count == expected.get(name) else "MISMATCH"
+        print(f"{name}: {count} (expected {expected.get(name)}) {result}")
+
+
+if __name__ == "__main__":
+    main()
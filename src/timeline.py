@@ -0,0 +1,496 @@
+"""
+timeline.py
+
+Review timeline module.
+Opened videos can only be played forward, and seeking with `CAP_PROP_POS_FRAMES` is
+slow (decoding starts again from the previous keyframe of the video) and can land on
+the wrong frame in long H.264 files. The review timeline shows any position of a
+processed video straight away:
+- a keyframe index is built once per video (one pass over the video) and stored on disk:
+  the timestamp of every frame, and a small jpeg every `util.KEYFRAME_PERIOD` seconds
+- the overlays and counts come from the stored landmarks (landmark cache), and the
+  counts of every frame are worked out once
+- while scrubbing, the nearest keyframe at or before the position is shown with its
+  overlays and counts (a few milliseconds)
+- when scrubbing stops, the exact frame is decoded, using the frame timestamps in the
+  index to check where seeking landed
+
+Usage: `python src/timeline.py <video>` (builds the index and times seeking, the video
+must be in the landmark cache)
+
+see "doc/timeline.md" for more details
+
+"""
+
+import cv2, os, time, random, argparse, util
+import numpy as np
+from motion import Motion
+from movement import create_movements
+from cache import to_landmarks
+from render import draw_counts
+
+
+__author__ = "Mike Smith"
+__email__ = "dongming.shi@uqconnect.edu.au"
+__date__ = "19/10/2026"
+__status__ = "Prototype"
+__credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
+
+
+class KeyframeIndex:
+    """
+    keyframe index: the timestamp of every frame of a video and a small jpeg of every
+    `period` seconds, built in one pass over the video
+
+    """
+
+    def __init__(
+        self,
+        period=util.KEYFRAME_PERIOD,
+        width=util.KEYFRAME_WIDTH,
+        quality=util.KEYFRAME_QUALITY,
+    ):
+        """
+        period: seconds between keyframes
+        width: width keyframes are stored at
+        quality: jpeg quality of the keyframes (0 to 100)
+
+        """
+        self._period = period
+        self._width = width
+        self._quality = quality
+
+        self._timestamps = np.zeros(0, dtype=np.float64)
+        self._keyframes = np.zeros(0, dtype=np.int64)
+        self._images = []
+
+    def build(self, name, should_stop=lambda: False):
+        """
+        builds the index in one pass over the video
+        frames are only decoded into images for keyframes (the rest are grabbed)
+        returns False if the video could not be opened or `should_stop()` returned True
+
+        """
+        cap = cv2.VideoCapture(name)
+        if not cap.isOpened():
+            return False
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or util.CAMERA_FPS
+        period = max(1, round(fps * self._period))
+
+        timestamps, keyframes, images = [], [], []
+        stopped = False
+
+        try:
+            while cap.grab():
+                if should_stop():
+                    stopped = True
+                    break
+
+                """ same timestamps as `VideoFileSource` (the landmark cache) """
+                timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+                if (len(timestamps) - 1) % period != 0:
+                    continue
+
+                ret, img = cap.retrieve()
+                if not ret:
+                    continue
+
+                height, width, _ = img.shape
+                if width > self._width:
+                    size = (self._width, round(height * self._width / width))
+                    img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+                ret, jpeg = cv2.imencode(
+                    ".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, self._quality]
+                )
+                if ret:
+                    keyframes.append(len(timestamps) - 1)
+                    images.append(jpeg.reshape(-1))
+        finally:
+            cap.release()
+
+        if stopped or len(keyframes) == 0:
+            return False
+
+        self._timestamps = np.array(timestamps, dtype=np.float64)
+        self._keyframes = np.array(keyframes, dtype=np.int64)
+        self._images = images
+        return True
+
+    def save(self, path):
+        """
+        saves the index to a file (the keyframes are stored as one buffer)
+
+        """
+        directory = os.path.dirname(path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        offsets = np.cumsum([0] + [len(image) for image in self._images])
+        np.savez(
+            path,
+            timestamps=self._timestamps,
+            keyframes=self._keyframes,
+            offsets=offsets,
+            images=np.concatenate(self._images),
+        )
+
+    def load(self, path):
+        """
+        loads the index from a file
+        returns False if the file does not exist or could not be read
+
+        """
+        try:
+            with np.load(path) as index:
+                timestamps, keyframes = index["timestamps"], index["keyframes"]
+                offsets, images = index["offsets"], index["images"]
+        except (OSError, KeyError, ValueError):
+            return False
+
+        self._timestamps = timestamps
+        self._keyframes = keyframes
+        self._images = [
+            images[start:end] for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+
+        """ last access time, used to evict the least recently used indexes """
+        os.utime(path)
+        return True
+
+    def get_length(self):
+        """
+        returns the number of frames in the video
+
+        """
+        return len(self._timestamps)
+
+    def get_timestamps(self):
+        return self._timestamps
+
+    def get_keyframes(self):
+        return self._keyframes
+
+    def get_keyframe(self, index):
+        """
+        returns the index and the decoded image of the nearest keyframe at or before
+        the frame
+
+        """
+        i = max(0, int(np.searchsorted(self._keyframes, index, side="right")) - 1)
+        return int(self._keyframes[i]), cv2.imdecode(self._images[i], cv2.IMREAD_COLOR)
+
+    def find_frame(self, timestamp):
+        """
+        returns the index of the frame closest to the timestamp (seconds)
+
+        """
+        i = int(np.searchsorted(self._timestamps, timestamp))
+        if i == 0:
+            return 0
+        if i >= len(self._timestamps):
+            return len(self._timestamps) - 1
+
+        before, after = self._timestamps[i - 1], self._timestamps[i]
+        return i - 1 if timestamp - before <= after - timestamp else i
+
+
+class Timeline:
+    """
+    review timeline: shows the annotated frame and counts at any position of a
+    processed video, from its keyframe index and stored landmarks
+
+    """
+
+    def __init__(self, name, index, landmarks, movements=create_movements):
+        """
+        name: filename of the video
+        index: keyframe index of the video
+        landmarks: stored landmarks of each frame, a (frames, 33, 4) array from the
+            landmark cache (see "cache.py")
+        movements: creates new counters of the movements to count (eg: the threshold
+            and template movements counted by the program)
+
+        """
+        self._name = name
+        self._index = index
+        self._landmarks = landmarks
+        self._create_movements = movements
+
+        """ the capture is only opened to decode exact frames """
+        self._cap = None
+        self._next = 0
+
+        """ only draws landmarks (no pose inference) """
+        self._motion = Motion(gate=False)
+
+        self.count()
+
+    def count(self):
+        """
+        counts reps over the stored landmarks of every frame (once, when the timeline
+        is created): the counts at each frame and the movement states at each keyframe
+
+        """
+        """
+        every movement is counted, since tracking can be turned on and off while the
+        timeline is open (the program only uses the movements it is tracking)
+
+        """
+        movements = self._create_movements()
+        self._names = list(movements)
+
+        length = min(self._index.get_length(), len(self._landmarks))
+        timestamps = self._index.get_timestamps()
+        keyframes = set(int(keyframe) for keyframe in self._index.get_keyframes())
+
+        self._counts = np.zeros((length, len(self._names)), dtype=np.int32)
+        self._states = {}
+
+        for i in range(length):
+            landmarks = to_landmarks(self._landmarks[i])
+            for name in self._names:
+                movements[name].count_movement(
+                    landmarks,
+                    [],
+                    None,
+                    util.VIDEO,
+                    timestamp=float(timestamps[i]),
+                    frame_index=i,
+                )
+
+            self._counts[i] = [movements[name].get_count() for name in self._names]
+            if i in keyframes:
+                self._states[i] = {
+                    name: movements[name].get_state() for name in self._names
+                }
+
+    def get_length(self):
+        """
+        returns the number of frames on the timeline
+
+        """
+        return len(self._counts)
+
+    def get_timestamp(self, index):
+        return float(self._index.get_timestamps()[index])
+
+    def get_counts(self, index):
+        """
+        returns the count of each movement at the frame (after counting the frame)
+
+        """
+        return {
+            name: int(count) for name, count in zip(self._names, self._counts[index])
+        }
+
+    def get_movement_states(self, index):
+        """
+        returns the state of each movement counter after counting the frame
+        (see `Movement.get_state()`), so counting can carry on from the frame
+        restored from the nearest keyframe at or before the frame, then the frames in
+        between are counted again from their stored landmarks
+
+        """
+        keyframe = max(
+            [keyframe for keyframe in self._states if keyframe <= index], default=None
+        )
+
+        movements = self._create_movements()
+        if keyframe is not None:
+            for name in self._names:
+                movements[name].set_state(self._states[keyframe][name])
+
+        timestamps = self._index.get_timestamps()
+        start = keyframe + 1 if keyframe is not None else 0
+        for i in range(start, index + 1):
+            landmarks = to_landmarks(self._landmarks[i])
+            for name in self._names:
+                movements[name].count_movement(
+                    landmarks,
+                    [],
+                    None,
+                    util.VIDEO,
+                    timestamp=float(timestamps[i]),
+                    frame_index=i,
+                )
+
+        return {name: movements[name].get_state() for name in self._names}
+
+    def read_frame(self, index):
+        """
+        decodes the exact frame, returns None if it could not be decoded
+        nearby frames ahead are stepped to without decoding the frames in between,
+        otherwise the capture seeks (see `seek()`)
+
+        """
+        if self._cap is None:
+            self._cap = cv2.VideoCapture(self._name)
+
+        if not self._next <= index < self._next + util.SEEK_STEP_FRAMES:
+            if not self.seek(index):
+                return None
+
+        while self._next <= index:
+            if not self._cap.grab():
+                return None
+            self._next += 1
+
+        ret, img = self._cap.retrieve()
+        return img if ret else None
+
+    def seek(self, index):
+        """
+        moves the capture to a frame at or before the frame (the grabbed frame is the
+        frame before `self._next`)
+        returns False if no frame could be grabbed
+
+        """
+        landed = self.seek_capture(self._cap, index)
+        self._next = landed + 1 if landed is not None else 0
+        return landed is not None
+
+    def seek_capture(self, cap, index):
+        """
+        moves a capture of the video to a frame at or before the frame, and returns the
+        index of the frame it landed on (the grabbed frame)
+        seeking can land on the wrong frame, so the timestamp of the frame it landed on
+        is looked up in the index, and it seeks further back if it landed too late
+        returns None if no frame could be grabbed
+
+        """
+        for start in [index, index - util.SEEK_STEP_FRAMES, 0]:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, max(0, start))
+            if not cap.grab():
+                continue
+
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            landed = self._index.find_frame(timestamp)
+            if landed <= index:
+                return landed
+
+        return None
+
+    def render(self, index, exact=False):
+        """
+        returns the annotated frame at a position and the index of the frame shown
+        exact: True to decode the exact frame, otherwise the nearest keyframe at or
+            before the frame is shown (eg: while scrubbing)
+
+        """
+        index = max(0, min(index, self.get_length() - 1))
+
+        img = self.read_frame(index) if exact else None
+        if img is None:
+            index, img = self._index.get_keyframe(index)
+
+        img, _ = self._motion.draw_landmarks(img, to_landmarks(self._landmarks[index]))
+        img = draw_counts(img, self.get_counts(index), self.get_timestamp(index))
+        return img, index
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+def get_index_path(key, path=util.DEFAULT_TIMELINE_PATH):
+    """
+    returns the path of the keyframe index of a video
+    key: landmark cache key of the video (see `LandmarkCache.get_key()`)
+
+    """
+    return os.path.join(path, f"{key}.npz")
+
+
+def load_index(name, key, should_stop=lambda: False, path=util.DEFAULT_TIMELINE_PATH):
+    """
+    loads the keyframe index of a video, building and saving it the first time
+    returns None if it could not be built
+
+    """
+    index = KeyframeIndex()
+    index_path = get_index_path(key, path)
+    if index.load(index_path):
+        return index
+
+    if not index.build(name, should_stop):
+        return None
+
+    index.save(index_path)
+    evict(path)
+    return index
+
+
+def evict(path=util.DEFAULT_TIMELINE_PATH, max_size=util.TIMELINE_MAX_SIZE):
+    """
+    removes the least recently used keyframe indexes until they fit the size budget
+
+    """
+    if not os.path.exists(path):
+        return
+
+    files = [os.path.join(path, name) for name in os.listdir(path)]
+    files = sorted(
+        [name for name in files if name.endswith(".npz")],
+        key=os.path.getmtime,
+        reverse=True,
+    )
+
+    size = 0
+    for name in files:
+        size += os.path.getsize(name)
+        if size > max_size:
+            os.remove(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="build the review timeline of a video and time seeking"
+    )
+    parser.add_argument("video", help="video file (must be in the landmark cache)")
+    parser.add_argument("--seeks", type=int, default=20, help="random positions")
+    args = parser.parse_args()
+
+    from cache import LandmarkCache
+
+    cache = LandmarkCache()
+    key = cache.get_key(args.video, Motion().get_params())
+    entry = cache.get(key)
+    if entry is None:
+        print(
+            f'"{args.video}" is not in the landmark cache: open it in the program first'
+        )
+        return
+
+    start_time = time.perf_counter()
+    index = load_index(args.video, key)
+    if index is None:
+        print(f'could not build the keyframe index of "{args.video}"')
+        return
+
+    timeline = Timeline(args.video, index, entry[1])
+    print(
+        f"{timeline.get_length()} frames, {len(index.get_keyframes())} keyframes "
+        + f"({round(time.perf_counter() - start_time, 2)}s)"
+    )
+
+    for exact in [False, True]:
+        times = []
+        for _ in range(args.seeks):
+            position = random.randrange(timeline.get_length())
+            start_time = time.perf_counter()
+            timeline.render(position, exact)
+            times.append((time.perf_counter() - start_time) * 1000)
+
+        print(
+            f"{'exact frame' if exact else 'keyframe'}: "
+            + f"{round(np.mean(times), 1)} ms average, {round(max(times), 1)} ms max"
+        )
+
+    timeline.close()
+
+
+if __name__ == "__main__":
+    main()
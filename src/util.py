@@ -17,17 +17,203 @@ __credits__ = ["Agnethe Kaasen", "Live Myklebust", "Amber Spurway"]
 """ default path for csv files to be saved """
 DEFAULT_FILE_PATH = "./files"
 
+""" session data sampling period in seconds (0 to sample every frame) """
+SAMPLE_PERIOD = 0.1
+
+""" default path for the session database and number of samples inserted per batch """
+DEFAULT_DB_PATH = "./files/sessions.db"
+DB_BATCH_SIZE = 1000
+
+""" default path and size budget (bytes) for the landmark cache """
+DEFAULT_CACHE_PATH = "./cache"
+CACHE_MAX_SIZE = 1024**3
+
+""" 
+idle mode: number of frames without a detected person before switching to idle,
+seconds between probes for a person while idle and max side length of probed frames
+
+"""
+IDLE_FRAMES = 90
+IDLE_PROBE_PERIOD = 0.5
+IDLE_PROBE_SIZE = 320
+
+""" 
+motion gate: mean grayscale difference below which the scene is static, side length
+of the compared region and max number of frames in a row that landmarks are reused for
+(measured on rendered synthetic traces, see "doc/gate.md")
+
+"""
+GATE_THRESHOLD = 4.0
+GATE_SIZE = 64
+GATE_MAX_REUSE = 4
+
+""" 
+stream server: default address (this computer only) and port, max frame rate and
+jpeg quality of the preview stream, and seconds before a slow client is disconnected
+
+"""
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+STREAM_FPS = 15
+STREAM_QUALITY = 80
+SERVER_TIMEOUT = 5
+
+""" synthetic traces: default reps, reps per minute and landmark noise (normalised) """
+SYNTHETIC_REPS = 100
+SYNTHETIC_RATE = 20
+SYNTHETIC_NOISE = 0.002
+
+""" number of synthetic trace frames generated at a time """
+SYNTHETIC_CHUNK = 1000
+
+""" synthetic frames (eg: for the motion gate): size and camera noise (gray levels) """
+SYNTHETIC_SIZE = (320, 240)
+SYNTHETIC_CAMERA_NOISE = 2
+
+""" dtw template matching: max rms angle difference (degrees) of a matching rep """
+DTW_THRESHOLD = 15
+
+""" dtw template matching: max warping (fraction of the template length) """
+DTW_BAND = 0.1
+
+""" dtw template matching: lengths templates are recorded at (fraction of the rep) """
+DTW_SCALES = (0.67, 0.8, 1, 1.25, 1.5)
+
+""" default path for the job queue database and frames processed between checkpoints """
+DEFAULT_JOBS_PATH = "./files/jobs.db"
+JOB_CHECKPOINT_FRAMES = 300
+
+""" movement phases (see "movement.py") """
+PHASES = ("lost", "reset", "set")
+
+""" time between reps (seconds) counted as rest in the session statistics """
+REST_PERIOD = 10
+
+""" max number of rep events waiting to be delivered to event sinks """
+EVENT_QUEUE_SIZE = 1000
+
+""" number of frames held in shared memory ring buffers """
+SHM_SLOTS = 4
+
+""" 
+number of frames each video segment is started early by when processing 
+in parallel (lets motion tracking warm up before the segment starts)
+
+"""
+SEGMENT_OVERLAP = 30
+
+""" cpu threads each worker process may use when processing in parallel """
+WORKER_THREADS = 1
+
+""" codec and max number of frames waiting to be encoded when rendering videos """
+RENDER_CODEC = "mp4v"
+RENDER_QUEUE_SIZE = 64
+
+""" frame rate and max number of frames waiting to be encoded when recording sessions """
+RECORD_FPS = 30
+RECORD_QUEUE_SIZE = 32
+
+""" default path for the memory profiling log (see "profiler.py") """
+DEFAULT_PROFILE_PATH = "./files/profile.jsonl"
+
+""" seconds between memory profiling samples, and the allocation sites logged for each """
+PROFILE_PERIOD = 60
+PROFILE_TOP = 10
+
+""" 
+max memory growth allowed by the soak test (MiB per hour), the seconds ignored at the
+start of the soak test (caches and the allocator filling up, etc.) and the min number of
+sessions after the warm-up that the growth is measured over
+
+"""
+SOAK_MAX_GROWTH = 10
+SOAK_WARMUP = 600
+SOAK_MIN_SESSIONS = 5
+
+""" multi-person tracking (see "people.py"): max number of people tracked at once """
+MAX_PEOPLE = 4
+
+""" frames between person detections, and the width frames are downscaled to for it """
+PERSON_DETECT_PERIOD = 15
+PERSON_DETECT_WIDTH = 480
+
+""" 
+min overlap (intersection over union) of a detection and a tracked person to be the 
+same person, and of two tracked people to be the same person tracked twice
+
+"""
+PERSON_MATCH_IOU = 0.3
+PERSON_DUPLICATE_IOU = 0.6
+
+""" frames a tracked person can be lost for before they are dropped """
+PERSON_MAX_LOST = 30
+
+""" padding around a person's landmarks when cropping the next frame (fraction of size) """
+PERSON_PADDING = 0.25
+
+""" default path and size budget (bytes) for the keyframe indexes of the review timeline """
+DEFAULT_TIMELINE_PATH = "./cache/timeline"
+TIMELINE_MAX_SIZE = 1024**3
+
+""" seconds between the keyframes of the review timeline, and their width and quality """
+KEYFRAME_PERIOD = 1
+KEYFRAME_WIDTH = 640
+KEYFRAME_QUALITY = 80
+
+""" max frames stepped through to reach a frame, rather than seeking """
+SEEK_STEP_FRAMES = 60
+
 """ supported files """
 FILE_NOT_SUPPORTED = -1
 CSV = 0
 MP4 = 1
 AVI = 2
+PNG = 3
+JPG = 4
 
 """ max frame dimensions (full-hd): 1920 x 1080 """
 FRAME_WIDTH = 1920
 FRAME_HEIGHT = 1080
 FRAME_ORIGIN = 0
 
+""" size of the video display on the gui """
+DISPLAY_WIDTH = 1280
+DISPLAY_HEIGHT = 720
+
+""" 
+max side length of the frame used for pose inference 
+(the pose landmark model input is 256 x 256)
+
+"""
+INFERENCE_SIZE = 256
+
+""" 
+max side length of the frames passed to pose inference (frames are downscaled and 
+converted to rgb into a reused buffer, see "preprocess.py")
+
+"""
+PREPROCESS_SIZE = 640
+
+""" webcam modes (width, height) to choose from, and the requested frame rate """
+CAMERA_MODES = [(640, 480), (1280, 720), (1920, 1080)]
+CAMERA_FPS = 30
+
+""" number of webcam devices looked for when reconnecting a disconnected webcam """
+CAMERA_DEVICES = 4
+
+""" number of failed reads in a row before the webcam is treated as disconnected """
+CAPTURE_MAX_FAILURES = 10
+
+""" seconds between webcam reconnect attempts (doubles every attempt up to the max) """
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 8
+
+""" max seconds a disconnected webcam waits for before returning control to the caller """
+CAPTURE_POLL = 0.5
+
+""" largest webcam mode requested as raw frames (larger modes request mjpg) """
+RAW_MAX_PIXELS = 640 * 480
+
 """ positional min and max thresholds """
 MIN = 0.02
 MAX = 0.98
@@ -38,6 +224,7 @@ VIS = 0.5
 """ input source definitions """
 VIDEO = 0
 WEBCAM = 1
+REPLAY = 2
 
 """ pre-defined colours (b, g, r) """
 RED = (0, 0, 255)
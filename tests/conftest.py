@@ -0,0 +1,12 @@
+"""
+conftest.py
+
+Puts the program modules in "src" on the import path of the tests (the modules import
+each other by name).
+
+"""
+
+import os, sys
+
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
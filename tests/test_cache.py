@@ -0,0 +1,110 @@
+"""
+test_cache.py
+
+Tests of the landmark cache module: stored landmarks, the cache index and least recently
+used eviction.
+
+"""
+
+import itertools, os
+import numpy as np
+import pytest
+import cache
+from cache import LandmarkCache, to_array, to_landmarks
+
+
+def create_landmarks(frames, seed=0):
+    """ landmarks (id, x, y, visibility) of each frame, every third frame has none """
+    rng = np.random.default_rng(seed)
+    return [
+        []
+        if frame % 3 == 0
+        else [(id, *rng.integers(0, 1000, 2).tolist(), 0.5) for id in range(33)]
+        for frame in range(frames)
+    ]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """ each access is one second after the previous (so the lru order is exact) """
+    ticks = itertools.count()
+    monkeypatch.setattr(cache.time, "time", lambda: float(next(ticks)))
+
+
+def test_landmark_arrays():
+    landmarks = create_landmarks(2)
+
+    assert to_landmarks(to_array(landmarks[0])) == []
+    assert to_landmarks(to_array(landmarks[1])) == landmarks[1]
+
+
+def test_put_get(tmp_path):
+    landmark_cache = LandmarkCache(str(tmp_path))
+    landmarks = create_landmarks(10)
+    timestamps = [frame / 30 for frame in range(10)]
+
+    assert landmark_cache.get("video") is None
+    landmark_cache.put("video", timestamps, landmarks)
+
+    stored_timestamps, stored_landmarks = landmark_cache.get("video")
+    assert stored_timestamps.tolist() == timestamps
+    assert [to_landmarks(frame) for frame in stored_landmarks] == landmarks
+    assert landmark_cache.get_size() == os.path.getsize(tmp_path / "video.npz")
+
+    """ the index is kept between instances """
+    assert LandmarkCache(str(tmp_path)).get("video") is not None
+
+
+def test_get_key(tmp_path):
+    video = tmp_path / "video.avi"
+    video.write_bytes(b"frames")
+    landmark_cache = LandmarkCache(str(tmp_path))
+
+    key = landmark_cache.get_key(str(video), {"model": 1})
+    assert key == landmark_cache.get_key(str(video), {"model": 1})
+    assert key != landmark_cache.get_key(str(video), {"model": 2})
+
+    video.write_bytes(b"other frames")
+    assert key != landmark_cache.get_key(str(video), {"model": 1})
+
+
+def test_eviction(tmp_path, clock):
+    landmark_cache = LandmarkCache(str(tmp_path))
+    for key in ["a", "b", "c"]:
+        landmark_cache.put(key, [0], create_landmarks(2))
+    size = landmark_cache.get_size() // 3
+
+    """ room for two entries: "a" was used more recently than "b" and "c" """
+    landmark_cache = LandmarkCache(str(tmp_path), max_size=size * 2 + size // 2)
+    landmark_cache.get("a")
+    landmark_cache.put("d", [0], create_landmarks(2))
+
+    assert landmark_cache.get("b") is None
+    assert landmark_cache.get("c") is None
+    assert landmark_cache.get("a") is not None
+    assert landmark_cache.get("d") is not None
+    assert not os.path.exists(tmp_path / "b.npz")
+    assert landmark_cache.get_size() <= size * 2 + size // 2
+
+
+def test_invalidate(tmp_path):
+    landmark_cache = LandmarkCache(str(tmp_path))
+    for key in ["a", "b"]:
+        landmark_cache.put(key, [0], create_landmarks(2))
+
+    landmark_cache.invalidate("a")
+    assert landmark_cache.get("a") is None
+    assert landmark_cache.get("b") is not None
+
+    landmark_cache.invalidate()
+    assert landmark_cache.get("b") is None
+    assert landmark_cache.get_size() == 0
+
+
+def test_corrupt_entry(tmp_path):
+    landmark_cache = LandmarkCache(str(tmp_path))
+    landmark_cache.put("a", [0], create_landmarks(2))
+    (tmp_path / "a.npz").write_bytes(b"corrupt")
+
+    assert landmark_cache.get("a") is None
+    assert landmark_cache.get_size() == 0
@@ -0,0 +1,164 @@
+"""
+test_dtw.py
+
+Tests of the dynamic time warping module: the banded dtw distance and its lower bounds
+are checked against a naive reference implementation, and template movements are
+created from the joint angles of a threshold movement, the config file or a new
+movement.
+
+"""
+
+import csv, math
+import numpy as np
+import pytest
+import config, util
+from file import File
+from synthetic import SyntheticTrace
+from motion import Motion
+from dtw import Template, dtw, lb_kim, lb_keogh, resample
+from dtw import get_landmark, get_template_points, create_template_movement
+
+
+def naive_dtw(candidate, series, band):
+    """
+    reference dtw distance (total squared difference) using the full cost matrix
+    frames further apart than `band` are not aligned
+
+    """
+    n, m = len(candidate), len(series)
+    distances = np.full((n + 1, m + 1), math.inf)
+    distances[0, 0] = 0
+
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            if abs(i - j) > band:
+                continue
+
+            cost = ((candidate[i - 1] - series[j - 1]) ** 2).sum()
+            distances[i, j] = cost + min(
+                distances[i - 1, j], distances[i, j - 1], distances[i - 1, j - 1]
+            )
+
+    return distances[n, m]
+
+
+def random_series(rng, length, angles=2):
+    """ smooth random joint angle sequences (degrees) """
+    return np.cumsum(rng.normal(0, 5, (length, angles)), axis=0) + 90
+
+
+@pytest.mark.parametrize("length, band", [(5, 0.2), (20, 0.1), (30, 0.3), (12, 1.0)])
+def test_dtw_matches_reference(length, band):
+    rng = np.random.default_rng(length)
+    for _ in range(10):
+        template = Template(random_series(rng, length), band)
+        candidate = random_series(rng, length)
+
+        expected = naive_dtw(candidate, template.series, template.band)
+        assert dtw(candidate, template) == pytest.approx(expected)
+
+
+def test_dtw_identical_series():
+    rng = np.random.default_rng(0)
+    series = random_series(rng, 25)
+    assert dtw(series, Template(series)) == 0
+
+
+def test_lower_bounds():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        template = Template(random_series(rng, 20), 0.2)
+        candidate = random_series(rng, 20)
+
+        distance = naive_dtw(candidate, template.series, template.band)
+        keogh, remaining = lb_keogh(candidate, template)
+        assert lb_kim(candidate, template) <= distance + 1e-9
+        assert keogh <= distance + 1e-9
+        assert remaining[0] <= keogh and remaining[-1] == 0
+
+
+def test_early_abandoning():
+    """
+    the distance is exact below the limit, and is never below the limit (inf if it was
+    abandoned) once it cannot be below it
+
+    """
+    rng = np.random.default_rng(2)
+    for _ in range(20):
+        template = Template(random_series(rng, 20), 0.2)
+        candidate = random_series(rng, 20)
+
+        distance = naive_dtw(candidate, template.series, template.band)
+        _, remaining = lb_keogh(candidate, template)
+        assert dtw(candidate, template, distance * 1.01, remaining) == pytest.approx(
+            distance
+        )
+        assert dtw(candidate, template, distance * 0.99, remaining) >= distance
+        assert dtw(candidate, template, distance * 0.5, remaining) >= distance
+
+
+def test_resample():
+    series = np.array([[0, 10], [10, 20], [20, 30]])
+    resampled = resample(series, 5)
+
+    assert resampled.shape == (5, 2)
+    assert resampled[:, 0].tolist() == [0, 5, 10, 15, 20]
+    assert resampled[:, 1].tolist() == [10, 15, 20, 25, 30]
+
+
+def test_get_landmark():
+    assert get_landmark("right_wrist") == Motion.right_wrist
+    assert get_landmark("Left Shoulder") == Motion.left_shoulder
+    assert get_landmark("0") == 0
+
+    for name in ("right_thumb_tip", "33", "crop", "idle"):
+        with pytest.raises(ValueError):
+            get_landmark(name)
+
+
+def test_template_points():
+    """ angles of a threshold movement, the config file or a new movement """
+    points, ignore_vis = get_template_points("sit to stand")
+    assert points == [p[:3] for p in config.SIT_TO_STAND_ANGULAR_THRESH]
+    assert ignore_vis
+
+    points, ignore_vis = get_template_points("shoulder circles")
+    assert points == config.TEMPLATE_ANGLES["shoulder circles"]
+    assert not ignore_vis
+
+    angles = [(Motion.right_elbow, Motion.right_shoulder, Motion.right_hip)]
+    assert get_template_points("arm swings", angles) == (angles, False)
+
+    with pytest.raises(ValueError):
+        get_template_points("arm swings")
+
+
+def write_session(path, trace):
+    """ writes the frames of a synthetic trace to a session csv file """
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["time"] + list(range(33)))
+        for t, landmarks in trace.frames():
+            points = {i: f"({x}, {y})" for i, x, y, _ in landmarks}
+            row = [points.get(i, "") for i in range(33)]
+            writer.writerow([File().format_time(t)] + row)
+
+
+def test_template_movement_new_name(tmp_path):
+    """ a new movement is named after itself and counts reps with its own angles """
+    angles = [(Motion.right_elbow, Motion.right_shoulder, Motion.right_hip)]
+    recorded = SyntheticTrace("right arm ext", 2, seed=1)
+    session = tmp_path / "session.csv"
+    write_session(session, recorded)
+
+    recordings = [(session, start, stop) for start, stop in recorded.get_rep_times()]
+    movement = create_template_movement("arm raises", recordings, points=angles)
+    assert movement.get_name() == "arm raises"
+    assert [p[:3] for p in movement.get_points()] == angles
+
+    trace = SyntheticTrace("right arm ext", 6, seed=0)
+    for index, (t, landmarks) in enumerate(trace.frames()):
+        movement.count_movement(landmarks, [], None, util.REPLAY, t, index)
+    assert movement.get_count() == trace.get_expected_counts()["right arm ext"]
+
+    assert create_template_movement("arm raises", [], points=angles) is None
@@ -0,0 +1,156 @@
+"""
+test_events.py
+
+Tests of the rep event module: rep events are delivered to every sink in order from the
+dispatcher thread, and a full queue drops events rather than blocking the movements.
+
+"""
+
+import json, socket, threading, time
+import pytest
+from events import EventStream, RepEvent, JsonlSink, CallbackSink, UnixSocketSink
+from events import EventSink, to_json
+from movement import create_movements
+
+
+def create_events(num_events):
+    return [
+        RepEvent("sit to stand", i + 1, i / 10, i * 3, [150.0, 160.5])
+        for i in range(num_events)
+    ]
+
+
+def create_held_sink(release, received):
+    """ sink that holds up the dispatcher until released """
+
+    def send(event):
+        release.wait()
+        received.append(event)
+
+    return CallbackSink(send)
+
+
+def read_jsonl(path):
+    with open(path) as file:
+        return [RepEvent(**json.loads(line)) for line in file]
+
+
+def test_dispatch_order(tmp_path):
+    """ every sink gets every event in the order they were put on the stream """
+    path = tmp_path / "events.jsonl"
+    received = []
+    stream = EventStream()
+    stream.add_sink(JsonlSink(path))
+    stream.add_sink(CallbackSink(received.append))
+    stream.start()
+
+    events = create_events(200)
+    for event in events:
+        assert stream.put(event)
+    stream.stop()
+
+    assert received == events
+    assert read_jsonl(path) == events
+    assert stream.get_dropped() == 0
+
+
+def test_stop_flushes_queued_events(tmp_path):
+    """ events still queued when the stream is stopped are delivered first """
+    path = tmp_path / "events.jsonl"
+    release = threading.Event()
+    received = []
+    stream = EventStream()
+    stream.add_sink(create_held_sink(release, received))
+    stream.add_sink(JsonlSink(path))
+    stream.start()
+
+    events = create_events(20)
+    for event in events:
+        stream.put(event)
+
+    """ the dispatcher is held up on the first event, so the rest are still queued """
+    assert len(received) == 0
+    release.set()
+    stream.stop()
+
+    assert received == events
+    assert read_jsonl(path) == events
+
+
+def test_full_queue_drops_events():
+    """ a full queue drops and counts events without blocking `Movement.add_rep()` """
+    release = threading.Event()
+    received = []
+    stream = EventStream(max_size=4)
+    stream.add_sink(create_held_sink(release, received))
+    stream.start()
+
+    movement = create_movements(events=stream)["sit to stand"]
+    start_time = time.perf_counter()
+    for i in range(50):
+        movement.add_rep(timestamp=i / 10, frame_index=i)
+    elapsed = time.perf_counter() - start_time
+
+    assert movement.get_count() == 50
+    assert elapsed < 0.5
+
+    """ one event held by the dispatcher, four queued, the rest dropped """
+    release.set()
+    stream.stop()
+    assert stream.get_dropped() == 50 - len(received)
+    assert 4 <= len(received) <= 5
+    assert [event.count for event in received] == list(range(1, len(received) + 1))
+    assert received[0].movement == "sit to stand"
+    assert received[0].frame_index == 0
+
+
+def test_put_without_dispatcher():
+    stream = EventStream(max_size=2)
+    events = create_events(3)
+
+    assert stream.put(events[0]) and stream.put(events[1])
+    assert not stream.put(events[2])
+    assert stream.get_dropped() == 1
+
+
+def test_sink_error_does_not_stop_other_sinks():
+    class BrokenSink(EventSink):
+        def send(self, event):
+            raise OSError("broken")
+
+    received = []
+    stream = EventStream()
+    stream.add_sink(BrokenSink())
+    stream.add_sink(CallbackSink(received.append))
+    stream.start()
+
+    events = create_events(5)
+    for event in events:
+        stream.put(event)
+    stream.stop()
+
+    assert received == events
+
+
+def test_unix_socket_sink(tmp_path):
+    path = str(tmp_path / "events.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+
+    sink = UnixSocketSink(path)
+    events = create_events(3)
+    for event in events:
+        sink.send(event)
+
+    connection, _ = server.accept()
+    with connection, connection.makefile() as file:
+        lines = [file.readline().strip() for _ in events]
+    assert lines == [to_json(event) for event in events]
+
+    sink.close()
+    server.close()
+
+    """ events sent while the socket is unavailable raise (the stream drops them) """
+    with pytest.raises(OSError):
+        UnixSocketSink(str(tmp_path / "missing.sock")).send(events[0])
@@ -0,0 +1,118 @@
+"""
+test_gate.py
+
+Tests of the motion gate module: rep counts with the motion gate match the counts
+without it on rendered synthetic traces, and the gate decisions and stats.
+
+"""
+
+import numpy as np
+import pytest
+import gate as gate_module
+from gate import MotionGate
+from synthetic import SyntheticTrace, MOVEMENTS, run
+
+
+LANDMARKS = [(id, 0.4 + 0.005 * id, 0.2 + 0.02 * id, 0.9) for id in range(33)]
+
+
+def create_frame(value=100, seed=0):
+    """ a textured frame, so any change shows up in the compared region """
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 50, (240, 320, 3)).astype(np.uint8)
+    return (img + value).astype(np.uint8)
+
+
+@pytest.mark.parametrize("movement", MOVEMENTS)
+@pytest.mark.parametrize("rate", [20, 60])
+def test_counts_match(movement, rate):
+    """ the same frames give the same counts with and without the gate (defaults) """
+    trace = SyntheticTrace(
+        movement, reps=6, rate=rate, seed=rate, dropouts=6, excursions=4
+    )
+    motion_gate = MotionGate()
+
+    _, counts = run(trace)
+    _, gated_counts = run(trace, gate=motion_gate)
+
+    assert gated_counts == counts == trace.get_expected_counts()
+    assert motion_gate.get_stats()["skip rate"] > 0.3
+
+
+def test_static_frames_skipped():
+    motion_gate = MotionGate(max_reuse=100)
+    img = create_frame()
+
+    assert motion_gate.should_track(img, LANDMARKS)
+    motion_gate.set_reference(img, LANDMARKS, 0.01)
+
+    assert not any(motion_gate.should_track(img.copy(), LANDMARKS) for _ in range(50))
+
+
+def test_max_reuse():
+    """ landmarks are reused at most `max_reuse` frames in a row """
+    motion_gate = MotionGate(max_reuse=3)
+    img = create_frame()
+    decisions = []
+
+    for _ in range(12):
+        track = motion_gate.should_track(img, LANDMARKS)
+        if track:
+            motion_gate.set_reference(img, LANDMARKS, 0.01)
+        decisions.append(track)
+
+    assert decisions == [True, False, False, False] * 3
+
+
+def test_change_tracked():
+    """ any change in the region around the person forces inference """
+    motion_gate = MotionGate(max_reuse=100)
+    img = create_frame()
+    motion_gate.should_track(img, LANDMARKS)
+    motion_gate.set_reference(img, LANDMARKS, 0.01)
+
+    moved = img.copy()
+    moved[50:150, 120:180] = 255
+    assert motion_gate.should_track(moved, LANDMARKS)
+
+    """ the tracked frame is compared against until the next reference is set """
+    assert motion_gate.should_track(img, LANDMARKS)
+
+
+def test_no_landmarks():
+    """ frames without a person always run pose inference """
+    motion_gate = MotionGate()
+    img = create_frame()
+
+    motion_gate.set_reference(img, [], 0.01)
+    assert motion_gate.should_track(img, [])
+    assert motion_gate.should_track(img, LANDMARKS)
+
+    motion_gate.set_reference(img, LANDMARKS, 0.01)
+    assert motion_gate.should_track(img, [])
+
+
+def test_stats(monkeypatch):
+    """ time saved: mean inference time of each skipped frame, less the gate time """
+    monkeypatch.setattr(gate_module.time, "process_time", lambda: 1.0)
+    motion_gate = MotionGate(max_reuse=3)
+    img = create_frame()
+
+    for inference_time in [0.02, 0.04]:
+        motion_gate.should_track(img, LANDMARKS)
+        motion_gate.set_reference(img, LANDMARKS, inference_time)
+        for _ in range(3):
+            assert not motion_gate.should_track(img, LANDMARKS)
+
+    stats = motion_gate.get_stats()
+    assert stats["tracked"] == 2 and stats["skipped"] == 6
+    assert stats["skip rate"] == pytest.approx(0.75)
+    assert stats["time saved"] == pytest.approx(6 * 0.03)
+
+    motion_gate.reset()
+    assert motion_gate.get_stats() == {
+        "tracked": 0,
+        "skipped": 0,
+        "skip rate": 0,
+        "time saved": 0,
+    }
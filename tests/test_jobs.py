@@ -0,0 +1,208 @@
+"""
+test_jobs.py
+
+Tests of the job queue module: a job interrupted halfway through a synthetic trace and
+resumed from its checkpoint gives the same counts and session data samples as an
+uninterrupted run.
+
+"""
+
+import json, sqlite3
+from contextlib import closing
+import pytest
+from jobs import JobQueue, QUEUED, RUNNING, DONE
+from movement import create_movements
+from file import File
+from parallel import replay
+from synthetic import SyntheticTrace
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs" / "jobs.db"))
+
+
+@pytest.fixture(scope="module")
+def trace():
+    return SyntheticTrace("sit to stand", reps=6, dropouts=6, seed=1)
+
+
+def count_job(queue, job, frames, stop=None, checkpoint_frames=50):
+    """ counts a job from its last checkpoint, as `process_job()` does """
+    job_id, _, _, frame, state = job
+    movements = create_movements()
+    file = File()
+
+    if state is not None:
+        for key, movement_state in state["movements"].items():
+            movements[key].set_state(movement_state)
+
+        data, times = queue.get_samples(job_id)
+        file.set_state(dict(state["file"], data=data, times=times))
+
+    saved = len(file.get_data())
+
+    def save_checkpoint(index, start, timestamps, landmarks):
+        nonlocal saved
+        file_state = file.get_state(start=saved)
+        samples = (saved, file_state.pop("data"), file_state.pop("times"))
+        state = {
+            "movements": {key: m.get_state() for key, m in movements.items()},
+            "file": file_state,
+        }
+        queue.checkpoint(job_id, index, state, start, timestamps, landmarks, samples)
+        saved += len(samples[1])
+
+    stop = len(frames) if stop is None else stop
+    start, timestamps, landmarks = frame, [], []
+    for index in range(frame, stop):
+        timestamp, frame_landmarks = frames[index]
+        replay([(index, timestamp, frame_landmarks)], movements, file)
+        timestamps.append(timestamp)
+        landmarks.append(frame_landmarks)
+
+        if len(timestamps) >= checkpoint_frames:
+            save_checkpoint(index + 1, start, timestamps, landmarks)
+            start, timestamps, landmarks = index + 1, [], []
+
+    save_checkpoint(stop, start, timestamps, landmarks)
+    return movements, file
+
+
+def get_counts(movements):
+    return {key: movement.get_count() for key, movement in movements.items()}
+
+
+def test_resume_matches_uninterrupted(queue, trace):
+    frames = list(trace.frames())
+    half = len(frames) // 2 + 7
+
+    """ uninterrupted run """
+    queue.add("uninterrupted.mp4")
+    movements, file = count_job(queue, queue.next_job(), frames)
+    expected = get_counts(movements)
+    assert expected == trace.get_expected_counts()
+    assert expected["sit to stand"] == 6
+
+    """ interrupted halfway (between checkpoints), then resumed """
+    job_id = queue.add("interrupted.mp4")
+    count_job(queue, queue.next_job(), frames, stop=half)
+    queue.set_status(job_id, QUEUED)
+
+    job = queue.next_job()
+    assert job[0] == job_id and job[3] == half
+    assert job[4] is not None
+    movements, resumed = count_job(queue, job, frames)
+
+    assert get_counts(movements) == expected
+    assert len(resumed.get_data()) == len(file.get_data()) > 0
+    assert resumed.get_data() == file.get_data()
+
+    """ the samples and landmarks checkpointed are the same as the parsed ones """
+    data, times = queue.get_samples(job_id)
+    assert len(data) == len(times) == len(file.get_data())
+    timestamps, landmarks = queue.get_landmarks(job_id)
+    assert timestamps == pytest.approx([t for t, _ in frames])
+    assert [len(lm) for lm in landmarks] == [len(lm) for _, lm in frames]
+
+
+def test_next_job(queue):
+    assert queue.next_job() is None
+
+    first = queue.add("first.mp4")
+    urgent = queue.add("urgent.mp4", name_id="patient", priority=2)
+
+    job_id, name, name_id, frame, state = queue.next_job()
+    assert (job_id, name_id, frame, state) == (urgent, "patient", 0, None)
+    assert name.endswith("urgent.mp4")
+
+    assert queue.next_job()[0] == first
+    assert queue.next_job() is None
+    assert {job[3] for job in queue.get_jobs()} == {RUNNING}
+
+
+def test_checkpoint_samples(queue):
+    """ each checkpoint only adds the samples since the last """
+    job_id = queue.add("video.mp4")
+    queue.checkpoint(job_id, 10, {}, 0, [], [], (0, [[["time", "0:00:00.00"]]], [0.0]))
+    queue.checkpoint(job_id, 20, {}, 10, [], [], (1, [[["time", "0:00:00.10"]]], [0.1]))
+    queue.checkpoint(job_id, 30, {"done": 1}, 20, [], [], (2, [], []))
+
+    data, times = queue.get_samples(job_id)
+    assert data == [[["time", "0:00:00.00"]], [["time", "0:00:00.10"]]]
+    assert times == [0.0, 0.1]
+
+    queue.set_status(job_id, QUEUED)
+    assert queue.next_job()[3:] == (30, {"done": 1})
+
+    queue.set_status(job_id, DONE)
+    assert queue.get_samples(job_id) == ([], [])
+
+
+def test_bad_checkpoint_discarded(queue):
+    job_id = queue.add("video.mp4")
+    queue.checkpoint(job_id, 10, {}, 0, [], [], (0, [[["time", "0:00:00.00"]]], [0.0]))
+
+    with closing(sqlite3.connect(queue._path)) as db:
+        with db:
+            db.execute(
+                "UPDATE jobs SET state = ? WHERE id = ?", ('{"movements": ', job_id)
+            )
+
+    assert queue.next_job() == (job_id, queue.get_jobs()[0][1], "", 0, None)
+    assert queue.get_samples(job_id) == ([], [])
+    assert queue.get_jobs()[0][4] == 0
+
+
+def test_running_job_requeued(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    job_id = queue.add("video.mp4")
+    queue.checkpoint(job_id, 10, {"frame": 10}, 0, [], [])
+
+    """ the program exits while the job is running """
+    assert queue.next_job()[0] == job_id
+    assert queue.next_job() is None
+
+    queue = JobQueue(path)
+    assert queue.get_jobs()[0][3] == QUEUED
+    assert queue.next_job()[3:] == (10, {"frame": 10})
+
+
+def test_file_state(trace):
+    """ the parsed data and sampling state survive a json round trip """
+    frames = list(trace.frames())
+    movements = create_movements()
+    file = File()
+    replay([(i, t, lm) for i, (t, lm) in enumerate(frames)], movements, file)
+
+    half = len(file.get_data()) // 2
+    state = json.loads(json.dumps(file.get_state()))
+    assert len(file.get_state(start=half)["data"]) == len(file.get_data()) - half
+
+    restored = File()
+    restored.set_state(state)
+    assert restored.get_data() == file.get_data()
+    assert restored.get_state() == file.get_state()
+
+
+def test_movement_state(trace):
+    """ counting carries on exactly where it left off, mid rep """
+    frames = list(trace.frames())
+    half = len(frames) // 2
+
+    movements, restored = create_movements(), create_movements()
+    for index, (t, landmarks) in enumerate(frames):
+        if index == half:
+            for key, movement in movements.items():
+                state = json.loads(json.dumps(movement.get_state()))
+                restored[key].set_state(state)
+
+        replay([(index, t, landmarks)], movements, File(save=False))
+        if index >= half:
+            replay([(index, t, landmarks)], restored, File(save=False))
+
+    assert get_counts(restored) == get_counts(movements)
+    assert get_counts(restored) == trace.get_expected_counts()
+    for key, movement in movements.items():
+        assert restored[key].get_state() == movement.get_state()
@@ -0,0 +1,79 @@
+"""
+test_server.py
+
+Tests of the stream server module: the latest-value broadcast and websocket messages.
+
+"""
+
+import io, threading
+import pytest
+from server import Broadcast, send_message, read_message, TEXT
+
+
+def test_publish():
+    broadcast = Broadcast()
+    assert broadcast.get() == (0, None)
+
+    broadcast.publish("a")
+    broadcast.publish("b")
+    assert broadcast.get() == (2, "b")
+
+    """ a client that was sent "a" skips straight to the latest value """
+    assert broadcast.wait(1) == (2, "b")
+
+
+def test_wait_timeout():
+    broadcast = Broadcast()
+    broadcast.publish("a")
+
+    assert broadcast.wait(1, timeout=0.01) == (1, "a")
+
+
+def test_wait_for_publish():
+    broadcast = Broadcast()
+    received = []
+    clients = [
+        threading.Thread(target=lambda: received.append(broadcast.wait(0, timeout=5)))
+        for _ in range(3)
+    ]
+    for client in clients:
+        client.start()
+
+    broadcast.publish("frame")
+    for client in clients:
+        client.join()
+
+    assert received == [(1, "frame")] * 3
+
+
+def test_close():
+    broadcast = Broadcast()
+    client = threading.Thread(target=broadcast.wait, args=(0,))
+    client.start()
+
+    broadcast.close()
+    client.join(timeout=5)
+
+    assert not client.is_alive()
+    assert broadcast.is_closed()
+
+
+@pytest.mark.parametrize("length", [0, 125, 126, 2**16 - 1, 2**16])
+def test_message(length):
+    """ each length encoding is read back (server messages are not masked) """
+    stream = io.BytesIO()
+    payload = bytes(i % 251 for i in range(length))
+    send_message(stream, payload)
+
+    stream.seek(0)
+    assert read_message(stream) == (TEXT, payload)
+
+
+def test_masked_message():
+    mask = b"\x01\x02\x03\x04"
+    payload = b"hello"
+    masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    stream = io.BytesIO(bytes([0x80 | TEXT, 0x80 | len(payload)]) + mask + masked)
+
+    assert read_message(stream) == (TEXT, payload)
+    assert read_message(stream) == (None, None)
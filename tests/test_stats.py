@@ -0,0 +1,150 @@
+"""
+test_stats.py
+
+Tests of the session statistics module: the running statistics are checked against the
+statistics module, and rep statistics against movement counts.
+
+"""
+
+import math, random, statistics
+import pytest
+from stats import RunningStats, Trend, MovementStats, SessionStats
+
+
+class Counter:
+    """
+    stands in for a movement: only the count, phase and tracking status are read
+
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def get_count(self):
+        return self.count
+
+    def get_phase(self):
+        return "set"
+
+    def get_tracking_status(self):
+        return True
+
+
+def test_running_stats():
+    values = [random.uniform(-50, 50) for _ in range(1000)]
+
+    running = RunningStats()
+    for value in values:
+        running.update(value)
+
+    assert running.get_count() == len(values)
+    assert running.get_mean() == pytest.approx(statistics.mean(values))
+    assert running.get_variance() == pytest.approx(statistics.variance(values))
+    assert running.get_stdev() == pytest.approx(statistics.stdev(values))
+    assert running.get_min() == min(values)
+    assert running.get_max() == max(values)
+
+
+def test_running_stats_large_offset():
+    """ welford keeps its precision when the values are far from zero """
+    values = [1e9 + value for value in [4, 7, 13, 16]]
+
+    running = RunningStats()
+    for value in values:
+        running.update(value)
+
+    assert running.get_variance() == pytest.approx(30)
+
+
+def test_running_stats_too_few_values():
+    running = RunningStats()
+    assert running.get_mean() is None
+    assert running.get_variance() is None
+
+    running.update(3)
+    assert running.get_mean() == 3
+    assert running.get_variance() is None
+    assert running.get_stdev() is None
+
+
+def test_trend():
+    trend = Trend()
+    for x in range(10):
+        trend.update(x, 2.5 * x + 1)
+
+    assert trend.get_slope() == pytest.approx(2.5)
+
+
+def test_trend_too_few_values():
+    trend = Trend()
+    assert trend.get_slope() is None
+
+    trend.update(1, 1)
+    trend.update(1, 2)
+    assert trend.get_slope() is None
+
+
+def test_movement_stats():
+    movement = Counter()
+    stats = MovementStats()
+    rep_times = [2, 5, 9, 30]
+
+    for frame in range(0, 40 * 10):
+        timestamp = frame / 10
+        if rep_times and timestamp >= rep_times[0]:
+            movement.count += 1
+            rep_times.pop(0)
+        stats.update(movement, timestamp, 0.1)
+
+    summary = stats.get_summary(40)
+    durations = [3, 4, 21]
+    assert summary["reps"] == 4
+    assert summary["rep duration mean"] == pytest.approx(statistics.mean(durations))
+    assert summary["rep duration stdev"] == pytest.approx(statistics.stdev(durations))
+    assert summary["rest time"] == pytest.approx(21)
+    assert summary["reps per minute histogram"] == [4]
+    assert summary["phase times"]["set"] == pytest.approx(40)
+
+
+def test_movement_stats_resumed_count():
+    """ reps counted before the statistics started are not added as reps """
+    movement = Counter()
+    movement.count = 5
+    stats = MovementStats()
+
+    stats.update(movement, 0, 0)
+    movement.count += 1
+    stats.update(movement, 1, 1)
+
+    assert stats.get_summary(1)["reps"] == 1
+
+
+def test_movement_stats_reset_count():
+    """ a count reset during the session carries on counting from the new count """
+    movement = Counter()
+    stats = MovementStats()
+
+    for count, timestamp in [(0, 0), (1, 1), (2, 2), (0, 3), (1, 4)]:
+        movement.count = count
+        stats.update(movement, timestamp, 1)
+
+    assert stats.get_summary(4)["reps"] == 3
+
+
+def test_session_stats():
+    movements = {"a": Counter(), "b": Counter()}
+    stats = SessionStats()
+
+    for frame in range(100):
+        if frame % 10 == 9:
+            movements["a"].count += 1
+        stats.update(movements, 5 + frame / 10)
+
+    summary = stats.get_summary()
+    assert summary["duration"] == pytest.approx(9.9)
+    assert summary["movements"]["a"]["reps"] == 10
+    assert summary["movements"]["b"]["reps"] == 0
+    assert math.isclose(summary["movements"]["a"]["rep duration mean"], 1)
+
+    stats.reset()
+    assert stats.get_summary() == {"duration": 0, "movements": {}}
@@ -0,0 +1,86 @@
+"""
+test_store.py
+
+Tests of the session store module: sessions, counts and samples stored in a sqlite
+database.
+
+"""
+
+import sqlite3
+from contextlib import closing
+import pytest
+from store import SessionStore, pack_landmarks, unpack_landmarks
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / "sessions" / "sessions.db"), batch_size=4)
+
+
+def create_samples(num_samples):
+    """ (time, counts string, landmarks blob) of each sample (every other has none) """
+    return [
+        (
+            i / 10,
+            str({"sit to stand": i // 5}),
+            pack_landmarks([(i, 0.5), (i + 1, 0.25)]) if i % 2 == 0 else None,
+        )
+        for i in range(num_samples)
+    ]
+
+
+def test_pack_landmarks():
+    points = [(1.5, 2.0), (0.25, 100.0)]
+
+    assert unpack_landmarks(pack_landmarks(points)) == points
+    assert pack_landmarks([]) is None
+    assert unpack_landmarks(None) == []
+
+
+def test_add_session(store):
+    samples = create_samples(10)
+    session_id = store.add_session("patient", 1000, 60, {"sit to stand": 2}, samples)
+
+    assert store.get_sessions("patient") == [(session_id, 1000, 60)]
+    assert store.get_counts("patient", "sit to stand") == [(1000, 2)]
+
+    """ samples are inserted in batches, and returned in time order """
+    stored = store.get_samples(session_id)
+    assert len(stored) == len(samples)
+    assert [sample[:2] for sample in stored] == [sample[:2] for sample in samples]
+    assert stored[0][2] == [(0, 0.5), (1, 0.25)]
+    assert stored[1][2] == []
+
+
+def test_get_sessions_range(store):
+    for started_at in [100, 200, 300]:
+        store.add_session("patient", started_at, 10, {"sit to stand": 1}, [])
+    store.add_session("other", 200, 10, {"sit to stand": 5}, [])
+
+    assert [s[1] for s in store.get_sessions("patient", since=200)] == [200, 300]
+    assert [s[1] for s in store.get_sessions("patient", until=300)] == [100, 200]
+    assert store.get_counts("other", "sit to stand", 150, 250) == [(200, 5)]
+    assert store.get_counts("patient", "left arm ext") == []
+
+
+def test_delete_session(store, tmp_path):
+    session_id = store.add_session("patient", 100, 10, {"a": 1}, create_samples(5))
+    kept_id = store.add_session("patient", 200, 10, {"a": 2}, create_samples(3))
+    store.delete_session(session_id)
+
+    assert [s[0] for s in store.get_sessions("patient")] == [kept_id]
+    assert store.get_samples(session_id) == []
+    assert len(store.get_samples(kept_id)) == 3
+
+    """ the counts and samples of the session are deleted with it """
+    with closing(sqlite3.connect(str(tmp_path / "sessions" / "sessions.db"))) as db:
+        assert db.execute("SELECT COUNT(*) FROM counts").fetchone() == (1,)
+        assert db.execute("SELECT COUNT(*) FROM samples").fetchone() == (3,)
+
+
+def test_add_session_rolls_back(store):
+    """ a session whose samples cannot be inserted is not added """
+    with pytest.raises(sqlite3.Error):
+        store.add_session("patient", 100, 10, {"a": 1}, [(0, None, None)])
+
+    assert store.get_sessions("patient") == []
@@ -0,0 +1,60 @@
+"""
+test_synthetic.py
+
+Tests of the synthetic landmark trace module: counting the reps of generated traces
+gives the known number of reps.
+
+"""
+
+import pytest
+from synthetic import SyntheticTrace, MOVEMENTS, run
+
+
+@pytest.mark.parametrize("movement", MOVEMENTS)
+@pytest.mark.parametrize(
+    "events",
+    [{}, {"noise": 0.005, "dropouts": 6, "excursions": 4}],
+    ids=["clean", "dropouts and excursions"],
+)
+def test_counts(movement, events):
+    trace = SyntheticTrace(movement, reps=10, seed=1, **events)
+    _, counts = run(trace)
+
+    assert counts == trace.get_expected_counts()
+    assert counts[movement] == 10
+
+
+def test_no_reps():
+    trace = SyntheticTrace(reps=0, seed=1)
+    _, counts = run(trace)
+
+    assert counts == trace.get_expected_counts()
+    assert set(counts.values()) == {0}
+
+
+def test_frames():
+    trace = SyntheticTrace(reps=3, dropouts=10, seed=2)
+    frames = list(trace.frames(chunk_size=50))
+
+    assert len(frames) == trace.get_num_frames()
+    assert frames[-1][0] < trace.get_duration()
+    assert all(len(landmarks) in (0, 33) for _, landmarks in frames)
+
+    rep_times = trace.get_rep_times()
+    assert len(rep_times) == 3
+    assert rep_times[0][0] == 0 and rep_times[-1][1] == trace.get_duration()
+
+
+def test_seed():
+    """ the same seed generates the same trace """
+    first = list(SyntheticTrace(reps=2, noise=0.01, seed=3).frames())
+    second = list(SyntheticTrace(reps=2, noise=0.01, seed=3).frames())
+    other = list(SyntheticTrace(reps=2, noise=0.01, seed=4).frames())
+
+    assert first == second
+    assert first != other
+
+
+def test_invalid_movement():
+    with pytest.raises(ValueError):
+        SyntheticTrace("shoulder circles")
@@ -0,0 +1,136 @@
+"""
+test_timeline.py
+
+Tests of the review timeline module: the keyframe index of a video, finding frames by
+their timestamp and decoding exact frames.
+
+"""
+
+import cv2
+import numpy as np
+import pytest
+from timeline import KeyframeIndex, Timeline
+
+
+FRAMES = 40
+FPS = 10
+
+
+@pytest.fixture
+def video(tmp_path):
+    """ a short video whose frame brightness is its index (x 6) """
+    name = str(tmp_path / "video.avi")
+    writer = cv2.VideoWriter(name, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (64, 48))
+    for index in range(FRAMES):
+        writer.write(np.full((48, 64, 3), index * 6, dtype=np.uint8))
+    writer.release()
+    return name
+
+
+def get_frame_index(img):
+    return int(round(img.mean() / 6))
+
+
+def create_index(path, timestamps, keyframes=(0,)):
+    """ saves and loads an index with the given frame timestamps """
+    images = [cv2.imencode(".jpg", np.zeros((8, 8, 3), np.uint8))[1].reshape(-1)]
+    np.savez(
+        path,
+        timestamps=np.array(timestamps, dtype=np.float64),
+        keyframes=np.array(keyframes, dtype=np.int64),
+        offsets=np.array([0, len(images[0])]),
+        images=np.concatenate(images),
+    )
+
+    index = KeyframeIndex()
+    assert index.load(path)
+    return index
+
+
+def test_find_frame(tmp_path):
+    """ frame times are not evenly spaced (eg: variable frame rate videos) """
+    index = create_index(str(tmp_path / "index.npz"), [0, 0.1, 0.3, 0.35, 1.0])
+
+    assert index.find_frame(0) == 0
+    assert index.find_frame(0.04) == 0
+    assert index.find_frame(0.06) == 1
+    assert index.find_frame(0.19) == 1
+    assert index.find_frame(0.21) == 2
+    assert index.find_frame(0.33) == 3
+    assert index.find_frame(0.6) == 3
+    assert index.find_frame(0.7) == 4
+
+
+def test_find_frame_outside(tmp_path):
+    index = create_index(str(tmp_path / "index.npz"), [0.5, 0.6, 0.7])
+
+    assert index.find_frame(-1) == 0
+    assert index.find_frame(0) == 0
+    assert index.find_frame(0.7) == 2
+    assert index.find_frame(100) == 2
+
+
+def test_find_frame_exact(tmp_path):
+    """ the timestamp of every frame finds that frame, and times close to it too """
+    timestamps = np.cumsum(np.random.default_rng(0).uniform(0.01, 0.1, 500))
+    index = create_index(str(tmp_path / "index.npz"), timestamps)
+
+    for frame, timestamp in enumerate(timestamps):
+        assert index.find_frame(timestamp) == frame
+        assert index.find_frame(timestamp + 0.004) == frame
+        assert index.find_frame(timestamp - 0.004) == frame
+
+
+def test_build(video, tmp_path):
+    index = KeyframeIndex(period=1)
+    assert index.build(video)
+
+    assert index.get_length() == FRAMES
+    assert index.get_keyframes().tolist() == list(range(0, FRAMES, FPS))
+    assert index.get_timestamps() == pytest.approx(np.arange(FRAMES) / FPS)
+    for frame, timestamp in enumerate(index.get_timestamps()):
+        assert index.find_frame(timestamp) == frame
+
+    """ the nearest keyframe at or before the frame """
+    keyframe, img = index.get_keyframe(25)
+    assert keyframe == 20 and get_frame_index(img) == 20
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = KeyframeIndex()
+    assert loaded.load(path)
+    assert loaded.get_timestamps().tolist() == index.get_timestamps().tolist()
+    assert loaded.get_keyframe(9)[0] == 0
+
+
+def test_build_stopped(video):
+    assert not KeyframeIndex().build(video, should_stop=lambda: True)
+    assert not KeyframeIndex().build("missing.avi")
+
+
+def test_read_frame(video):
+    index = KeyframeIndex(period=1)
+    index.build(video)
+    timeline = Timeline(video, index, np.full((FRAMES, 33, 4), np.nan, np.float32))
+
+    """ forwards (stepped to), backwards and far ahead (sought) """
+    for frame in [3, 5, 39, 0, 17, 16, 30]:
+        assert get_frame_index(timeline.read_frame(frame)) == frame
+
+    timeline.close()
+
+
+def test_seek_capture(video):
+    index = KeyframeIndex(period=1)
+    index.build(video)
+    timeline = Timeline(video, index, np.full((FRAMES, 33, 4), np.nan, np.float32))
+
+    cap = cv2.VideoCapture(video)
+    for frame in [12, 0, 39, 7]:
+        landed = timeline.seek_capture(cap, frame)
+        assert landed is not None and landed <= frame
+
+        ret, img = cap.retrieve()
+        assert ret and get_frame_index(img) == landed
+
+    cap.release()